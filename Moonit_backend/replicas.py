@@ -0,0 +1,172 @@
+# backend/Moonit_backend/replicas.py
+"""
+Routage des lectures analytiques vers les réplicas en lecture seule.
+
+Seules les actions explicitement marquées (statistiques, listes de l'admin...)
+lisent sur un réplica. Un utilisateur qui vient d'écrire reste collé au
+primaire pendant REPLICA_STICKY_SECONDS pour relire ses propres écritures,
+et un réplica injoignable est écarté pendant REPLICA_RETRY_SECONDS. Un bloc
+de lectures reste sur le réplica choisi à son entrée ; si ce réplica tombe
+en cours de requête (OperationalError / InterfaceError), ReplicaReadMixin
+l'écarte et refait la lecture sur le primaire.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, InterfaceError, OperationalError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+# Réplica des lectures du bloc en cours (None : primaire)
+_lectures_replica = ContextVar('lectures_replica', default=None)
+
+# alias -> timestamp jusqu'auquel le réplica est considéré indisponible
+_replicas_en_panne = {}
+
+
+def _cle_collante(user_id):
+    return f"replica:collant:{user_id}"
+
+
+def marquer_ecriture(user):
+    """Colle l'utilisateur au primaire juste après une écriture"""
+    if user is not None and user.is_authenticated:
+        cache.set(_cle_collante(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def est_colle_au_primaire(user):
+    if user is None or not user.is_authenticated:
+        return False
+    return cache.get(_cle_collante(user.pk), False)
+
+
+def ecarter_replica(alias):
+    """Réplica injoignable : plus choisi pendant REPLICA_RETRY_SECONDS"""
+    _replicas_en_panne[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+
+def _replica_disponible(alias):
+    if _replicas_en_panne.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        ecarter_replica(alias)
+        return False
+    _replicas_en_panne.pop(alias, None)
+    return True
+
+
+def choisir_replica():
+    """Retourne un alias de réplica joignable, ou None pour rester sur le primaire"""
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if _replica_disponible(alias):
+            return alias
+    return None
+
+
+@contextmanager
+def lectures_replica(user=None):
+    """Envoie les lectures du bloc vers un réplica (sauf utilisateur collé au primaire)"""
+    alias = None
+    if settings.DATABASE_REPLICAS and not est_colle_au_primaire(user):
+        alias = choisir_replica()
+    jeton = _lectures_replica.set(alias)
+    try:
+        yield
+    finally:
+        _lectures_replica.reset(jeton)
+
+
+class ReplicaRouter:
+    """Routeur : lectures marquées -> réplica, tout le reste -> primaire"""
+
+    def db_for_read(self, model, **hints):
+        return _lectures_replica.get()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les réplicas contiennent les mêmes données que le primaire
+        bases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Les réplicas sont alimentés par la réplication, jamais migrés
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Mixin de ViewSet : les actions listées dans `replica_actions` lisent sur
+    un réplica, et toute requête d'écriture colle l'utilisateur au primaire.
+    Une erreur de connexion au réplica pendant l'action la relance sur le
+    primaire.
+    """
+
+    replica_actions = []
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.replica_actions and request.method in SAFE_METHODS:
+            self._contexte_replica = lectures_replica(request.user)
+            self._contexte_replica.__enter__()
+
+    def _quitter_replica(self):
+        contexte = getattr(self, '_contexte_replica', None)
+        if contexte is not None:
+            contexte.__exit__(None, None, None)
+            self._contexte_replica = None
+
+    def handle_exception(self, exc):
+        alias = _lectures_replica.get()
+        if alias is None or not isinstance(exc, (OperationalError, InterfaceError)):
+            return super().handle_exception(exc)
+        # Réplica tombé pendant l'action (lecture seule) : écarté, l'action est rejouée sur le primaire
+        ecarter_replica(alias)
+        self._quitter_replica()
+        handler = getattr(self, self.request.method.lower(), self.http_method_not_allowed)
+        try:
+            return handler(self.request, *self.args, **self.kwargs)
+        except Exception as erreur:
+            return super().handle_exception(erreur)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        self._quitter_replica()
+        if request.method not in SAFE_METHODS:
+            marquer_ecriture(getattr(request, 'user', None))
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaAdminMixin:
+    """Mixin de ModelAdmin : la liste (changelist) en GET est servie par un réplica"""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            marquer_ecriture(request.user)
+            return super().changelist_view(request, extra_context)
+        with lectures_replica(request.user):
+            response = super().changelist_view(request, extra_context)
+            # Les TemplateResponse sont rendues paresseusement : forcer le
+            # rendu ici pour que les requêtes partent bien vers le réplica
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        marquer_ecriture(request.user)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        marquer_ecriture(request.user)
@@ -16,4 +16,7 @@ urlpatterns = [
     
     # Transactions
     path("api/transactions/", include("transactions.urls")),  # ✅ plus propre
+    
+    # Tâches de fond
+    path("api/taches/", include("taches.urls")),
 ]
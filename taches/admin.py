@@ -0,0 +1,26 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Tache
+
+
+@admin.register(Tache)
+class TacheAdmin(admin.ModelAdmin):
+    list_display = ['nom', 'statut', 'priorite', 'tentatives', 'user', 'executer_apres', 'created_at']
+    list_filter = ['statut', 'nom']
+    search_fields = ['nom', 'user__username']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'id', 'tentatives', 'verrouillee_par', 'verrouillee_le',
+        'resultat', 'erreur', 'created_at', 'updated_at', 'terminee_le'
+    ]
+
+    actions = ['relancer_taches']
+
+    def relancer_taches(self, request, queryset):
+        maintenant = timezone.now()
+        updated = queryset.exclude(statut='en_cours').update(
+            statut='en_attente', tentatives=0, executer_apres=maintenant,
+            terminee_le=None, erreur='', updated_at=maintenant
+        )
+        self.message_user(request, f"{updated} tâche(s) relancée(s).")
+    relancer_taches.short_description = "Relancer les tâches sélectionnées"
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class TachesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'taches'
+
+    def ready(self):
+        # Enregistre les tâches déclarées dans les modules taches.py des apps
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('taches')
@@ -0,0 +1,224 @@
+# backend/taches/file.py
+"""
+File de tâches de fond stockée dans la base du projet (aucun broker externe).
+
+Déclarer une tâche dans le module `taches.py` d'une app :
+
+    from taches.file import tache
+
+    @tache('transactions.exporter')
+    def exporter(user_id, format='csv'):
+        ...
+        return {'fichier': chemin}   # stocké dans Tache.resultat (JSON)
+
+La mettre en file depuis une vue :
+
+    from taches.file import mettre_en_file
+    t = mettre_en_file('transactions.exporter', user=request.user, user_id=request.user.pk)
+    # statut consultable sur GET /api/taches/<t.id>/
+
+Les tâches sont exécutées par `python manage.py lancer_taches`. La réservation
+utilise SELECT ... FOR UPDATE SKIP LOCKED quand la base le permet (PostgreSQL),
+sinon un UPDATE conditionnel qui ne réussit que pour un seul worker (SQLite).
+Une tâche en échec est reprogrammée avec un délai exponentiel jusqu'à
+`max_tentatives`.
+
+Pendant l'exécution, un thread de battement repousse `verrouillee_le` toutes
+les TACHES_BATTEMENT secondes : seule une tâche dont le worker s'est arrêté
+dépasse TACHES_DELAI_VERROU et est remise en file. Le résultat n'est écrit
+que si la réservation est toujours celle du worker (`tentatives` est
+incrémenté à chaque réservation) : une tâche libérée puis reprise ailleurs
+n'est pas écrasée par l'ancien worker. La ligne Tache est écrite sur la base
+par défaut : mise en file dans un bloc atomic, elle n'est visible des
+workers qu'après le commit.
+"""
+import random
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections, close_old_connections, router, transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Tache
+
+_REGISTRE = {}
+
+
+class TacheInconnue(LookupError):
+    pass
+
+
+def tache(nom):
+    """Décorateur : enregistre une fonction exécutable par les workers"""
+    def decorateur(fonction):
+        _REGISTRE[nom] = fonction
+        fonction.nom_tache = nom
+        return fonction
+    return decorateur
+
+
+def mettre_en_file(nom, *, user=None, priorite=0, delai=None, max_tentatives=None, **arguments):
+    """
+    Crée une tâche en attente et la retourne.
+    `arguments` doit être sérialisable en JSON ; `delai` (timedelta) repousse
+    la première exécution.
+    """
+    if nom not in _REGISTRE:
+        raise TacheInconnue(f"Tâche inconnue : {nom}")
+    return Tache.objects.create(
+        nom=nom,
+        arguments=arguments,
+        user=user,
+        priorite=priorite,
+        executer_apres=timezone.now() + (delai or timedelta()),
+        max_tentatives=max_tentatives or settings.TACHES_MAX_TENTATIVES,
+    )
+
+
+def _alias():
+    return router.db_for_write(Tache)
+
+
+def _pretes(maintenant):
+    return (
+        Tache.objects.using(_alias())
+        .filter(statut='en_attente', executer_apres__lte=maintenant)
+        .order_by('-priorite', 'executer_apres')
+    )
+
+
+def reserver(worker, nombre=1):
+    """Réserve jusqu'à `nombre` tâches prêtes pour ce worker"""
+    if nombre <= 0:
+        return []
+    maintenant = timezone.now()
+    alias = _alias()
+    reservation = {
+        'statut': 'en_cours',
+        'verrouillee_par': worker,
+        'verrouillee_le': maintenant,
+        'tentatives': F('tentatives') + 1,
+        'updated_at': maintenant,
+    }
+
+    if connections[alias].features.has_select_for_update_skip_locked:
+        # Les lignes verrouillées par un autre worker sont simplement sautées
+        with db_transaction.atomic(using=alias):
+            ids = list(
+                _pretes(maintenant).select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:nombre]
+            )
+            Tache.objects.using(alias).filter(pk__in=ids).update(**reservation)
+    else:
+        # Pas de verrou de ligne : seul l'UPDATE qui trouve encore la tâche
+        # en attente la réserve (les autres workers passent à la suivante)
+        ids = []
+        for pk in _pretes(maintenant).values_list('pk', flat=True)[:nombre * 2]:
+            if Tache.objects.using(alias).filter(pk=pk, statut='en_attente').update(**reservation):
+                ids.append(pk)
+                if len(ids) == nombre:
+                    break
+
+    return list(Tache.objects.using(alias).filter(pk__in=ids).order_by('-priorite', 'executer_apres'))
+
+
+def delai_nouvel_essai(tentatives):
+    """Délai exponentiel plafonné, avec un peu d'aléa pour étaler les reprises"""
+    delai = min(settings.TACHES_BACKOFF_SECONDES * 2 ** max(tentatives - 1, 0), settings.TACHES_BACKOFF_MAX)
+    return timedelta(seconds=delai + random.uniform(0, delai / 10))
+
+
+def _reservation(tache):
+    # Toujours réservée par ce worker : une nouvelle réservation incrémente tentatives
+    return Tache.objects.using(_alias()).filter(pk=tache.pk, statut='en_cours', tentatives=tache.tentatives)
+
+
+class _Battement(threading.Thread):
+    """Repousse verrouillee_le tant que la tâche s'exécute"""
+
+    def __init__(self, tache):
+        super().__init__(name=f"battement-{tache.pk}", daemon=True)
+        self.tache = tache
+        self.arret = threading.Event()
+
+    def run(self):
+        try:
+            while not self.arret.wait(settings.TACHES_BATTEMENT):
+                maintenant = timezone.now()
+                try:
+                    if not _reservation(self.tache).update(verrouillee_le=maintenant, updated_at=maintenant):
+                        return  # Libérée entre-temps
+                except DatabaseError:
+                    # Base momentanément indisponible : nouvel essai au battement suivant
+                    close_old_connections()
+        finally:
+            connections.close_all()
+
+
+def _echec(tache, erreur):
+    maintenant = timezone.now()
+    valeurs = {'erreur': erreur, 'verrouillee_par': '', 'verrouillee_le': None, 'updated_at': maintenant}
+    if tache.tentatives >= tache.max_tentatives:
+        valeurs.update(statut='echouee', terminee_le=maintenant)
+    else:
+        valeurs.update(statut='en_attente', executer_apres=maintenant + delai_nouvel_essai(tache.tentatives))
+    if not _reservation(tache).update(**valeurs):
+        return 'liberee'
+    return valeurs['statut']
+
+
+def executer(tache_id):
+    """
+    Exécute une tâche réservée (dans un thread ou un processus du worker).
+    Retourne le statut final de cette tentative ('liberee' si la tâche a été
+    remise en file entre-temps : rien n'est écrit).
+    """
+    battement = None
+    try:
+        tache = Tache.objects.using(_alias()).get(pk=tache_id)
+        battement = _Battement(tache)
+        battement.start()
+        try:
+            fonction = _REGISTRE.get(tache.nom)
+            if fonction is None:
+                raise TacheInconnue(f"Tâche inconnue : {tache.nom}")
+            resultat = fonction(**tache.arguments)
+            maintenant = timezone.now()
+            if not _reservation(tache).update(
+                statut='reussie',
+                resultat=resultat,
+                erreur='',
+                terminee_le=maintenant,
+                updated_at=maintenant,
+            ):
+                return 'liberee'
+            return 'reussie'
+        except Exception:
+            return _echec(tache, traceback.format_exc())
+    finally:
+        if battement is not None:
+            battement.arret.set()
+            battement.join()
+        close_old_connections()
+
+
+def liberer_bloquees():
+    """
+    Remet en file les tâches dont le verrou n'a pas été repoussé depuis plus
+    de TACHES_DELAI_VERROU secondes (worker arrêté brutalement). Compte comme
+    une tentative.
+    """
+    maintenant = timezone.now()
+    bloquees = Tache.objects.using(_alias()).filter(
+        statut='en_cours',
+        verrouillee_le__lt=maintenant - timedelta(seconds=settings.TACHES_DELAI_VERROU),
+    )
+    liberation = {'verrouillee_par': '', 'verrouillee_le': None, 'updated_at': maintenant}
+    echouees = bloquees.filter(tentatives__gte=F('max_tentatives')).update(
+        statut='echouee', erreur="Worker interrompu", terminee_le=maintenant, **liberation
+    )
+    relancees = bloquees.update(statut='en_attente', executer_apres=maintenant, **liberation)
+    return relancees + echouees
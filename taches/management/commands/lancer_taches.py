@@ -0,0 +1,112 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from taches.file import executer, liberer_bloquees, reserver
+from transactions.checks import cache_local
+
+
+def _initialiser_processus():
+    # Processus enfant : Django prêt, connexions propres à ce processus
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la file de tâches : réserve les tâches prêtes en base et les "
+        "exécute dans un pool de threads (par défaut) ou de processus."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.TACHES_WORKERS,
+            help="Nombre de tâches exécutées en parallèle",
+        )
+        parser.add_argument(
+            '--processus',
+            action='store_true',
+            help="Pool de processus (tâches CPU) au lieu de threads",
+        )
+        parser.add_argument(
+            '--intervalle',
+            type=float,
+            default=1.0,
+            help="Attente en secondes quand la file est vide",
+        )
+        parser.add_argument(
+            '--une-fois',
+            action='store_true',
+            help="Vide la file puis s'arrête",
+        )
+
+    def handle(self, *args, **options):
+        nb_workers = max(1, options['workers'])
+        intervalle = options['intervalle']
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+
+        arret = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: arret.set())
+
+        if options['processus']:
+            # Ne pas partager les connexions ouvertes avec les processus enfants
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=nb_workers, initializer=_initialiser_processus)
+        else:
+            pool = ThreadPoolExecutor(max_workers=nb_workers, thread_name_prefix='tache')
+
+        self.stdout.write(f"Worker {worker} : {nb_workers} {'processus' if options['processus'] else 'threads'}")
+        if cache_local():
+            self.stderr.write(self.style.WARNING(
+                "Cache LocMem : les invalidations faites par ce worker ne sont pas vues des "
+                "processus web. Configurer un cache partagé (CACHE_BACKEND)."
+            ))
+        en_cours = {}
+        derniere_liberation = 0.0
+        totaux = {'reussie': 0, 'en_attente': 0, 'echouee': 0}
+
+        with pool:
+            while not arret.is_set():
+                if time.monotonic() - derniere_liberation > settings.TACHES_DELAI_VERROU / 2:
+                    liberees = liberer_bloquees()
+                    if liberees:
+                        self.stdout.write(self.style.WARNING(f"{liberees} tâche(s) bloquée(s) remise(s) en file"))
+                    derniere_liberation = time.monotonic()
+
+                for tache in reserver(worker, nb_workers - len(en_cours)):
+                    en_cours[pool.submit(executer, tache.pk)] = tache
+
+                if not en_cours:
+                    if options['une_fois']:
+                        break
+                    arret.wait(intervalle)
+                    continue
+
+                terminees, _ = wait(en_cours, timeout=intervalle, return_when=FIRST_COMPLETED)
+                for future in terminees:
+                    tache = en_cours.pop(future)
+                    try:
+                        statut = future.result()
+                    except Exception as e:
+                        # Processus enfant mort : la tâche sera libérée par liberer_bloquees
+                        self.stderr.write(f"{tache.nom} [{tache.pk}] : worker interrompu ({e})")
+                        continue
+                    totaux[statut] = totaux.get(statut, 0) + 1
+                    style = self.style.SUCCESS if statut == 'reussie' else self.style.WARNING
+                    self.stdout.write(style(f"{tache.nom} [{tache.pk}] : {statut}"))
+
+        self.stdout.write(
+            f"Arrêt : {totaux['reussie']} réussie(s), {totaux['en_attente']} reprogrammée(s), "
+            f"{totaux['echouee']} échouée(s)."
+        )
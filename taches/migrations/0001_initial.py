@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:19
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tache',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nom', models.CharField(help_text='Nom de la fonction enregistrée avec @tache', max_length=100, verbose_name='Nom')),
+                ('arguments', models.JSONField(blank=True, default=dict, verbose_name='Arguments')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('reussie', 'Réussie'), ('echouee', 'Échouée')], default='en_attente', max_length=20, verbose_name='Statut')),
+                ('priorite', models.IntegerField(default=0, help_text='Les plus grandes valeurs passent en premier', verbose_name='Priorité')),
+                ('executer_apres', models.DateTimeField(verbose_name='Exécuter après')),
+                ('tentatives', models.PositiveIntegerField(default=0, verbose_name='Tentatives')),
+                ('max_tentatives', models.PositiveIntegerField(default=5, verbose_name='Tentatives max')),
+                ('verrouillee_par', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('verrouillee_le', models.DateTimeField(blank=True, null=True, verbose_name='Réservée le')),
+                ('resultat', models.JSONField(blank=True, null=True, verbose_name='Résultat')),
+                ('erreur', models.TextField(blank=True, verbose_name='Dernière erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créée le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifiée le')),
+                ('terminee_le', models.DateTimeField(blank=True, null=True, verbose_name='Terminée le')),
+                ('user', models.ForeignKey(blank=True, help_text='Propriétaire, seul autorisé à consulter le statut', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='taches', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Tâche',
+                'verbose_name_plural': 'Tâches',
+                'db_table': 'taches_tache',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['statut', '-priorite', 'executer_apres'], name='taches_tach_statut_e723e6_idx'), models.Index(fields=['user', '-created_at'], name='taches_tach_user_id_ddc800_idx')],
+            },
+        ),
+    ]
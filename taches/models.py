@@ -0,0 +1,71 @@
+import uuid
+from django.db import models
+from django.contrib.auth.models import User
+
+
+class Tache(models.Model):
+    """Tâche de fond stockée en base, exécutée par `manage.py lancer_taches`"""
+
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('reussie', 'Réussie'),
+        ('echouee', 'Échouée'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    nom = models.CharField(
+        max_length=100,
+        verbose_name="Nom",
+        help_text="Nom de la fonction enregistrée avec @tache"
+    )
+    arguments = models.JSONField(default=dict, blank=True, verbose_name="Arguments")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='taches',
+        verbose_name="Utilisateur",
+        help_text="Propriétaire, seul autorisé à consulter le statut"
+    )
+
+    statut = models.CharField(
+        max_length=20,
+        choices=STATUT_CHOICES,
+        default='en_attente',
+        verbose_name="Statut"
+    )
+    priorite = models.IntegerField(
+        default=0,
+        verbose_name="Priorité",
+        help_text="Les plus grandes valeurs passent en premier"
+    )
+    executer_apres = models.DateTimeField(verbose_name="Exécuter après")
+    tentatives = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    max_tentatives = models.PositiveIntegerField(default=5, verbose_name="Tentatives max")
+
+    # Réservation par un worker
+    verrouillee_par = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    verrouillee_le = models.DateTimeField(null=True, blank=True, verbose_name="Réservée le")
+
+    resultat = models.JSONField(null=True, blank=True, verbose_name="Résultat")
+    erreur = models.TextField(blank=True, verbose_name="Dernière erreur")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créée le")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifiée le")
+    terminee_le = models.DateTimeField(null=True, blank=True, verbose_name="Terminée le")
+
+    class Meta:
+        db_table = 'taches_tache'
+        ordering = ['-created_at']
+        verbose_name = "Tâche"
+        verbose_name_plural = "Tâches"
+        indexes = [
+            # Sélection des tâches prêtes : statut, puis priorité et échéance
+            models.Index(fields=['statut', '-priorite', 'executer_apres']),
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.nom} ({self.get_statut_display()})"
@@ -0,0 +1,15 @@
+from rest_framework import serializers
+from .models import Tache
+
+
+class TacheSerializer(serializers.ModelSerializer):
+    """Statut d'une tâche, en lecture seule"""
+
+    class Meta:
+        model = Tache
+        fields = [
+            'id', 'nom', 'statut', 'priorite', 'tentatives', 'max_tentatives',
+            'executer_apres', 'resultat', 'erreur',
+            'created_at', 'updated_at', 'terminee_le'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .file import _Battement, _echec, delai_nouvel_essai, liberer_bloquees, reserver
+from .models import Tache
+
+
+@override_settings(TACHES_BACKOFF_SECONDES=10, TACHES_BACKOFF_MAX=100, TACHES_DELAI_VERROU=900)
+class FileTests(TestCase):
+    """Réservation exclusive, reprises avec délai, battement et reprise d'une tâche bloquée"""
+
+    def _tache(self, **champs):
+        return Tache.objects.create(nom='tests.rien', executer_apres=timezone.now(), **champs)
+
+    def _recharger(self, tache):
+        return Tache.objects.get(pk=tache.pk)
+
+    def test_reservation_exclusive(self):
+        taches = [self._tache(), self._tache()]
+        premiere, = reserver('a')
+        seconde, = reserver('b')
+        self.assertEqual({premiere.pk, seconde.pk}, {tache.pk for tache in taches})
+        self.assertEqual((premiere.verrouillee_par, premiere.tentatives), ('a', 1))
+        self.assertEqual(reserver('c'), [])
+
+    def test_reservation_concurrente(self):
+        # Lecture périmée : la tâche déjà réservée par 'a' figure encore parmi les prêtes
+        reservee, libre = self._tache(priorite=1), self._tache()
+        self.assertEqual([tache.pk for tache in reserver('a')], [reservee.pk])
+        with mock.patch('taches.file._pretes', return_value=Tache.objects.order_by('-priorite')):
+            self.assertEqual([tache.pk for tache in reserver('b')], [libre.pk])
+        self.assertEqual(self._recharger(reservee).verrouillee_par, 'a')
+
+    def test_delai_nouvel_essai(self):
+        for tentatives, base in ((1, 10), (2, 20), (4, 80), (5, 100), (20, 100)):
+            with self.subTest(tentatives=tentatives):
+                delai = delai_nouvel_essai(tentatives).total_seconds()
+                self.assertGreaterEqual(delai, base)
+                self.assertLessEqual(delai, base * 1.1)
+
+    def test_echec_reprogramme_puis_abandonne(self):
+        tache = self._tache(max_tentatives=2)
+        reservee, = reserver('a')
+        avant = timezone.now()
+        self.assertEqual(_echec(reservee, 'Erreur'), 'en_attente')
+        tache = self._recharger(tache)
+        self.assertEqual((tache.erreur, tache.verrouillee_par), ('Erreur', ''))
+        self.assertGreaterEqual(tache.executer_apres, avant + timedelta(seconds=10))
+        self.assertEqual(reserver('a'), [])
+
+        # Dernière tentative : plus de reprise
+        Tache.objects.filter(pk=tache.pk).update(executer_apres=timezone.now())
+        reservee, = reserver('a')
+        self.assertEqual(_echec(reservee, 'Erreur'), 'echouee')
+        tache = self._recharger(tache)
+        self.assertEqual((tache.statut, tache.tentatives), ('echouee', 2))
+        self.assertIsNotNone(tache.terminee_le)
+
+    def _battre(self, tache):
+        """Un battement exécuté dans ce thread (la transaction du test n'est pas visible d'un autre)"""
+        battement = _Battement(tache)
+        with mock.patch.object(battement.arret, 'wait', side_effect=[False, True]), \
+                mock.patch.object(connections, 'close_all'):
+            battement.run()
+
+    def test_battement_repousse_le_verrou(self):
+        self._tache()
+        reservee, = reserver('a')
+        Tache.objects.filter(pk=reservee.pk).update(verrouillee_le=timezone.now() - timedelta(seconds=1000))
+        self._battre(reservee)
+        self.assertEqual(liberer_bloquees(), 0)
+        self.assertEqual(self._recharger(reservee).statut, 'en_cours')
+
+    def test_reprise_apres_blocage(self):
+        self._tache()
+        ancienne, = reserver('a')
+        Tache.objects.filter(pk=ancienne.pk).update(verrouillee_le=timezone.now() - timedelta(seconds=1000))
+        self.assertEqual(liberer_bloquees(), 1)
+        reprise, = reserver('b')
+        self.assertEqual((reprise.verrouillee_par, reprise.tentatives), ('b', 2))
+
+        # L'ancien worker ne touche plus à la tâche : ni battement, ni résultat
+        self._battre(ancienne)
+        self.assertEqual(_echec(ancienne, 'Erreur'), 'liberee')
+        tache = self._recharger(reprise)
+        self.assertEqual((tache.statut, tache.verrouillee_par, tache.erreur), ('en_cours', 'b', ''))
+        self.assertEqual(tache.verrouillee_le, reprise.verrouillee_le)
+
+    def test_liberer_bloquees(self):
+        recente = self._tache()
+        bloquee = self._tache()
+        epuisee = self._tache(max_tentatives=1)
+        reserver('a', 3)
+        Tache.objects.filter(pk__in=[bloquee.pk, epuisee.pk]).update(
+            verrouillee_le=timezone.now() - timedelta(seconds=901)
+        )
+        self.assertEqual(liberer_bloquees(), 2)
+        self.assertEqual(
+            [self._recharger(tache).statut for tache in (recente, bloquee, epuisee)],
+            ['en_cours', 'en_attente', 'echouee'],
+        )
+        self.assertEqual(self._recharger(epuisee).erreur, "Worker interrompu")
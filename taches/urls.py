@@ -0,0 +1,7 @@
+from rest_framework.routers import DefaultRouter
+from .views import TacheViewSet
+
+router = DefaultRouter()
+router.register('', TacheViewSet, basename='taches')
+
+urlpatterns = router.urls
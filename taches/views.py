@@ -0,0 +1,19 @@
+from rest_framework import viewsets
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.permissions import IsAuthenticated
+from .models import Tache
+from .serializers import TacheSerializer
+
+
+class TacheViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Suivi des tâches de fond de l'utilisateur connecté.
+    Les tâches sont mises en file côté serveur (taches.file.mettre_en_file).
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = TacheSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['statut', 'nom']
+
+    def get_queryset(self):
+        return Tache.objects.filter(user=self.request.user)
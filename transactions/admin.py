@@ -1,13 +1,133 @@
+from collections import defaultdict
+
 from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Categorie, Transaction, Libelle, Photo
+from Moonit_backend.replicas import ReplicaAdminMixin
+from .models import (
+    Categorie, Transaction, Libelle, Photo, Recurrence, TransactionArchivee, ResumeArchive, RegleAlerte, AlerteBudget,
+    Apercu, Releve
+)
+from .alertes import evaluer_alertes
+from .archives import restaurer
+from .sharding import shard_pour, shards, synchroniser_categorie, utiliser_shard
+from .tresorerie import invalider_soldes_transactions
+
+# Recherche par nom d'utilisateur : ids résolus sur default, au plus
+UTILISATEURS_RECHERCHE_MAX = 1000
+
+
+def _utilisateurs(terme):
+    return list(
+        User.objects.using(DEFAULT_DB_ALIAS).filter(username__icontains=terme.strip())
+        .values_list('pk', flat=True)[:UTILISATEURS_RECHERCHE_MAX]
+    )
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """Choix du shard affiché (sans « Tous » : une liste porte sur un seul shard)"""
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        self.shard = model_admin.shard_liste(request)
+        return [(alias, alias) for alias in shards()]
+
+    def choices(self, changelist):
+        for alias, libelle in self.lookup_choices:
+            yield {
+                'selected': alias == self.shard,
+                'query_string': changelist.get_query_string({self.parameter_name: alias}),
+                'display': libelle,
+            }
+
+    def queryset(self, request, queryset):
+        # Le routage est fait par ShardAdminMixin
+        return queryset
+
+
+class ShardAdminMixin:
+    """
+    ModelAdmin d'un modèle shardé. La liste porte sur un shard : celui choisi
+    (filtre « shard »), sinon celui de l'utilisateur filtré ou des
+    utilisateurs recherchés s'ils sont tous sur le même, sinon le premier. Un objet est cherché sur tous les
+    shards et sa page (formulaire, lignes liées, suppression) travaille sur
+    le sien. La recherche par nom d'utilisateur est résolue en user_id sur
+    default (pas de jointure vers auth_user depuis un shard).
+    """
+
+    # Pas de select_related automatique sur user : la table est sur default
+    list_select_related = ()
+    recherche_utilisateurs = True
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        if len(shards()) > 1:
+            return [ShardListFilter, *list_filter]
+        return list_filter
+
+    def shard_liste(self, request):
+        alias = request.GET.get(ShardListFilter.parameter_name)
+        if alias in shards():
+            return alias
+        user_id = request.GET.get('user__id__exact', '')
+        if user_id.isdigit():
+            return shard_pour(int(user_id))
+        terme = request.GET.get('q', '')
+        if terme and self.recherche_utilisateurs:
+            aliases = {shard_pour(user_id) for user_id in _utilisateurs(terme)}
+            if len(aliases) == 1:
+                return aliases.pop()
+        return shards()[0]
+
+    def shard_objet(self, object_id):
+        for alias in shards():
+            try:
+                if self.model._default_manager.using(alias).filter(pk=object_id).exists():
+                    return alias
+            except (ValidationError, ValueError):
+                return None
+        return None
+
+    def _dans_shard(self, alias, vue, *args, **kwargs):
+        with utiliser_shard(alias):
+            response = vue(*args, **kwargs)
+            # Rendu forcé dans le shard (TemplateResponse paresseuses)
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+    def changelist_view(self, request, extra_context=None):
+        return self._dans_shard(self.shard_liste(request), super().changelist_view, request, extra_context)
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        alias = self.shard_objet(object_id) if object_id else None
+        return self._dans_shard(alias, super().changeform_view, request, object_id, form_url, extra_context)
+
+    def delete_view(self, request, object_id, extra_context=None):
+        return self._dans_shard(self.shard_objet(object_id), super().delete_view, request, object_id, extra_context)
+
+    def history_view(self, request, object_id, extra_context=None):
+        return self._dans_shard(self.shard_objet(object_id), super().history_view, request, object_id, extra_context)
+
+    def get_search_results(self, request, queryset, search_term):
+        resultats, doublons = super().get_search_results(request, queryset, search_term)
+        if search_term and self.recherche_utilisateurs:
+            user_ids = _utilisateurs(search_term)
+            if user_ids:
+                resultats |= queryset.filter(user_id__in=user_ids)
+        return resultats, doublons
 
 
 @admin.register(Categorie)
-class CategorieAdmin(admin.ModelAdmin):
+class CategorieAdmin(ReplicaAdminMixin, admin.ModelAdmin):
     list_display = [
         'nom',
         'type_categorie',
+        'parent',
         'couleur_preview',
         'est_predefinite',
         'est_active',
@@ -17,17 +137,17 @@ class CategorieAdmin(admin.ModelAdmin):
     list_filter = ['type_categorie', 'est_predefinite', 'est_active']
     search_fields = ['nom']
     ordering = ['ordre', 'nom']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    readonly_fields = ['id', 'profondeur', 'created_at', 'updated_at']
     
     fieldsets = (
         ('Informations de base', {
-            'fields': ('nom', 'type_categorie', 'icone', 'couleur')
+            'fields': ('nom', 'type_categorie', 'parent', 'icone', 'couleur')
         }),
         ('Configuration', {
             'fields': ('est_predefinite', 'est_active', 'ordre', 'creee_par')
         }),
         ('Métadonnées', {
-            'fields': ('id', 'created_at', 'updated_at'),
+            'fields': ('id', 'profondeur', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
@@ -41,20 +161,31 @@ class CategorieAdmin(admin.ModelAdmin):
     couleur_preview.short_description = 'Couleur'
     
     def nb_transactions(self, obj):
-        """Compte le nombre de transactions associées"""
-        count = obj.transactions.count()
+        """Compte le nombre de transactions associées (tous shards)"""
+        count = sum(Transaction.objects.using(alias).filter(categorie_id=obj.pk).count() for alias in shards())
         return format_html('<strong>{}</strong>', count)
     nb_transactions.short_description = 'Transactions'
     
     actions = ['activer_categories', 'desactiver_categories']
     
+    def _changer_activation(self, queryset, est_active):
+        # update() ne déclenche pas les signaux : recopie sur les shards à la main ;
+        # updated_at change la version du catalogue des catégories prédéfinies
+        ids = list(queryset.values_list('pk', flat=True))
+        updated = Categorie.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=ids).update(
+            est_active=est_active, updated_at=timezone.now()
+        )
+        for categorie in Categorie.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=ids):
+            synchroniser_categorie(categorie)
+        return updated
+    
     def activer_categories(self, request, queryset):
-        updated = queryset.update(est_active=True)
+        updated = self._changer_activation(queryset, True)
         self.message_user(request, f"{updated} catégorie(s) activée(s).")
     activer_categories.short_description = "Activer les catégories sélectionnées"
     
     def desactiver_categories(self, request, queryset):
-        updated = queryset.update(est_active=False)
+        updated = self._changer_activation(queryset, False)
         self.message_user(request, f"{updated} catégorie(s) désactivée(s).")
     desactiver_categories.short_description = "Désactiver les catégories sélectionnées"
 
@@ -85,7 +216,7 @@ class PhotoInline(admin.TabularInline):
 
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(ShardAdminMixin, ReplicaAdminMixin, admin.ModelAdmin):
     list_display = [
         'categorie_display',
         'montant_total_display',
@@ -105,6 +236,7 @@ class TransactionAdmin(admin.ModelAdmin):
         'user'
     ]
     search_fields = ['id', 'categorie__nom', 'libelles__nom']
+    list_select_related = ['categorie']
     readonly_fields = ['id', 'created_at', 'updated_at', 'montant_total']
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
@@ -168,21 +300,34 @@ class TransactionAdmin(admin.ModelAdmin):
     actions = ['valider_transactions', 'annuler_transactions']
     
     def valider_transactions(self, request, queryset):
-        updated = queryset.update(statut='validee')
+        invalider_soldes_transactions(queryset)
+        ids = list(queryset.exclude(statut='validee').values_list('pk', flat=True))
+        updated = queryset.update(statut='validee', updated_at=timezone.now())
+        # update() ne déclenche pas les signaux : alertes de budget comme groupe.changer_statut
+        ecritures = defaultdict(list)
+        for user_id, categorie_id, date in Libelle.objects.using(queryset.db).filter(
+            transaction_id__in=ids, transaction__volet='suivi'
+        ).values_list('transaction__user_id', 'transaction__categorie_id', 'date'):
+            ecritures[user_id].append((categorie_id, date))
+        for user_id, libelles in ecritures.items():
+            evaluer_alertes(user_id, libelles)
         self.message_user(request, f"{updated} transaction(s) validée(s).")
     valider_transactions.short_description = "Valider les transactions sélectionnées"
     
     def annuler_transactions(self, request, queryset):
-        updated = queryset.update(statut='annulee')
+        invalider_soldes_transactions(queryset)
+        updated = queryset.update(statut='annulee', updated_at=timezone.now())
         self.message_user(request, f"{updated} transaction(s) annulée(s).")
     annuler_transactions.short_description = "Annuler les transactions sélectionnées"
 
 
 @admin.register(Libelle)
-class LibelleAdmin(admin.ModelAdmin):
+class LibelleAdmin(ShardAdminMixin, ReplicaAdminMixin, admin.ModelAdmin):
     list_display = ['nom', 'transaction_info', 'montant', 'date', 'created_at']
     list_filter = ['date', 'transaction__position', 'transaction__categorie']
     search_fields = ['nom', 'commentaire', 'transaction__id']
+    list_select_related = ['transaction__categorie']
+    recherche_utilisateurs = False
     readonly_fields = ['id', 'created_at', 'updated_at']
     date_hierarchy = 'date'
     
@@ -210,10 +355,12 @@ class LibelleAdmin(admin.ModelAdmin):
 
 
 @admin.register(Photo)
-class PhotoAdmin(admin.ModelAdmin):
+class PhotoAdmin(ShardAdminMixin, ReplicaAdminMixin, admin.ModelAdmin):
     list_display = ['image_preview', 'transaction_info', 'legende', 'created_at']
     list_filter = ['created_at', 'transaction__position']
     search_fields = ['legende', 'transaction__id']
+    list_select_related = ['transaction__categorie']
+    recherche_utilisateurs = False
     readonly_fields = ['id', 'created_at', 'image_preview_large']
     
     fieldsets = (
@@ -256,4 +403,94 @@ class PhotoAdmin(admin.ModelAdmin):
             obj.transaction.categorie.couleur,
             obj.transaction.categorie.nom
         )
-    transaction_info.short_description = 'Transaction'
\ No newline at end of file
+    transaction_info.short_description = 'Transaction'
+
+
+@admin.register(Recurrence)
+class RecurrenceAdmin(ShardAdminMixin, ReplicaAdminMixin, admin.ModelAdmin):
+    list_display = ['modele', 'user', 'frequence', 'intervalle', 'prochaine_echeance', 'nb_occurrences', 'est_active']
+    list_filter = ['frequence', 'est_active']
+    search_fields = ['user_id__exact']
+    raw_id_fields = ['modele']
+    readonly_fields = ['id', 'nb_occurrences', 'prochaine_echeance', 'created_at', 'updated_at']
+
+
+@admin.register(TransactionArchivee)
+class TransactionArchiveeAdmin(ShardAdminMixin, ReplicaAdminMixin, admin.ModelAdmin):
+    list_display = ['id', 'user', 'volet', 'position', 'categorie', 'statut', 'created_at', 'archivee_le']
+    list_filter = ['volet', 'position', 'statut', 'archivee_le']
+    search_fields = ['user_id__exact', 'id']
+    list_select_related = ['categorie']
+    readonly_fields = [field.name for field in TransactionArchivee._meta.fields]
+    
+    actions = ['restaurer_transactions']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def restaurer_transactions(self, request, queryset):
+        nb = restaurer(queryset.db, queryset)
+        self.message_user(request, f"{nb} transaction(s) restaurée(s).")
+    restaurer_transactions.short_description = "Restaurer les transactions sélectionnées"
+
+
+@admin.register(ResumeArchive)
+class ResumeArchiveAdmin(ShardAdminMixin, ReplicaAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'mois', 'volet', 'position', 'statut', 'categorie', 'montant', 'nb_libelles']
+    list_filter = ['volet', 'position', 'statut']
+    search_fields = ['user_id__exact']
+    list_select_related = ['categorie']
+    readonly_fields = ['user', 'mois', 'volet', 'position', 'statut', 'categorie', 'montant', 'nb_libelles']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(RegleAlerte)
+class RegleAlerteAdmin(ShardAdminMixin, ReplicaAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'categorie', 'seuils', 'est_active', 'created_at']
+    list_filter = ['est_active']
+    search_fields = ['user_id__exact', 'categorie__nom']
+    list_select_related = ['categorie']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(AlerteBudget)
+class AlerteBudgetAdmin(ShardAdminMixin, ReplicaAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'regle', 'mois', 'seuil', 'depense', 'budget', 'created_at', 'envoyee_le']
+    list_filter = ['seuil']
+    search_fields = ['user_id__exact']
+    list_select_related = ['regle__categorie']
+    readonly_fields = ['regle', 'user', 'mois', 'seuil', 'depense', 'budget', 'created_at', 'envoyee_le']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Apercu)
+class ApercuAdmin(ShardAdminMixin, ReplicaAdminMixin, admin.ModelAdmin):
+    list_display = [
+        'user', 'categorie', 'mois', 'depense_mois', 'projection_fin_mois', 'tendance',
+        'est_inhabituelle', 'calcule_le',
+    ]
+    list_filter = ['est_inhabituelle', 'mois']
+    search_fields = ['user_id__exact', 'categorie__nom']
+    list_select_related = ['categorie']
+    readonly_fields = [
+        'user', 'categorie', 'mois', 'depense_mois', 'moyenne_journaliere', 'projection_fin_mois',
+        'tendance', 'est_inhabituelle', 'score_inhabituel', 'jour_inhabituel', 'calcule_le',
+    ]
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(Releve)
+class ReleveAdmin(ShardAdminMixin, ReplicaAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'mois', 'total_revenus', 'total_depenses', 'nb_libelles', 'genere_le']
+    list_filter = ['mois']
+    search_fields = ['user_id__exact']
+    readonly_fields = ['user', 'mois', 'fichier', 'total_revenus', 'total_depenses', 'nb_libelles', 'genere_le']
+    
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,178 @@
+# backend/transactions/alertes.py
+"""
+Alertes de budget évaluées à l'écriture.
+
+Une RegleAlerte porte sur une catégorie de dépenses et ses sous-catégories.
+Quand des libellés de suivi validés du mois courant sont écrits, seules les
+règles de l'utilisateur dont la branche contient les catégories touchées
+sont réévaluées : une requête groupée par règle donne le suivi et le budget
+du mois (volets 'suivi' et 'budget'), sans balayage périodique. Les
+écritures sur d'autres mois (saisie antidatée, rattrapage, restauration
+d'archives) ne déclenchent rien.
+
+Chaque seuil franchi crée une AlerteBudget, unique par (règle, mois, seuil) :
+une alerte n'est émise qu'une fois, même si le montant repasse sous le
+seuil puis le refranchit. L'envoi passe par la file de tâches après le
+commit, via le notificateur configuré (ALERTES_NOTIFICATEUR) :
+
+- NotificateurJournal : journal applicatif (défaut) ;
+- NotificateurChannels : groupe Channels "utilisateur_<id>" ;
+- NotificateurMemoire : garde les alertes en mémoire, pour les tests.
+
+Comme invalider_soldes, evaluer_alertes est appelée par les signaux pour
+save() et explicitement par les écritures groupées.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import AlerteBudget, Categorie, Libelle, RegleAlerte
+from .sharding import shard_pour
+from .tresorerie import _instant
+
+logger = logging.getLogger(__name__)
+
+
+def ecritures_suivi(transaction, libelles):
+    """(catégorie, date) des libellés d'une transaction de suivi validée ; rien pour un budget"""
+    if transaction.volet != 'suivi' or transaction.statut != 'validee':
+        return []
+    return [(transaction.categorie_id, libelle.date) for libelle in libelles]
+
+
+def _mois_courant():
+    debut = timezone.localdate().replace(day=1)
+    return debut, (debut + timedelta(days=32)).replace(day=1)
+
+
+def evaluer_alertes(user_id, ecritures):
+    """
+    Réévalue les règles touchées par `ecritures` ((catégorie, date) de
+    libellés de suivi validés). Retourne les alertes créées.
+    """
+    if user_id is None:
+        return []
+    debut, fin = _mois_courant()
+    categories = {
+        categorie_id for categorie_id, date in ecritures
+        if categorie_id is not None and debut <= timezone.localtime(date).date() < fin
+    }
+    if not categories:
+        return []
+
+    regles = list(
+        RegleAlerte.objects.pour_utilisateur(user_id)
+        .filter(est_active=True).select_related('categorie')
+    )
+    if not regles:
+        return []
+    chemins = list(Categorie.objects.filter(pk__in=categories).values_list('chemin', flat=True))
+    regles = [
+        regle for regle in regles
+        if any(chemin.startswith(regle.categorie.chemin) for chemin in chemins)
+    ]
+
+    alias = shard_pour(user_id)
+    creees = []
+    for regle in regles:
+        totaux = Libelle.objects.using(alias).filter(
+            transaction__user_id=user_id,
+            transaction__statut='validee',
+            transaction__position='depense',
+            transaction__categorie__chemin__startswith=regle.categorie.chemin,
+            date__gte=_instant(debut),
+            date__lt=_instant(fin),
+        ).aggregate(
+            depense=Sum('montant', filter=Q(transaction__volet='suivi')),
+            budget=Sum('montant', filter=Q(transaction__volet='budget')),
+        )
+        depense, budget = totaux['depense'] or 0, totaux['budget'] or 0
+        if budget <= 0:
+            continue
+        for seuil in sorted(set(regle.seuils)):
+            if depense * 100 < seuil * budget:
+                break
+            try:
+                with db_transaction.atomic(using=alias):
+                    alerte, creee = AlerteBudget.objects.using(alias).get_or_create(
+                        regle=regle, mois=debut, seuil=seuil,
+                        defaults={'user_id': user_id, 'depense': depense, 'budget': budget},
+                    )
+            except IntegrityError:
+                # Créée au même instant par une écriture concurrente
+                continue
+            if creee:
+                creees.append(alerte)
+
+    for alerte in creees:
+        db_transaction.on_commit(
+            lambda alerte_id=alerte.pk: _mettre_en_file(user_id, alerte_id), using=alias
+        )
+    return creees
+
+
+def _mettre_en_file(user_id, alerte_id):
+    from taches.file import mettre_en_file
+
+    mettre_en_file('transactions.notifier_alerte', user_id=user_id, alerte_id=alerte_id)
+
+
+def envoyer(user_id, alerte_id):
+    """Remet une alerte au notificateur ; sans effet si elle est déjà envoyée"""
+    alerte = (
+        AlerteBudget.objects.pour_utilisateur(user_id)
+        .select_related('regle__categorie').filter(pk=alerte_id, envoyee_le__isnull=True).first()
+    )
+    if alerte is None:
+        return False
+    notificateur().envoyer(alerte)
+    AlerteBudget.objects.pour_utilisateur(user_id).filter(pk=alerte_id).update(envoyee_le=timezone.now())
+    return True
+
+
+# ========== NOTIFICATEURS ==========
+
+def message(alerte):
+    return (
+        f"{alerte.regle.categorie.nom} : {alerte.depense} dépensés sur un budget de "
+        f"{alerte.budget} ce mois-ci ({alerte.seuil} % atteints)."
+    )
+
+
+class NotificateurJournal:
+    def envoyer(self, alerte):
+        logger.info("Alerte de budget pour l'utilisateur %s : %s", alerte.user_id, message(alerte))
+
+
+class NotificateurChannels:
+    """Envoie l'alerte au groupe Channels de l'utilisateur (consommateurs WebSocket)"""
+
+    def envoyer(self, alerte):
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+
+        async_to_sync(get_channel_layer().group_send)(f"utilisateur_{alerte.user_id}", {
+            'type': 'alerte.budget',
+            'alerte': alerte.pk,
+            'categorie': str(alerte.regle.categorie_id),
+            'seuil': alerte.seuil,
+            'message': message(alerte),
+        })
+
+
+class NotificateurMemoire:
+    """Pour les tests : les alertes envoyées s'accumulent dans NotificateurMemoire.envoyees"""
+
+    envoyees = []
+
+    def envoyer(self, alerte):
+        self.envoyees.append(alerte)
+
+
+def notificateur():
+    return import_string(settings.ALERTES_NOTIFICATEUR)()
@@ -0,0 +1,178 @@
+# backend/transactions/apercus.py
+"""
+Aperçus des dépenses (calcul de nuit, servis tels quels par /apercus/).
+
+Pour chaque lot d'utilisateurs d'un shard, une seule requête groupée lit les
+dépenses de suivi validées par (utilisateur, catégorie, jour) sur les
+APERCUS_FENETRE_JOURS derniers jours. Ces totaux forment une matrice séries
+× jours (une série par couple utilisateur / catégorie) sur laquelle tout est
+calculé d'un bloc avec NumPy :
+
+- dépense inhabituelle : plus gros jour des 7 derniers, en écarts-types
+  au-dessus de la moyenne journalière des jours précédents ;
+- tendance : pente de la régression linéaire sur la fenêtre, rapportée à
+  la moyenne (variation relative sur 30 jours) ;
+- projection de fin de mois : dépensé ce mois + moyenne des 4 dernières
+  semaines × jours restants.
+
+Les lots sont répartis sur un pool de processus. Chaque lot remplace les
+aperçus de ses utilisateurs en une transaction ; les aperçus des
+utilisateurs sans dépense récente sont supprimés en fin de passe.
+"""
+import calendar
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from utils.processus import repartir
+from .models import Apercu, Libelle, Transaction
+from .sharding import shards
+from .tresorerie import _instant
+
+# Jours « récents » comparés à l'historique
+JOURS_RECENTS = 7
+# Jours du rythme de dépense projeté sur la fin du mois
+JOURS_RYTHME = 28
+
+
+def _fenetre(aujourd_hui):
+    """Premier jour de la fenêtre analysée et nombre de jours (aujourd'hui compris)"""
+    nb_jours = max(settings.APERCUS_FENETRE_JOURS, 35)
+    return aujourd_hui - timedelta(days=nb_jours - 1), nb_jours
+
+
+def _depenses(alias, user_ids, debut, fin):
+    """(user_id, categorie_id, jour, total) des dépenses de suivi validées de `debut` à `fin` inclus"""
+    return (
+        Libelle.objects.using(alias)
+        .filter(
+            transaction__user_id__in=user_ids,
+            transaction__volet='suivi',
+            transaction__statut='validee',
+            transaction__position='depense',
+            date__gte=_instant(debut),
+            date__lt=_instant(fin + timedelta(days=1)),
+        )
+        .annotate(jour=TruncDate('date'))
+        .values_list('transaction__user_id', 'transaction__categorie_id', 'jour')
+        .annotate(total=Sum('montant'))
+        .order_by()
+    )
+
+
+def calculer(matrice, aujourd_hui, seuil):
+    """
+    Indicateurs de chaque série (ligne de `matrice`, colonnes = jours jusqu'à
+    aujourd'hui compris), en opérations vectorisées. Retourne un dict de
+    tableaux alignés sur les lignes.
+    """
+    nb_jours = matrice.shape[1]
+    historique, recents = matrice[:, :-JOURS_RECENTS], matrice[:, -JOURS_RECENTS:]
+
+    moyenne = historique.mean(axis=1)
+    ecart_type = historique.std(axis=1)
+    pic = recents.max(axis=1)
+    score = np.divide(pic - moyenne, ecart_type, out=np.zeros_like(moyenne), where=ecart_type > 0)
+    inhabituelle = (score >= seuil) & (pic > 0)
+    jour_pic = nb_jours - JOURS_RECENTS + recents.argmax(axis=1)
+
+    x = np.arange(nb_jours) - (nb_jours - 1) / 2
+    moyenne_fenetre = matrice.mean(axis=1)
+    pente = (matrice - moyenne_fenetre[:, None]) @ x / (x @ x)
+    tendance = np.divide(
+        pente * 30, moyenne_fenetre, out=np.full_like(moyenne_fenetre, np.nan), where=moyenne_fenetre > 0
+    )
+
+    jour_du_mois = aujourd_hui.day
+    jours_restants = calendar.monthrange(aujourd_hui.year, aujourd_hui.month)[1] - jour_du_mois
+    depense_mois = matrice[:, -jour_du_mois:].sum(axis=1)
+    rythme = matrice[:, -JOURS_RYTHME:].mean(axis=1)
+
+    return {
+        'depense_mois': depense_mois,
+        'moyenne_journaliere': rythme,
+        'projection_fin_mois': depense_mois + rythme * jours_restants,
+        'tendance': tendance,
+        'est_inhabituelle': inhabituelle,
+        'score_inhabituel': score,
+        'jour_pic': jour_pic,
+    }
+
+
+def _montant(valeur):
+    return Decimal(f"{valeur:.2f}")
+
+
+def calculer_lot(alias, user_ids, aujourd_hui=None):
+    """Recalcule les aperçus d'un lot d'utilisateurs d'un shard. Retourne le nombre d'aperçus écrits."""
+    aujourd_hui = aujourd_hui or timezone.localdate()
+    debut, nb_jours = _fenetre(aujourd_hui)
+
+    series, lignes, colonnes, totaux = {}, [], [], []
+    for user_id, categorie_id, jour, total in _depenses(alias, user_ids, debut, aujourd_hui).iterator(chunk_size=5000):
+        lignes.append(series.setdefault((user_id, categorie_id), len(series)))
+        colonnes.append((jour - debut).days)
+        totaux.append(total)
+    matrice = np.zeros((len(series), nb_jours))
+    if series:
+        np.add.at(matrice, (np.array(lignes), np.array(colonnes)), np.array(totaux, dtype=float))
+
+    indicateurs = calculer(matrice, aujourd_hui, settings.APERCUS_SEUIL_INHABITUEL)
+    mois = aujourd_hui.replace(day=1)
+    apercus = []
+    for rang, (user_id, categorie_id) in enumerate(series):
+        tendance = indicateurs['tendance'][rang]
+        inhabituelle = bool(indicateurs['est_inhabituelle'][rang])
+        apercus.append(Apercu(
+            user_id=user_id,
+            categorie_id=categorie_id,
+            mois=mois,
+            depense_mois=_montant(indicateurs['depense_mois'][rang]),
+            moyenne_journaliere=_montant(indicateurs['moyenne_journaliere'][rang]),
+            projection_fin_mois=_montant(indicateurs['projection_fin_mois'][rang]),
+            tendance=None if np.isnan(tendance) else round(float(tendance), 4),
+            est_inhabituelle=inhabituelle,
+            score_inhabituel=round(float(indicateurs['score_inhabituel'][rang]), 2),
+            jour_inhabituel=debut + timedelta(days=int(indicateurs['jour_pic'][rang])) if inhabituelle else None,
+        ))
+
+    with db_transaction.atomic(using=alias):
+        Apercu.objects.using(alias).filter(user_id__in=user_ids).delete()
+        Apercu.objects.using(alias).bulk_create(apercus, batch_size=1000)
+    return len(apercus)
+
+
+def _lots(alias, debut, taille_lot):
+    user_ids = sorted(set(
+        Transaction.objects.using(alias)
+        .filter(volet='suivi', libelles__date__gte=_instant(debut))
+        .values_list('user_id', flat=True).distinct()
+    ))
+    return [user_ids[i:i + taille_lot] for i in range(0, len(user_ids), taille_lot)]
+
+
+def calculer_tous_apercus(processus=None, taille_lot=None):
+    """
+    Recalcule les aperçus de tous les utilisateurs ayant dépensé dans la
+    fenêtre, par lots répartis sur `processus` processus (1 = sur place).
+    Retourne le nombre d'aperçus écrits.
+    """
+    processus = settings.APERCUS_PROCESSUS if processus is None else processus
+    taille_lot = taille_lot or settings.APERCUS_TAILLE_LOT
+    aujourd_hui = timezone.localdate()
+    debut, _ = _fenetre(aujourd_hui)
+    debut_passe = timezone.now()
+
+    travaux = [(alias, lot, aujourd_hui) for alias in shards() for lot in _lots(alias, debut, taille_lot)]
+    total = sum(repartir(calculer_lot, travaux, processus))
+
+    # Utilisateurs sans dépense récente : plus d'aperçu
+    for alias in shards():
+        Apercu.objects.using(alias).filter(calcule_le__lt=debut_passe).delete()
+    return total
@@ -0,0 +1,217 @@
+# backend/transactions/archives.py
+"""
+Archivage des transactions anciennes dans des tables froides du même shard
+(TransactionArchivee, LibelleArchive, PhotoArchivee), mêmes identifiants.
+
+Une transaction est archivable quand son dernier libellé (à défaut sa date de
+création) précède le début du mois situé ARCHIVE_AGE_MOIS mois en arrière.
+Les modèles de récurrence restent en table chaude. Chaque lot est copié puis
+supprimé dans une même transaction SQL, et ResumeArchive conserve par mois,
+catégorie et statut le montant et le nombre de libellés archivés : la
+trésorerie et les instantanés de solde en tiennent compte, l'archivage ne
+change donc aucun total (aucun instantané invalidé).
+
+Pour les clients hors ligne, archiver n'est pas supprimer : aucune trace
+(Suppression) n'est gardée. Les fichiers des photos restent en place. La
+restauration fait le chemin inverse, avec updated_at remis à maintenant pour
+que /sync/ renvoie les lignes restaurées.
+"""
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import router, transaction as db_transaction
+from django.db.models import Exists, Max, OuterRef
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from utils.dates import ajouter_mois
+from .models import (
+    Transaction, Libelle, Photo, Recurrence, Suppression,
+    TransactionArchivee, LibelleArchive, PhotoArchivee, ResumeArchive
+)
+from .sharding import shards
+from .suggestions import sans_indexation
+from .tresorerie import sans_invalidation
+
+# Champs recopiés tels quels entre table chaude et table froide
+CHAMPS_TRANSACTION = [
+    'id', 'user_id', 'volet', 'position', 'categorie_id', 'statut', 'devise',
+    'recurrence_id', 'echeance', 'created_at', 'updated_at'
+]
+CHAMPS_LIBELLE = ['id', 'transaction_id', 'nom', 'date', 'montant', 'commentaire', 'created_at', 'updated_at']
+CHAMPS_PHOTO = ['id', 'transaction_id', 'legende', 'created_at', 'updated_at']
+
+
+def limite_archivage(age_mois=None):
+    """Début du mois situé `age_mois` mois (défaut ARCHIVE_AGE_MOIS) avant le mois courant"""
+    age = settings.ARCHIVE_AGE_MOIS if age_mois is None else age_mois
+    mois = ajouter_mois(timezone.localdate().replace(day=1), -age)
+    return timezone.make_aware(datetime.combine(mois, time.min))
+
+
+def archivables(alias, limite):
+    """Transactions d'un shard entièrement antérieures à `limite` (hors modèles de récurrence)"""
+    return (
+        Transaction.objects.using(alias)
+        .annotate(derniere_date=Coalesce(Max('libelles__date'), 'created_at'))
+        .filter(derniere_date__lt=limite)
+        .filter(~Exists(Recurrence.objects.filter(modele=OuterRef('pk'))))
+    )
+
+
+def _copie(objet, modele, champs, **valeurs):
+    return modele(**{champ: getattr(objet, champ) for champ in champs}, **valeurs)
+
+
+def _resumes(transactions):
+    """Montant et nombre de libellés par (user, mois, volet, position, statut, catégorie)"""
+    resumes = defaultdict(lambda: [Decimal('0.00'), 0])
+    for transaction in transactions:
+        for libelle in transaction.libelles.all():
+            mois = timezone.localtime(libelle.date).date().replace(day=1)
+            cle = (
+                transaction.user_id, mois, transaction.volet,
+                transaction.position, transaction.statut, transaction.categorie_id
+            )
+            resumes[cle][0] += libelle.montant
+            resumes[cle][1] += 1
+    return resumes
+
+
+def _cumuler_resumes(alias, resumes, signe):
+    """Ajoute (signe=1) ou retire (signe=-1) des montants aux ResumeArchive ; les résumés vidés sont supprimés"""
+    if not resumes:
+        return
+    existants = {
+        (resume.user_id, resume.mois, resume.volet, resume.position, resume.statut, resume.categorie_id): resume
+        for resume in ResumeArchive.objects.using(alias).filter(
+            user_id__in={cle[0] for cle in resumes},
+            mois__in={cle[1] for cle in resumes},
+        )
+    }
+    nouveaux, modifies, vides = [], [], []
+    for cle, (montant, nombre) in resumes.items():
+        resume = existants.get(cle)
+        if resume is None:
+            if signe > 0:
+                user_id, mois, volet, position, statut, categorie_id = cle
+                nouveaux.append(ResumeArchive(
+                    user_id=user_id, mois=mois, volet=volet, position=position,
+                    statut=statut, categorie_id=categorie_id, montant=montant, nb_libelles=nombre,
+                ))
+            continue
+        resume.montant += signe * montant
+        resume.nb_libelles += signe * nombre
+        if resume.nb_libelles > 0:
+            modifies.append(resume)
+        else:
+            vides.append(resume.pk)
+
+    ResumeArchive.objects.using(alias).bulk_create(nouveaux, batch_size=500)
+    ResumeArchive.objects.using(alias).bulk_update(modifies, ['montant', 'nb_libelles'], batch_size=500)
+    ResumeArchive.objects.using(alias).filter(pk__in=vides).delete()
+
+
+def _archiver_lot(alias, limite, ids):
+    with db_transaction.atomic(using=alias), \
+            db_transaction.atomic(using=router.db_for_write(Suppression)), \
+            sans_invalidation(), sans_indexation():
+        # Relu dans la transaction : un libellé récent ou une récurrence ajoutés entre-temps excluent la ligne
+        transactions = list(archivables(alias, limite).filter(pk__in=ids).prefetch_related('libelles', 'photos'))
+        ids = [transaction.pk for transaction in transactions]
+        libelles = [
+            _copie(libelle, LibelleArchive, CHAMPS_LIBELLE)
+            for transaction in transactions for libelle in transaction.libelles.all()
+        ]
+        photos = [
+            _copie(photo, PhotoArchivee, CHAMPS_PHOTO, image=photo.image.name)
+            for transaction in transactions for photo in transaction.photos.all()
+        ]
+        TransactionArchivee.objects.using(alias).bulk_create(
+            [_copie(transaction, TransactionArchivee, CHAMPS_TRANSACTION) for transaction in transactions],
+            batch_size=500
+        )
+        LibelleArchive.objects.using(alias).bulk_create(libelles, batch_size=500)
+        PhotoArchivee.objects.using(alias).bulk_create(photos, batch_size=500)
+        _cumuler_resumes(alias, _resumes(transactions), 1)
+
+        Transaction.objects.using(alias).filter(pk__in=ids).delete()
+        Suppression.objects.filter(modele='transaction', objet_id__in=ids).delete()
+    return len(transactions), len(libelles)
+
+
+def archiver(alias, limite, taille_lot=500, dry_run=False):
+    """
+    Archive par lots les transactions d'un shard antérieures à `limite`.
+    Retourne (transactions, libellés) archivés (ou archivables avec dry_run).
+    """
+    candidats = archivables(alias, limite)
+    if dry_run:
+        ids = list(candidats.values_list('pk', flat=True))
+        return len(ids), Libelle.objects.using(alias).filter(transaction_id__in=ids).count()
+
+    total_transactions = total_libelles = 0
+    while True:
+        ids = list(candidats.order_by('pk').values_list('pk', flat=True)[:taille_lot])
+        if not ids:
+            break
+        nb_transactions, nb_libelles = _archiver_lot(alias, limite, ids)
+        if nb_transactions == 0:
+            break
+        total_transactions += nb_transactions
+        total_libelles += nb_libelles
+    return total_transactions, total_libelles
+
+
+def archiver_toutes(age_mois=None):
+    """Archive sur tous les shards. Retourne le nombre de transactions archivées."""
+    limite = limite_archivage(age_mois)
+    return sum(archiver(alias, limite)[0] for alias in shards())
+
+
+def _inserer(modele, objets, alias):
+    """bulk_create en conservant created_at (écrasé par auto_now_add) ; updated_at = maintenant"""
+    creations = [objet.created_at for objet in objets]
+    modele.objects.using(alias).bulk_create(objets, batch_size=500)
+    for objet, created_at in zip(objets, creations):
+        objet.created_at = created_at
+    modele.objects.using(alias).bulk_update(objets, ['created_at'], batch_size=500)
+
+
+def _restaurer_lot(alias, ids):
+    with db_transaction.atomic(using=alias), sans_invalidation():
+        archivees = list(
+            TransactionArchivee.objects.using(alias).filter(pk__in=ids).prefetch_related('libelles', 'photos')
+        )
+        # Une récurrence supprimée entre-temps : l'occurrence revient détachée
+        recurrences = set(
+            Recurrence.objects.using(alias)
+            .filter(pk__in={archive.recurrence_id for archive in archivees if archive.recurrence_id})
+            .values_list('pk', flat=True)
+        )
+        transactions = []
+        for archive in archivees:
+            transaction = _copie(archive, Transaction, CHAMPS_TRANSACTION)
+            if transaction.recurrence_id not in recurrences:
+                transaction.recurrence_id = None
+            transactions.append(transaction)
+        _inserer(Transaction, transactions, alias)
+        _inserer(Libelle, [
+            _copie(libelle, Libelle, CHAMPS_LIBELLE)
+            for archive in archivees for libelle in archive.libelles.all()
+        ], alias)
+        _inserer(Photo, [
+            _copie(photo, Photo, CHAMPS_PHOTO, image=photo.image.name)
+            for archive in archivees for photo in archive.photos.all()
+        ], alias)
+        _cumuler_resumes(alias, _resumes(archivees), -1)
+        TransactionArchivee.objects.using(alias).filter(pk__in=[archive.pk for archive in archivees]).delete()
+    return len(archivees)
+
+
+def restaurer(alias, archives, taille_lot=500):
+    """Remet en table chaude, par lots, les transactions archivées du queryset `archives`. Retourne leur nombre."""
+    ids = list(archives.using(alias).order_by('pk').values_list('pk', flat=True))
+    return sum(_restaurer_lot(alias, ids[i:i + taille_lot]) for i in range(0, len(ids), taille_lot))
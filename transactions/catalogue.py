@@ -0,0 +1,67 @@
+# backend/transactions/catalogue.py
+"""
+Catalogue des catégories prédéfinies actives, partagé par tous les utilisateurs.
+
+Chaque processus garde en mémoire les catégories, leur forme sérialisée
+(réponse de /categories/predefinies/) et son ETag (empreinte du contenu,
+identique d'un processus à l'autre). Sa version est lue en base à chaque
+accès : nombre de catégories prédéfinies et dernier updated_at. Toute
+modification (API, administration, shell, autre worker) change l'un ou
+l'autre, et chaque processus recharge son catalogue à la lecture suivante.
+
+Les écritures de transactions valident une catégorie prédéfinie sans
+requête ; seules les catégories personnalisées sont lues en base.
+"""
+import copy
+import hashlib
+import json
+import threading
+from collections import namedtuple
+
+from django.db.models import Count, Max
+
+from .models import Categorie
+
+Catalogue = namedtuple('Catalogue', ['version', 'categories', 'donnees', 'etag'])
+
+_verrou = threading.Lock()
+_catalogue = None
+
+
+def version():
+    """Version du catalogue en base (une catégorie qui cesse d'être prédéfinie change le nombre)"""
+    agregat = Categorie.objects.filter(est_predefinite=True).aggregate(nombre=Count('pk'), maj=Max('updated_at'))
+    return agregat['nombre'], agregat['maj']
+
+
+def predefinies():
+    """Catalogue courant (catégories par id, données sérialisées, ETag)"""
+    global _catalogue
+    from .serializers import CategorieSerializer
+
+    # Lue avant les catégories : une écriture concurrente donne au pire un rechargement de plus
+    actuelle = version()
+    catalogue = _catalogue
+    if catalogue is not None and catalogue.version == actuelle:
+        return catalogue
+    with _verrou:
+        if _catalogue is not None and _catalogue.version == actuelle:
+            return _catalogue
+        categories = list(Categorie.objects.filter(est_predefinite=True, est_active=True))
+        donnees = CategorieSerializer(categories, many=True).data
+        contenu = json.dumps(donnees, sort_keys=True, default=str).encode()
+        _catalogue = Catalogue(
+            version=actuelle,
+            categories={categorie.pk: categorie for categorie in categories},
+            donnees=donnees,
+            etag=f'"{hashlib.sha256(contenu).hexdigest()[:32]}"',
+        )
+        return _catalogue
+
+
+def categorie_active(categorie_id):
+    """Catégorie active (copie de celle du catalogue si prédéfinie) ; Categorie.DoesNotExist sinon"""
+    categorie = predefinies().categories.get(categorie_id)
+    if categorie is not None:
+        return copy.copy(categorie)
+    return Categorie.objects.get(id=categorie_id, est_active=True)
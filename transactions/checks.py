@@ -0,0 +1,25 @@
+# backend/transactions/checks.py
+"""Vérifications au démarrage (manage.py check, runserver, lancer_taches)"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+CACHE_LOCAL = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def cache_local():
+    return settings.CACHES['default']['BACKEND'] == CACHE_LOCAL
+
+
+@register(Tags.caches)
+def verifier_cache_partage(app_configs, **kwargs):
+    """Hors DEBUG, plusieurs processus écrivent (workers web, lancer_taches) : un cache par processus ne suffit pas"""
+    if settings.DEBUG or not cache_local():
+        return []
+    return [Warning(
+        "Le cache par défaut (LocMemCache) est propre à chaque processus : ce qu'un "
+        "worker met en cache ou invalide (utilisateurs JWT, révocations, versions des "
+        "suggestions, ...) n'est pas vu des autres.",
+        hint="Configurer CACHE_BACKEND / CACHE_LOCATION vers un cache partagé "
+             "(ex: django.core.cache.backends.filebased.FileBasedCache).",
+        id='transactions.W001',
+    )]
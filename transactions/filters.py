@@ -0,0 +1,96 @@
+# backend/transactions/filters.py
+"""
+Filtres de la liste des transactions (et des archives).
+
+Les bornes sur les libellés (montant_min / montant_max, date_debut /
+date_fin) forment une seule sous-requête EXISTS : une transaction est
+retenue si UN de ses libellés les respecte toutes, sans jointure ni
+DISTINCT (aucun doublon quand plusieurs libellés correspondent). Elle suit
+l'index (transaction, date, montant) des libellés, sans lire la table.
+
+total_min / total_max bornent la somme des libellés (0 sans libellé),
+calculée en sous-requête comme dans projections.annoter_agregats_libelles.
+
+branche retient une catégorie et toutes ses sous-catégories (préfixe du
+chemin, voir hierarchie.py).
+"""
+from datetime import timedelta
+
+from django.db.models import DecimalField, Exists, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django_filters import rest_framework as filters
+
+from .models import Categorie, Transaction, Libelle, TransactionArchivee, LibelleArchive
+from .tresorerie import _instant
+
+# Paramètre -> lookup sur le libellé
+BORNES_LIBELLE = {
+    'montant_min': 'montant__gte',
+    'montant_max': 'montant__lte',
+    'date_debut': 'date__gte',
+    'date_fin': 'date__lt',
+}
+
+
+class TransactionFilter(filters.FilterSet):
+    montant_min = filters.NumberFilter(method='filtrer_libelles', label="Montant minimum d'un libellé")
+    montant_max = filters.NumberFilter(method='filtrer_libelles', label="Montant maximum d'un libellé")
+    date_debut = filters.DateFilter(method='filtrer_libelles', label="Libellé daté à partir du")
+    date_fin = filters.DateFilter(method='filtrer_libelles', label="Libellé daté jusqu'au (inclus)")
+    total_min = filters.NumberFilter(method='filtrer_total', label="Total minimum")
+    total_max = filters.NumberFilter(method='filtrer_total', label="Total maximum")
+    branche = filters.UUIDFilter(method='filtrer_branche', label="Catégorie et ses sous-catégories")
+
+    modele_libelle = Libelle
+
+    class Meta:
+        model = Transaction
+        fields = ['volet', 'position', 'statut', 'categorie']
+
+    def filtrer_libelles(self, queryset, name, value):
+        # Appliquées ensemble dans filter_queryset : un même libellé doit respecter toutes les bornes
+        return queryset
+
+    def filtrer_total(self, queryset, name, value):
+        lookup = 'total_libelles__gte' if name == 'total_min' else 'total_libelles__lte'
+        if 'total_libelles' not in queryset.query.annotations:
+            totaux = (
+                self.modele_libelle.objects.filter(transaction=OuterRef('pk'))
+                .order_by().values('transaction').annotate(total=Sum('montant')).values('total')
+            )
+            queryset = queryset.alias(total_libelles=Coalesce(
+                Subquery(totaux), Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)
+            ))
+        return queryset.filter(**{lookup: value})
+
+    def filtrer_branche(self, queryset, name, value):
+        chemin = Categorie.objects.filter(pk=value).values_list('chemin', flat=True).first()
+        if chemin is None:
+            return queryset.none()
+        return queryset.filter(categorie__chemin__startswith=chemin)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        conditions = {}
+        for parametre, lookup in BORNES_LIBELLE.items():
+            valeur = self.form.cleaned_data.get(parametre)
+            if valeur is None:
+                continue
+            if parametre == 'date_debut':
+                valeur = _instant(valeur)
+            elif parametre == 'date_fin':
+                valeur = _instant(valeur + timedelta(days=1))
+            conditions[lookup] = valeur
+        if conditions:
+            queryset = queryset.filter(Exists(
+                self.modele_libelle.objects.filter(transaction=OuterRef('pk'), **conditions)
+            ))
+        return queryset
+
+
+class TransactionArchiveeFilter(TransactionFilter):
+    modele_libelle = LibelleArchive
+
+    class Meta:
+        model = TransactionArchivee
+        fields = ['volet', 'position', 'statut', 'categorie']
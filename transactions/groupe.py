@@ -0,0 +1,67 @@
+# backend/transactions/groupe.py
+"""
+Opérations groupées sur les transactions d'un utilisateur : changement de
+statut, changement de catégorie, suppression.
+
+La sélection (liste d'ids ou filtre de la liste des transactions) est
+résolue une fois en ids, toujours restreinte à l'utilisateur et limitée à
+GROUPE_MAX_TRANSACTIONS. Chaque opération est ensuite un seul update() ou
+delete() sur ces ids, dans une transaction SQL du shard de l'utilisateur.
+
+update() ne déclenchant pas les signaux, les données dérivées sont tenues à
+jour ici comme pour les lots (lot.py) : instantanés de solde
+(invalider_soldes_transactions), index d'autocomplétion (catégorie du
+dernier usage) et alertes de budget. updated_at est posé pour que /sync/
+renvoie les transactions modifiées. delete() passe par les signaux
+(soldes, index, traces de suppression).
+"""
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .alertes import evaluer_alertes
+from .models import Libelle, Transaction
+from .sharding import shard_pour
+from .suggestions import indexer_libelles, usage
+from .tresorerie import invalider_soldes_transactions
+
+
+def _alerter(user_id, ids):
+    evaluer_alertes(user_id, list(
+        Libelle.objects.filter(transaction_id__in=ids, transaction__volet='suivi', transaction__statut='validee')
+        .values_list('transaction__categorie_id', 'date')
+    ))
+
+
+def changer_statut(user_id, ids, statut):
+    """Passe les transactions `ids` de l'utilisateur au statut `statut`. Retourne le nombre modifié."""
+    transactions = Transaction.objects.filter(user_id=user_id, pk__in=ids).exclude(statut=statut)
+    with db_transaction.atomic(using=shard_pour(user_id)):
+        invalider_soldes_transactions(transactions)
+        nb = transactions.update(statut=statut, updated_at=timezone.now())
+        if nb and statut == 'validee':
+            _alerter(user_id, ids)
+    return nb
+
+
+def recategoriser(user_id, ids, categorie):
+    """Range les transactions `ids` de l'utilisateur dans `categorie`. Retourne le nombre modifié."""
+    transactions = Transaction.objects.filter(user_id=user_id, pk__in=ids).exclude(categorie=categorie)
+    with db_transaction.atomic(using=shard_pour(user_id)):
+        libelles = list(Libelle.objects.filter(transaction__in=transactions).only('nom', 'date', 'montant'))
+        nb = transactions.update(categorie=categorie, updated_at=timezone.now())
+        if nb:
+            # Même nombre d'utilisations, la catégorie du dernier usage suit
+            indexer_libelles(
+                user_id,
+                ajouts=[usage(libelle, categorie.pk) for libelle in libelles],
+                retraits=[libelle.nom for libelle in libelles],
+            )
+            _alerter(user_id, ids)
+    return nb
+
+
+def supprimer(user_id, ids):
+    """Supprime les transactions `ids` de l'utilisateur (libellés et photos compris). Retourne leur nombre."""
+    with db_transaction.atomic(using=shard_pour(user_id)):
+        _, par_modele = Transaction.objects.filter(user_id=user_id, pk__in=ids).delete()
+    return par_modele.get(Transaction._meta.label, 0)
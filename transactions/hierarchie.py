@@ -0,0 +1,118 @@
+# backend/transactions/hierarchie.py
+"""
+Hiérarchie des catégories ("Santé › Pharmacie") par chemins matérialisés.
+
+Chaque catégorie porte `chemin` : les identifiants (hex + '/', SEGMENT
+caractères chacun) de ses ancêtres puis le sien, depuis la racine, et sa
+`profondeur` (0 pour une racine). Les sous-arbres sont donc des préfixes :
+
+- descendants d'une catégorie : chemin__startswith=categorie.chemin ;
+- ancêtre de niveau n (1 = racine) : Substr(chemin, 1, n * SEGMENT).
+
+Un cumul par branche est un seul GROUP BY sur Substr(categorie__chemin),
+sans récursion ni table de liaison. Comme les autres champs, le chemin est
+recopié sur les shards avec la catégorie, les jointures restent locales.
+
+Le chemin est calculé à l'enregistrement (signal pre_save). Un déplacement
+réécrit ceux du sous-arbre en une requête UPDATE par base (default et
+shards). Les catégories prédéfinies restent partagées : elles ne peuvent
+avoir qu'un parent prédéfini, une catégorie personnalisée peut se ranger
+sous une prédéfinie.
+"""
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Concat, Substr
+from django.utils import timezone
+
+from .models import Categorie
+from .sharding import shards
+
+SEGMENT = 33
+
+
+def segment(categorie_id):
+    return f"{categorie_id.hex}/"
+
+
+def preparer_chemin(categorie):
+    """Calcule chemin et profondeur avant enregistrement ; mémorise l'ancien chemin si la catégorie change de parent"""
+    precedent = None
+    if not categorie._state.adding:
+        precedent = Categorie.objects.filter(pk=categorie.pk).values_list('chemin', flat=True).first()
+    prefixe = ''
+    if categorie.parent_id:
+        prefixe = Categorie.objects.filter(pk=categorie.parent_id).values_list('chemin', flat=True).first() or ''
+    categorie.chemin = prefixe + segment(categorie.pk)
+    categorie.profondeur = len(categorie.chemin) // SEGMENT - 1
+    categorie._chemin_precedent = precedent if precedent and precedent != categorie.chemin else None
+
+
+def deplacer_sous_arbre(ancien, nouveau):
+    """Réécrit les chemins des descendants d'une catégorie déplacée, sur default et chaque shard"""
+    decalage = (len(nouveau) - len(ancien)) // SEGMENT
+    for alias in dict.fromkeys([DEFAULT_DB_ALIAS, *shards()]):
+        Categorie.objects.using(alias).filter(chemin__startswith=ancien).exclude(chemin=ancien).update(
+            chemin=Concat(Value(nouveau), Substr('chemin', len(ancien) + 1)),
+            profondeur=F('profondeur') + decalage,
+            # Les clients hors ligne relisent la nouvelle profondeur
+            updated_at=timezone.now(),
+        )
+
+
+def hauteur(categorie):
+    """Nombre de niveaux sous la catégorie (0 pour une feuille)"""
+    if categorie.pk is None or not categorie.chemin:
+        return 0
+    plus_profond = (
+        Categorie.objects.filter(chemin__startswith=categorie.chemin)
+        .aggregate(profondeur=Max('profondeur'))['profondeur']
+    )
+    return (plus_profond or categorie.profondeur) - categorie.profondeur
+
+
+def erreur_parent(categorie, parent):
+    """Message d'erreur si `parent` ne peut pas accueillir `categorie`, sinon None"""
+    if parent is None:
+        return None
+    if categorie.est_predefinite and not parent.est_predefinite:
+        return "Une catégorie prédéfinie ne peut être rangée que sous une catégorie prédéfinie."
+    if parent.type_categorie != categorie.type_categorie:
+        return "La catégorie parente doit être du même type."
+    if categorie.pk is not None and categorie.chemin and parent.chemin.startswith(categorie.chemin):
+        return "Une catégorie ne peut pas être rangée sous elle-même ou sous une de ses sous-catégories."
+    if parent.profondeur + 1 + hauteur(categorie) >= Categorie.PROFONDEUR_MAX:
+        return f"La hiérarchie est limitée à {Categorie.PROFONDEUR_MAX} niveaux."
+    return None
+
+
+def cumuler_par_branche(transactions, niveau):
+    """
+    Totaux des libellés et nombre de transactions par branche de niveau
+    `niveau` (1 = catégories racines), en une requête groupée. Une
+    catégorie moins profonde que `niveau` forme sa propre branche.
+    """
+    lignes = list(
+        transactions
+        .annotate(branche=Substr('categorie__chemin', 1, niveau * SEGMENT))
+        .values('branche')
+        .annotate(total=Sum('libelles__montant'), nombre=Count('id', distinct=True))
+        .order_by('-total')
+    )
+    categories = {
+        categorie['chemin']: categorie
+        for categorie in Categorie.objects.filter(chemin__in=[ligne['branche'] for ligne in lignes])
+        .values('id', 'chemin', 'nom', 'couleur', 'icone', 'profondeur')
+    }
+    resultat = []
+    for ligne in lignes:
+        categorie = categories.get(ligne['branche'], {})
+        resultat.append({
+            'categorie': categorie.get('id'),
+            'categorie__nom': categorie.get('nom'),
+            'categorie__couleur': categorie.get('couleur'),
+            'categorie__icone': categorie.get('icone'),
+            'profondeur': categorie.get('profondeur'),
+            'total': ligne['total'],
+            'nombre': ligne['nombre'],
+        })
+    return resultat
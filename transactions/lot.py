@@ -0,0 +1,368 @@
+# backend/transactions/lot.py
+"""
+Application d'un lot ordonné d'opérations (create / update / delete) sur les
+transactions et libellés, envoyé par un client hors ligne.
+
+Tout le lot est validé puis appliqué dans une seule transaction SQL avec des
+requêtes groupées (bulk_create, bulk_update, un DELETE par modèle). Chaque
+opération porte une clé d'idempotence : une clé déjà appliquée renvoie le
+résultat enregistré sans rien réécrire, ce qui rend les renvois sans effet,
+y compris deux renvois concurrents (le perdant rejoue le résultat du gagnant).
+Si une opération est invalide, rien n'est appliqué.
+"""
+import hashlib
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction as db_transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .models import Categorie, Transaction, Libelle, CleIdempotence
+from .serializers import LibelleSerializer, TransactionCreateSerializer, TransactionSerializer
+from .sharding import shard_pour
+from .alertes import evaluer_alertes
+from .catalogue import predefinies
+from .suggestions import indexer_libelles, usage
+from .tresorerie import invalider_soldes
+
+
+def _empreinte(operation):
+    contenu = {champ: operation.get(champ) for champ in ('op', 'type', 'id', 'data')}
+    return hashlib.sha256(json.dumps(contenu, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _categories_accessibles(user, operations):
+    ids = {
+        operation['data'].get('categorie_id') for operation in operations
+        if operation['type'] == 'transaction' and operation['data'].get('categorie_id')
+    }
+    valides = set()
+    for valeur in ids:
+        try:
+            valides.add(uuid.UUID(str(valeur)))
+        except ValueError:
+            continue
+    accessibles = valides & predefinies().categories.keys()
+    if valides - accessibles:
+        accessibles.update(
+            Categorie.objects.filter(id__in=valides - accessibles, est_active=True, creee_par=user)
+            .values_list('id', flat=True)
+        )
+    return accessibles
+
+
+class _Lot:
+    """État de travail d'un lot en cours de validation"""
+
+    def __init__(self, user, operations, context):
+        self.user = user
+        self.operations = operations
+        self.maintenant = timezone.now()
+
+        ids = {'transaction': set(), 'libelle': set()}
+        for operation in operations:
+            if operation.get('id'):
+                ids[operation['type']].add(operation['id'])
+            if operation['type'] == 'libelle' and operation['data'].get('transaction_id'):
+                try:
+                    ids['transaction'].add(uuid.UUID(str(operation['data']['transaction_id'])))
+                except ValueError:
+                    pass
+
+        # Un seul aller-retour par modèle pour tout le lot
+        self.transactions = {
+            transaction.pk: transaction
+            for transaction in Transaction.objects.filter(user=user, pk__in=ids['transaction'])
+        }
+        self.libelles = {
+            libelle.pk: libelle
+            for libelle in Libelle.objects.filter(transaction__user=user, pk__in=ids['libelle'])
+        }
+        # Identifiants fournis pour des créations mais déjà pris (par n'importe qui)
+        self.ids_pris = set(
+            Transaction.objects.filter(pk__in=ids['transaction']).exclude(
+                pk__in=self.transactions.keys()
+            ).values_list('pk', flat=True)
+        ) | set(
+            Libelle.objects.filter(pk__in=ids['libelle']).exclude(
+                pk__in=self.libelles.keys()
+            ).values_list('pk', flat=True)
+        )
+
+        self.context = {**context, 'categories_accessibles': _categories_accessibles(user, operations)}
+
+        self.nouvelles_transactions = []
+        self.nouveaux_libelles = []
+        self.transactions_modifiees = {}
+        self.libelles_modifies = {}
+        self.champs_transactions = set()
+        self.champs_libelles = set()
+        self.transactions_supprimees = set()
+        self.libelles_supprimes = set()
+        # Dates des libellés touchés, pour invalider les instantanés de solde
+        self.dates_touchees = []
+        # Nom en base des libellés modifiés, à retirer de l'index d'autocomplétion
+        self.noms_initiaux = {}
+
+    # ----- validation de chaque opération -----
+
+    def preparer(self, operation):
+        """Valide et prépare une opération. Retourne (id, erreurs)."""
+        methode = getattr(self, f"_{operation['op']}_{operation['type']}")
+        return methode(operation)
+
+    def _nouvel_id(self, operation):
+        identifiant = operation.get('id') or uuid.uuid4()
+        if identifiant in self.ids_pris or identifiant in self.transactions or identifiant in self.libelles:
+            return None
+        return identifiant
+
+    def _create_transaction(self, operation):
+        identifiant = self._nouvel_id(operation)
+        if identifiant is None:
+            return None, {'id': ["Cet identifiant existe déjà."]}
+        serializer = TransactionCreateSerializer(data=operation['data'], context=self.context)
+        if not serializer.is_valid():
+            return None, serializer.errors
+
+        donnees = dict(serializer.validated_data)
+        libelles = donnees.pop('libelles')
+        transaction = Transaction(
+            id=identifiant,
+            user=self.user,
+            categorie_id=donnees.pop('categorie_id'),
+            **donnees
+        )
+        self.transactions[identifiant] = transaction
+        self.nouvelles_transactions.append(transaction)
+        for libelle_data in libelles:
+            libelle = Libelle(transaction=transaction, **libelle_data)
+            self.libelles[libelle.pk] = libelle
+            self.nouveaux_libelles.append(libelle)
+            self.dates_touchees.append(libelle.date)
+        return identifiant, None
+
+    def _update_transaction(self, operation):
+        transaction = self.transactions.get(operation.get('id'))
+        if transaction is None:
+            return None, {'id': ["Transaction introuvable."]}
+        serializer = TransactionSerializer(
+            transaction, data=operation['data'], partial=True, context=self.context
+        )
+        if not serializer.is_valid():
+            return None, serializer.errors
+
+        donnees = dict(serializer.validated_data)
+        if 'libelles' in donnees:
+            return None, {'libelles': ["Utiliser des opérations de type 'libelle' dans un lot."]}
+        categorie_id = donnees.pop('categorie_id', None)
+        if categorie_id:
+            if categorie_id not in self.context['categories_accessibles']:
+                return None, {'categorie_id': ["Catégorie invalide ou inaccessible"]}
+            transaction.categorie_id = categorie_id
+            self.champs_transactions.add('categorie_id')
+        for attr, value in donnees.items():
+            setattr(transaction, attr, value)
+            self.champs_transactions.add(attr)
+        if transaction not in self.nouvelles_transactions:
+            self.transactions_modifiees[transaction.pk] = transaction
+        return transaction.pk, None
+
+    def _delete_transaction(self, operation):
+        if operation.get('id') not in self.transactions:
+            return None, {'id': ["Transaction introuvable."]}
+        self.transactions_supprimees.add(operation['id'])
+        return operation['id'], None
+
+    def _create_libelle(self, operation):
+        identifiant = self._nouvel_id(operation)
+        if identifiant is None:
+            return None, {'id': ["Cet identifiant existe déjà."]}
+        try:
+            transaction_id = uuid.UUID(str(operation['data'].get('transaction_id')))
+        except ValueError:
+            transaction_id = None
+        transaction = self.transactions.get(transaction_id)
+        if transaction is None:
+            return None, {'transaction_id': ["Transaction introuvable."]}
+        serializer = LibelleSerializer(data=operation['data'], context=self.context)
+        if not serializer.is_valid():
+            return None, serializer.errors
+
+        libelle = Libelle(id=identifiant, transaction=transaction, **serializer.validated_data)
+        self.libelles[identifiant] = libelle
+        self.nouveaux_libelles.append(libelle)
+        self.dates_touchees.append(libelle.date)
+        return identifiant, None
+
+    def _update_libelle(self, operation):
+        libelle = self.libelles.get(operation.get('id'))
+        if libelle is None:
+            return None, {'id': ["Libellé introuvable."]}
+        serializer = LibelleSerializer(libelle, data=operation['data'], partial=True, context=self.context)
+        if not serializer.is_valid():
+            return None, serializer.errors
+
+        self.dates_touchees.append(libelle.date)
+        if libelle not in self.nouveaux_libelles:
+            self.noms_initiaux.setdefault(libelle.pk, libelle.nom)
+        for attr, value in serializer.validated_data.items():
+            setattr(libelle, attr, value)
+            self.champs_libelles.add(attr)
+        self.dates_touchees.append(libelle.date)
+        if libelle not in self.nouveaux_libelles:
+            self.libelles_modifies[libelle.pk] = libelle
+        return libelle.pk, None
+
+    def _delete_libelle(self, operation):
+        if operation.get('id') not in self.libelles:
+            return None, {'id': ["Libellé introuvable."]}
+        self.libelles_supprimes.add(operation['id'])
+        self.dates_touchees.append(self.libelles[operation['id']].date)
+        return operation['id'], None
+
+    # ----- écriture groupée -----
+
+    def ecrire(self):
+        Transaction.objects.bulk_create(self.nouvelles_transactions)
+        Libelle.objects.bulk_create(self.nouveaux_libelles)
+
+        # bulk_update ne gère pas auto_now : updated_at est posé explicitement
+        for objets, champs, model in (
+            (self.transactions_modifiees, self.champs_transactions, Transaction),
+            (self.libelles_modifies, self.champs_libelles, Libelle),
+        ):
+            if not objets:
+                continue
+            for objet in objets.values():
+                objet.updated_at = self.maintenant
+            model.objects.bulk_update(list(objets.values()), sorted(champs | {'updated_at'}))
+
+        # Libellés : un DELETE et un INSERT de traces, dates déjà dans dates_touchees.
+        # Transactions : delete(), les signaux pre_delete couvrent soldes et index
+        # de leurs libellés.
+        Libelle.objects.supprimer_sans_signaux(self.user.pk, self.libelles_supprimes)
+        if self.transactions_supprimees:
+            Transaction.objects.filter(pk__in=self.transactions_supprimees).delete()
+
+        # Transactions modifiées : tous les mois de leurs libellés sont touchés
+        if self.transactions_modifiees:
+            self.dates_touchees.append(
+                Libelle.objects.filter(transaction_id__in=self.transactions_modifiees.keys())
+                .aggregate(depuis=Min('date'))['depuis']
+            )
+        dates = [date for date in self.dates_touchees if date is not None]
+        if dates:
+            invalider_soldes(self.user.pk, min(dates))
+        self._indexer()
+        self._alerter()
+
+    def _indexer(self):
+        # Libellés supprimés : nom en base retiré ici (pas de signal post_delete) ;
+        # ceux des transactions supprimées le sont par le signal pre_delete
+        def categorie(libelle):
+            transaction = self.transactions.get(libelle.transaction_id)
+            return transaction.categorie_id if transaction is not None else None
+
+        nouveaux = {libelle.pk for libelle in self.nouveaux_libelles}
+        retraits = [
+            self.libelles[libelle_id].nom for libelle_id in self.libelles_supprimes
+            if libelle_id not in nouveaux and libelle_id not in self.noms_initiaux
+        ]
+        indexer_libelles(
+            self.user.pk,
+            ajouts=[
+                usage(libelle, categorie(libelle))
+                for libelle in self.nouveaux_libelles + list(self.libelles_modifies.values())
+                if libelle.pk not in self.libelles_supprimes
+            ],
+            retraits=list(self.noms_initiaux.values()) + retraits,
+        )
+
+    def _alerter(self):
+        # Libellés écrits et libellés des transactions modifiées (statut, volet, catégorie)
+        touches = Q(pk__in=[libelle.pk for libelle in self.nouveaux_libelles + list(self.libelles_modifies.values())])
+        if self.transactions_modifiees:
+            touches |= Q(transaction_id__in=self.transactions_modifiees.keys())
+        evaluer_alertes(self.user.pk, list(
+            Libelle.objects.filter(touches, transaction__volet='suivi', transaction__statut='validee')
+            .values_list('transaction__categorie_id', 'date')
+        ))
+
+
+def appliquer_lot(user, operations, context):
+    """
+    Applique le lot et retourne (succès, résultats par opération).
+    Chaque résultat : {'cle', 'statut': ok|rejouee|erreur|non_appliquee, 'id'?, 'erreurs'?}
+    """
+    try:
+        return _appliquer(user, operations, context)
+    except IntegrityError:
+        # Renvoi concurrent : l'autre requête a validé les mêmes clés (ou les mêmes
+        # identifiants) entre notre lecture et nos écritures, toutes annulées. Le
+        # second passage trouve ses clés et rejoue le résultat enregistré ; une
+        # IntegrityError d'une autre origine se reproduit et remonte.
+        return _appliquer(user, operations, context)
+
+
+def _cles_connues(user, operations, maintenant):
+    """Clés du lot déjà appliquées, après purge des clés expirées de l'utilisateur"""
+    cles = CleIdempotence.objects.filter(user=user)
+    cles.filter(expire_le__lte=maintenant).delete()
+    return {
+        cle.cle: cle for cle in cles.filter(cle__in=[operation['cle'] for operation in operations])
+    }
+
+
+def _appliquer(user, operations, context):
+    maintenant = timezone.now()
+    with db_transaction.atomic(using=shard_pour(user.pk)):
+        connues = _cles_connues(user, operations, maintenant)
+
+        resultats = [None] * len(operations)
+        a_appliquer = []
+        for index, operation in enumerate(operations):
+            connue = connues.get(operation['cle'])
+            if connue is None:
+                a_appliquer.append(index)
+            elif connue.empreinte != _empreinte(operation):
+                resultats[index] = {
+                    'cle': operation['cle'],
+                    'statut': 'erreur',
+                    'erreurs': {'cle': ["Clé déjà utilisée pour une autre opération."]},
+                }
+            else:
+                resultats[index] = {**connue.resultat, 'statut': 'rejouee'}
+
+        lot = _Lot(user, [operations[index] for index in a_appliquer], context)
+        for index in a_appliquer:
+            operation = operations[index]
+            identifiant, erreurs = lot.preparer(operation)
+            if erreurs:
+                resultats[index] = {'cle': operation['cle'], 'statut': 'erreur', 'erreurs': erreurs}
+            else:
+                resultats[index] = {'cle': operation['cle'], 'statut': 'ok', 'id': str(identifiant)}
+
+        if any(resultat['statut'] == 'erreur' for resultat in resultats):
+            for resultat in resultats:
+                if resultat['statut'] == 'ok':
+                    resultat['statut'] = 'non_appliquee'
+                    resultat.pop('id')
+            return False, resultats
+
+        lot.ecrire()
+        expire_le = maintenant + timedelta(hours=settings.IDEMPOTENCE_TTL_HEURES)
+        CleIdempotence.objects.bulk_create([
+            CleIdempotence(
+                user=user,
+                cle=operations[index]['cle'],
+                empreinte=_empreinte(operations[index]),
+                resultat=resultats[index],
+                expire_le=expire_le,
+            )
+            for index in a_appliquer
+        ])
+    return True, resultats
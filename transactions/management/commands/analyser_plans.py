@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.plans import REFERENCE, analyser, charger_reference, enregistrer_reference, regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Analyse les plans d'exécution des requêtes chaudes de l'API sur un jeu de données "
+        "généré puis annulé (parcours complets, tris sans index, index inutilisés) et les "
+        "compare à la référence. Échoue si un plan a régressé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--enregistrer',
+            action='store_true',
+            help="Accepte les plans actuels comme référence du moteur de base courant",
+        )
+        parser.add_argument(
+            '--reference',
+            default=str(REFERENCE),
+            help="Fichier de référence (JSON)",
+        )
+        parser.add_argument(
+            '--transactions',
+            type=int,
+            default=300,
+            help="Nombre de transactions générées par utilisateur",
+        )
+
+    def handle(self, *args, **options):
+        resultat = analyser(options['transactions'])
+        for nom, scenario in resultat['scenarios'].items():
+            self.stdout.write(f"{nom}")
+            self.stdout.write(f"  index : {', '.join(scenario['index']) or '-'}")
+            for constat in scenario['constats']:
+                self.stdout.write(self.style.WARNING(f"  {constat}"))
+        for index in resultat['index_inutilises']:
+            self.stdout.write(self.style.WARNING(f"Index jamais utilisé : {index}"))
+
+        if options['enregistrer']:
+            enregistrer_reference(resultat, options['reference'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Référence {resultat['moteur']} enregistrée dans {options['reference']}."
+            ))
+            return
+
+        ecarts = regressions(resultat, charger_reference(options['reference']))
+        if ecarts:
+            raise CommandError("Plans d'exécution en régression :\n" + '\n'.join(ecarts))
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(resultat['scenarios'])} scénario(s) conformes à la référence {resultat['moteur']}."
+        ))
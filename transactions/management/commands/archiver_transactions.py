@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from transactions.archives import archiver, limite_archivage
+from transactions.sharding import shards
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace dans les tables d'archives les transactions (libellés et photos compris) "
+        "dont le dernier libellé est plus ancien que --age-mois. Les totaux mensuels restent "
+        "disponibles (ResumeArchive). À lancer périodiquement (ex: chaque mois)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--age-mois',
+            type=int,
+            default=settings.ARCHIVE_AGE_MOIS,
+            help="Âge minimum en mois entiers avant le mois courant",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Nombre de transactions archivées par transaction SQL",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Compte les transactions archivables sans les déplacer",
+        )
+
+    def handle(self, *args, **options):
+        limite = limite_archivage(options['age_mois'])
+        total_transactions = 0
+        total_libelles = 0
+        for alias in shards():
+            nb_transactions, nb_libelles = archiver(
+                alias, limite, options['batch_size'], options['dry_run']
+            )
+            self.stdout.write(f"{alias} : {nb_transactions} transaction(s), {nb_libelles} libellé(s)")
+            total_transactions += nb_transactions
+            total_libelles += nb_libelles
+
+        verbe = "archivable(s)" if options['dry_run'] else "archivée(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{total_transactions} transaction(s) {verbe} ({total_libelles} libellé(s)) "
+            f"antérieures au {limite:%Y-%m-%d}."
+        ))
@@ -0,0 +1,104 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+
+def _modes(base):
+    """Variantes de la configuration de `base` : sans persistance, persistantes, pool (PostgreSQL)"""
+    options = {cle: valeur for cle, valeur in base.get('OPTIONS', {}).items() if cle != 'pool'}
+    modes = {
+        'sans_persistance': {**base, 'CONN_MAX_AGE': 0, 'OPTIONS': options},
+        'persistantes': {**base, 'CONN_MAX_AGE': max(settings.DB_CONN_MAX_AGE, 60), 'OPTIONS': options},
+    }
+    if base['ENGINE'] == 'django.db.backends.postgresql':
+        modes['pool'] = {
+            **base,
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {**options, 'pool': {
+                'min_size': settings.DB_POOL_MIN_SIZE,
+                'max_size': settings.DB_POOL_MAX_SIZE,
+                'timeout': settings.DB_POOL_TIMEOUT,
+            }},
+        }
+    return modes
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le coût des connexions à la base : des threads simulent des requêtes "
+        "(début de requête, SELECT, fin de requête comme close_old_connections) sans "
+        "persistance, avec connexions persistantes (CONN_MAX_AGE) et avec le pool "
+        "psycopg (PostgreSQL). Affiche latences, débit et connexions ouvertes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base', default=DEFAULT_DB_ALIAS, help="Alias de la base mesurée")
+        parser.add_argument('--threads', type=int, default=8, help="Requêtes simultanées")
+        parser.add_argument('--requetes', type=int, default=200, help="Requêtes par thread")
+
+    def handle(self, *args, **options):
+        if options['base'] not in connections.settings:
+            raise CommandError(f"Base inconnue : {options['base']}")
+        base = connections.settings[options['base']]
+        self.stdout.write(
+            f"{base['ENGINE'].rsplit('.', 1)[-1]} : {options['threads']} thread(s) x {options['requetes']} requête(s)"
+        )
+        for mode, configuration in _modes(base).items():
+            alias = f"bench_{mode}"
+            connections.settings[alias] = configuration
+            try:
+                self._mesurer(mode, alias, options['threads'], options['requetes'])
+            finally:
+                connections.settings.pop(alias, None)
+
+    def _mesurer(self, mode, alias, nb_threads, nb_requetes):
+        ouvertures = []
+        latences = []
+        verrou = threading.Lock()
+
+        def compter(sender, connection, **kwargs):
+            if connection.alias == alias:
+                with verrou:
+                    ouvertures.append(1)
+
+        def client():
+            mesures = []
+            connexion = connections[alias]
+            for _ in range(nb_requetes):
+                debut = time.perf_counter()
+                connexion.close_if_unusable_or_obsolete()  # request_started
+                with connexion.cursor() as curseur:
+                    curseur.execute("SELECT 1")
+                    curseur.fetchone()
+                connexion.close_if_unusable_or_obsolete()  # request_finished
+                mesures.append(time.perf_counter() - debut)
+            connexion.close()
+            with verrou:
+                latences.extend(mesures)
+
+        connection_created.connect(compter, weak=False)
+        try:
+            threads = [threading.Thread(target=client) for _ in range(nb_threads)]
+            debut = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            duree = time.perf_counter() - debut
+        finally:
+            connection_created.disconnect(compter)
+            if mode == 'pool':
+                connections[alias].close_pool()
+
+        latences.sort()
+        self.stdout.write(
+            f"  {mode:<17} {len(latences) / duree:>8.0f} req/s   "
+            f"moyenne {statistics.fmean(latences) * 1000:6.2f} ms   "
+            f"p95 {latences[int(len(latences) * 0.95) - 1] * 1000:6.2f} ms   "
+            f"{len(ouvertures)} connexion(s) ouverte(s)"
+        )
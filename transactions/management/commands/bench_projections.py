@@ -0,0 +1,112 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction as db_transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from transactions.models import Categorie, Libelle, Transaction
+from transactions.projections import annoter_agregats_libelles, lignes_detail, lignes_liste
+from transactions.serializers import TransactionListSerializer, TransactionSerializer
+from transactions.sharding import shard_pour
+
+
+class _Annulation(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la construction des réponses de liste et de détail (transactions et "
+        "libellés générés puis annulés) : TransactionListSerializer / TransactionSerializer "
+        "contre les projections .values() lignes_liste / lignes_detail. Affiche temps par "
+        "construction (requêtes comprises), nombre de requêtes et gain."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=2000, help="Transactions dans la réponse")
+        parser.add_argument('--libelles', type=int, default=5, help="Libellés par transaction")
+        parser.add_argument('--repetitions', type=int, default=10, help="Constructions mesurées par variante")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['transactions']} transaction(s) x {options['libelles']} libellé(s), "
+            f"{options['repetitions']} construction(s) par variante"
+        )
+        try:
+            with db_transaction.atomic(using=DEFAULT_DB_ALIAS):
+                user = User.objects.create(username=f"bench-projections-{timezone.now():%Y%m%d%H%M%S%f}")
+                alias = shard_pour(user.pk)
+                with db_transaction.atomic(using=alias):
+                    self._peupler(user, alias, options)
+                    self._mesurer(user, alias, options['repetitions'])
+                    raise _Annulation
+        except _Annulation:
+            pass
+
+    def _peupler(self, user, alias, options):
+        categorie = Categorie.objects.filter(est_predefinite=True).first() or Categorie.objects.create(
+            nom='Bench', type_categorie='depense', est_predefinite=True
+        )
+        maintenant = timezone.now()
+        transactions = Transaction.objects.using(alias).bulk_create([
+            Transaction(user_id=user.pk, position=('depense', 'revenu')[i % 2], categorie=categorie)
+            for i in range(options['transactions'])
+        ], batch_size=500)
+        Libelle.objects.using(alias).bulk_create([
+            Libelle(
+                transaction=transaction,
+                nom=f"Libellé {j}",
+                date=maintenant - timedelta(days=(i + j) % 90),
+                montant=Decimal(f"{(i * 37 + j * 11) % 5000}.{j:02d}"),
+                commentaire="Commentaire de test",
+            )
+            for i, transaction in enumerate(transactions) for j in range(options['libelles'])
+        ], batch_size=1000)
+
+    def _mesurer(self, user, alias, repetitions):
+        requete = Request(APIRequestFactory().get('/api/transactions/'))
+        requete.user = user
+        contexte = {'request': requete}
+
+        def transactions():
+            # Même queryset de base que TransactionViewSet
+            return (
+                Transaction.objects.using(alias).filter(user_id=user.pk)
+                .select_related('categorie').order_by('-created_at')
+            )
+
+        variantes = {
+            'liste': (
+                lambda: TransactionListSerializer(
+                    transactions().prefetch_related('libelles'), many=True, context=contexte
+                ).data,
+                lambda: lignes_liste(transactions(), requete),
+            ),
+            'detail': (
+                lambda: TransactionSerializer(
+                    annoter_agregats_libelles(transactions().prefetch_related('libelles', 'photos')),
+                    many=True, context=contexte,
+                ).data,
+                lambda: lignes_detail(transactions(), requete),
+            ),
+        }
+        for nom, (serializer, projection) in variantes.items():
+            reference = None
+            for variante, construire in (('serializer', serializer), ('projection', projection)):
+                with CaptureQueriesContext(connections[alias]) as requetes:
+                    construire()
+                debut = time.perf_counter()
+                for _ in range(repetitions):
+                    construire()
+                duree = (time.perf_counter() - debut) / repetitions
+                reference = reference or duree
+                self.stdout.write(
+                    f"  {nom:<7} {variante:<11} {duree * 1000:8.1f} ms   "
+                    f"{len(requetes):2d} requête(s)   x{reference / duree:.1f}"
+                )
@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction as db_transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from transactions.models import Categorie, Libelle, Transaction
+from transactions.projections import annoter_agregats_libelles
+from transactions.serializers import TransactionSerializer
+from transactions.sharding import shard_pour
+from utils.renderers import MessagePackRenderer, OrjsonRenderer
+
+RENDERERS = {
+    'json (DRF)': JSONRenderer,
+    'orjson': OrjsonRenderer,
+    'msgpack': MessagePackRenderer,
+}
+
+
+class _Annulation(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure le rendu d'une grosse réponse TransactionSerializer (transactions et "
+        "libellés générés puis annulés) : JSONRenderer de DRF contre OrjsonRenderer et "
+        "MessagePackRenderer. Affiche temps par rendu, taille et gain."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=2000, help="Transactions dans la réponse")
+        parser.add_argument('--libelles', type=int, default=5, help="Libellés par transaction")
+        parser.add_argument('--repetitions', type=int, default=20, help="Rendus mesurés par renderer")
+
+    def handle(self, *args, **options):
+        try:
+            with db_transaction.atomic(using=DEFAULT_DB_ALIAS):
+                user = User.objects.create(username=f"bench-rendu-{timezone.now():%Y%m%d%H%M%S%f}")
+                alias = shard_pour(user.pk)
+                with db_transaction.atomic(using=alias):
+                    donnees = self._donnees(user, alias, options)
+                    raise _Annulation
+        except _Annulation:
+            pass
+
+        self.stdout.write(
+            f"{options['transactions']} transaction(s) x {options['libelles']} libellé(s), "
+            f"{options['repetitions']} rendu(s) par renderer"
+        )
+        reference = None
+        for nom, renderer_class in RENDERERS.items():
+            renderer = renderer_class()
+            contenu = renderer.render(donnees, renderer.media_type)
+            debut = time.perf_counter()
+            for _ in range(options['repetitions']):
+                renderer.render(donnees, renderer.media_type)
+            duree = (time.perf_counter() - debut) / options['repetitions']
+            reference = reference or duree
+            self.stdout.write(
+                f"  {nom:<11} {duree * 1000:8.2f} ms   {len(contenu) / 1024:8.0f} Kio   x{reference / duree:.1f}"
+            )
+
+    def _donnees(self, user, alias, options):
+        """Génère les transactions de `user` et retourne leur forme sérialisée (hors mesure)"""
+        categorie = Categorie.objects.filter(est_predefinite=True).first() or Categorie.objects.create(
+            nom='Bench', type_categorie='depense', est_predefinite=True
+        )
+        maintenant = timezone.now()
+        transactions = Transaction.objects.using(alias).bulk_create([
+            Transaction(user_id=user.pk, position=('depense', 'revenu')[i % 2], categorie=categorie)
+            for i in range(options['transactions'])
+        ], batch_size=500)
+        Libelle.objects.using(alias).bulk_create([
+            Libelle(
+                transaction=transaction,
+                nom=f"Libellé {j}",
+                date=maintenant - timedelta(days=(i + j) % 90),
+                montant=Decimal(f"{(i * 37 + j * 11) % 5000}.{j:02d}"),
+                commentaire="Commentaire de test",
+            )
+            for i, transaction in enumerate(transactions) for j in range(options['libelles'])
+        ], batch_size=1000)
+        queryset = annoter_agregats_libelles(
+            Transaction.objects.using(alias).filter(user_id=user.pk)
+            .select_related('categorie').prefetch_related('libelles', 'photos')
+        )
+        debut = time.perf_counter()
+        donnees = TransactionSerializer(queryset, many=True).data
+        self.stdout.write(f"Sérialisation : {(time.perf_counter() - debut) * 1000:.0f} ms (identique pour tous)")
+        return donnees
@@ -0,0 +1,133 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# (pragmas, début des transactions d'écriture)
+MODES = {
+    'journal': ("PRAGMA journal_mode=DELETE;PRAGMA synchronous=FULL;", "BEGIN"),
+    'production': (None, "BEGIN IMMEDIATE"),
+}
+
+NB_UTILISATEURS = 200
+
+
+def _connexion(chemin, pragmas):
+    connexion = sqlite3.connect(
+        chemin, timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False
+    )
+    for pragma in filter(None, (pragma.strip() for pragma in pragmas.split(';'))):
+        connexion.execute(pragma)
+    return connexion
+
+
+def _preparer(chemin, pragmas, nb_lignes):
+    connexion = _connexion(chemin, pragmas)
+    connexion.executescript("""
+        CREATE TABLE libelles (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, date TEXT NOT NULL, montant REAL NOT NULL);
+        CREATE INDEX libelles_user_date ON libelles (user_id, date);
+    """)
+    connexion.execute("BEGIN")
+    connexion.executemany(
+        "INSERT INTO libelles (user_id, date, montant) VALUES (?, ?, ?)",
+        ((i % NB_UTILISATEURS, f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", i % 997) for i in range(nb_lignes)),
+    )
+    connexion.execute("COMMIT")
+    connexion.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la concurrence lecteurs / écrivain sur un fichier SQLite temporaire : "
+        "journal classique (DELETE) contre le profil de production (WAL, BEGIN IMMEDIATE, "
+        "SQLITE_INIT_COMMAND). Un écrivain garde des transactions ouvertes pendant que "
+        "des lecteurs agrègent des libellés ; affiche débit et latences de lecture, "
+        "erreurs « database is locked » et transactions écrites."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lecteurs', type=int, default=4, help="Threads lecteurs")
+        parser.add_argument('--duree', type=float, default=3.0, help="Durée de chaque mesure (secondes)")
+        parser.add_argument('--lignes', type=int, default=50000, help="Libellés initiaux")
+        parser.add_argument(
+            '--ecriture-ms', type=float, default=20.0, help="Durée de chaque transaction d'écriture (ms)"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{options['lecteurs']} lecteur(s), 1 écrivain, {options['duree']:g} s par mode, "
+            f"transactions d'écriture de {options['ecriture_ms']:g} ms"
+        )
+        for mode, (pragmas, debut_ecriture) in MODES.items():
+            with tempfile.TemporaryDirectory() as dossier:
+                chemin = os.path.join(dossier, 'bench.sqlite3')
+                pragmas = pragmas or settings.SQLITE_INIT_COMMAND
+                _preparer(chemin, pragmas, options['lignes'])
+                self._mesurer(mode, chemin, pragmas, debut_ecriture, options)
+
+    def _mesurer(self, mode, chemin, pragmas, debut_ecriture, options):
+        arret = threading.Event()
+        verrou = threading.Lock()
+        latences, erreurs, ecritures = [], [0], [0]
+
+        def lecteur():
+            connexion = _connexion(chemin, pragmas)
+            mesures, nb_erreurs = [], 0
+            while not arret.is_set():
+                debut = time.perf_counter()
+                try:
+                    connexion.execute(
+                        "SELECT date, SUM(montant) FROM libelles WHERE user_id = ? GROUP BY date",
+                        (random.randrange(NB_UTILISATEURS),),
+                    ).fetchall()
+                except sqlite3.OperationalError:
+                    nb_erreurs += 1
+                    continue
+                mesures.append(time.perf_counter() - debut)
+            connexion.close()
+            with verrou:
+                latences.extend(mesures)
+                erreurs[0] += nb_erreurs
+
+        def ecrivain():
+            connexion = _connexion(chemin, pragmas)
+            while not arret.is_set():
+                try:
+                    connexion.execute(debut_ecriture)
+                    connexion.executemany(
+                        "INSERT INTO libelles (user_id, date, montant) VALUES (?, ?, ?)",
+                        [(random.randrange(NB_UTILISATEURS), "2025-06-15", 10.0)] * 50,
+                    )
+                    time.sleep(options['ecriture_ms'] / 1000)
+                    connexion.execute("COMMIT")
+                    ecritures[0] += 1
+                except sqlite3.OperationalError:
+                    if connexion.in_transaction:
+                        connexion.execute("ROLLBACK")
+                    with verrou:
+                        erreurs[0] += 1
+            connexion.close()
+
+        threads = [threading.Thread(target=ecrivain)]
+        threads += [threading.Thread(target=lecteur) for _ in range(options['lecteurs'])]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['duree'])
+        arret.set()
+        for thread in threads:
+            thread.join()
+
+        latences.sort()
+        p95 = latences[int(len(latences) * 0.95) - 1] if latences else 0
+        self.stdout.write(
+            f"  {mode:<11} {len(latences) / options['duree']:>8.0f} lectures/s   "
+            f"moyenne {statistics.fmean(latences or [0]) * 1000:6.2f} ms   p95 {p95 * 1000:6.2f} ms   "
+            f"max {(latences[-1] if latences else 0) * 1000:7.2f} ms   "
+            f"{ecritures[0] / options['duree']:5.1f} écritures/s   {erreurs[0]} « locked »"
+        )
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from transactions.apercus import calculer_tous_apercus
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les aperçus des dépenses (dépense inhabituelle, tendance, projection de "
+        "fin de mois) de tous les utilisateurs, par lots répartis sur un pool de processus. "
+        "À lancer périodiquement (ex: chaque nuit)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processus',
+            type=int,
+            default=settings.APERCUS_PROCESSUS,
+            help="Nombre de processus de calcul (1 = dans le processus courant)",
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=settings.APERCUS_TAILLE_LOT,
+            help="Nombre d'utilisateurs par lot",
+        )
+
+    def handle(self, *args, **options):
+        total = calculer_tous_apercus(options['processus'], options['taille_lot'])
+        self.stdout.write(self.style.SUCCESS(f"{total} aperçu(s) calculé(s)."))
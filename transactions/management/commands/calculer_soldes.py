@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from transactions.sharding import shards
+from transactions.tresorerie import calculer_soldes
+
+
+class Command(BaseCommand):
+    help = (
+        "Complète les instantanés mensuels de solde (SoldeMensuel) de tous les "
+        "utilisateurs jusqu'au dernier mois clos. À lancer périodiquement (ex: chaque nuit)."
+    )
+
+    def handle(self, *args, **options):
+        total = 0
+        for alias in shards():
+            nb = calculer_soldes(alias)
+            self.stdout.write(f"{alias} : {nb} instantané(s)")
+            total += nb
+        self.stdout.write(self.style.SUCCESS(f"{total} instantané(s) de solde créé(s)."))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from transactions.recurrences import generer_occurrences
+from transactions.sharding import shards
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée en masse les transactions récurrentes dues (tous utilisateurs, tous shards), "
+        "en rattrapant les périodes manquées. Peut être relancé sans créer de doublon."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jusqua',
+            help="Date limite incluse (AAAA-MM-JJ), aujourd'hui par défaut",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Nombre de règles traitées par transaction SQL",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Compte les occurrences sans les créer",
+        )
+
+    def handle(self, *args, **options):
+        jusqua = timezone.localdate()
+        if options['jusqua']:
+            jusqua = parse_date(options['jusqua'])
+            if jusqua is None:
+                raise CommandError("--jusqua doit être au format AAAA-MM-JJ")
+
+        total_regles = 0
+        total_transactions = 0
+        for alias in shards():
+            while True:
+                nb_regles, nb_transactions = generer_occurrences(
+                    alias, jusqua, options['batch_size'], options['dry_run']
+                )
+                total_regles += nb_regles
+                total_transactions += nb_transactions
+                # En dry-run rien n'avance : une seule passe par shard
+                if nb_regles == 0 or options['dry_run']:
+                    break
+
+        verbe = "seraient créée(s)" if options['dry_run'] else "créée(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{total_transactions} transaction(s) {verbe} pour {total_regles} récurrence(s) jusqu'au {jusqua}."
+        ))
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions.releves import generer_releves
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère les relevés mensuels (HTML) des utilisateurs actifs dans le mois, par lots "
+        "répartis sur un pool de processus. Les relevés déjà générés sont sautés : relancer "
+        "la commande reprend après une interruption. À lancer en début de mois."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mois',
+            help="Mois au format AAAA-MM (défaut : dernier mois clos)",
+        )
+        parser.add_argument(
+            '--processus',
+            type=int,
+            default=settings.RELEVES_PROCESSUS,
+            help="Nombre de processus de rendu (1 = dans le processus courant)",
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=settings.RELEVES_TAILLE_LOT,
+            help="Nombre d'utilisateurs par lot",
+        )
+
+    def handle(self, *args, **options):
+        mois = None
+        if options['mois']:
+            try:
+                mois = datetime.strptime(options['mois'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("--mois attend le format AAAA-MM.")
+        total = generer_releves(mois, options['processus'], options['taille_lot'])
+        self.stdout.write(self.style.SUCCESS(f"{total} relevé(s) généré(s)."))
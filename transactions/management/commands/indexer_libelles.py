@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from transactions.sharding import shard_pour, shards
+from transactions.suggestions import reconstruire_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit l'index d'autocomplétion des libellés (NomLibelle) depuis les "
+        "libellés, archives comprises. À lancer une fois après déploiement, puis au besoin."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help="ID de l'utilisateur (tous par défaut)",
+        )
+
+    def handle(self, *args, **options):
+        user_id = options['user']
+        alias_cibles = shards() if user_id is None else [shard_pour(user_id)]
+
+        total = 0
+        for alias in alias_cibles:
+            nb = reconstruire_index(alias, user_id)
+            self.stdout.write(f"{alias} : {nb} nom(s)")
+            total += nb
+        self.stdout.write(self.style.SUCCESS(f"{total} nom(s) de libellés indexé(s)."))
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from transactions.models import Suppression
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime les traces de suppression plus anciennes que SYNC_RETENTION_JOURS. "
+        "Les clients dont le curseur est plus ancien devront se resynchroniser entièrement."
+    )
+
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=settings.SYNC_RETENTION_JOURS)
+        nb, _ = Suppression.objects.filter(supprime_le__lt=limite).delete()
+        self.stdout.write(self.style.SUCCESS(f"{nb} trace(s) de suppression purgée(s)."))
@@ -0,0 +1,142 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction as db_transaction
+
+from transactions.models import (
+    Categorie, Transaction, Libelle, Photo, Recurrence, CleIdempotence, SoldeMensuel, Suppression,
+    TransactionArchivee, LibelleArchive, PhotoArchivee, ResumeArchive, NomLibelle, RegleAlerte, AlerteBudget,
+    Apercu, Releve
+)
+from transactions.sharding import shard_pour, shards, synchroniser_categorie
+from transactions.suggestions import sans_indexation
+from transactions.tresorerie import sans_invalidation
+
+
+class Command(BaseCommand):
+    help = (
+        "Déplace les transactions (avec libellés et photos) des utilisateurs "
+        "qui ne sont pas sur leur shard cible, après ajout ou retrait d'un shard."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Affiche les déplacements sans les effectuer",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Taille des lots d'insertion",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+
+        if not dry_run:
+            # Les catégories doivent exister sur chaque shard avant d'y copier des transactions (parents d'abord)
+            for categorie in Categorie.objects.using(DEFAULT_DB_ALIAS).order_by('profondeur').iterator():
+                synchroniser_categorie(categorie)
+
+        total_utilisateurs = 0
+        total_transactions = 0
+        for source in shards():
+            user_ids = set(
+                Transaction.objects.using(source)
+                .values_list('user_id', flat=True)
+                .distinct()
+            )
+            # Utilisateurs dont tout l'historique est archivé
+            user_ids.update(TransactionArchivee.objects.using(source).values_list('user_id', flat=True).distinct())
+            for user_id in sorted(user_ids):
+                cible = shard_pour(user_id)
+                if cible == source:
+                    continue
+
+                nb = Transaction.objects.using(source).filter(user_id=user_id).count()
+                self.stdout.write(f"Utilisateur {user_id} : {nb} transaction(s) {source} -> {cible}")
+                total_utilisateurs += 1
+                total_transactions += nb
+                if not dry_run:
+                    self._deplacer(user_id, source, cible, batch_size)
+
+        verbe = "à déplacer" if dry_run else "déplacée(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{total_transactions} transaction(s) {verbe} pour {total_utilisateurs} utilisateur(s)."
+        ))
+
+    def _deplacer(self, user_id, source, cible, batch_size):
+        """Copie les lignes d'un utilisateur sur le shard cible puis les supprime de la source"""
+        transactions = list(Transaction.objects.using(source).filter(user_id=user_id))
+        libelles = list(Libelle.objects.using(source).filter(transaction__user_id=user_id))
+        photos = list(Photo.objects.using(source).filter(transaction__user_id=user_id))
+        recurrences = list(Recurrence.objects.using(source).filter(user_id=user_id))
+        cles = list(CleIdempotence.objects.using(source).filter(user_id=user_id))
+        soldes = list(SoldeMensuel.objects.using(source).filter(user_id=user_id))
+        archives = list(TransactionArchivee.objects.using(source).filter(user_id=user_id))
+        libelles_archives = list(LibelleArchive.objects.using(source).filter(transaction__user_id=user_id))
+        photos_archivees = list(PhotoArchivee.objects.using(source).filter(transaction__user_id=user_id))
+        resumes = list(ResumeArchive.objects.using(source).filter(user_id=user_id))
+        noms = list(NomLibelle.objects.using(source).filter(user_id=user_id))
+        regles = list(RegleAlerte.objects.using(source).filter(user_id=user_id))
+        alertes = list(AlerteBudget.objects.using(source).filter(user_id=user_id))
+        releves = list(Releve.objects.using(source).filter(user_id=user_id))
+        anciennes_regles = [regle.pk for regle in regles]
+        # Clés auto-incrémentées : nouvel id sur le shard cible
+        for objet in soldes + resumes + noms + regles + alertes + releves:
+            objet.pk = None
+
+        # Transaction.recurrence et Recurrence.modele se référencent : les
+        # occurrences sont copiées sans leur récurrence, rattachée ensuite
+        occurrences = [transaction for transaction in transactions if transaction.recurrence_id]
+        recurrence_ids = [transaction.recurrence_id for transaction in occurrences]
+        for transaction in occurrences:
+            transaction.recurrence_id = None
+
+        with db_transaction.atomic(using=cible), db_transaction.atomic(using=source):
+            for model, objets in (
+                (Transaction, transactions), (Libelle, libelles), (Photo, photos),
+                (Recurrence, recurrences), (CleIdempotence, cles), (SoldeMensuel, soldes),
+                (TransactionArchivee, archives), (LibelleArchive, libelles_archives),
+                (PhotoArchivee, photos_archivees), (ResumeArchive, resumes), (NomLibelle, noms),
+                (Releve, releves),
+            ):
+                self._copier(model, objets, cible, batch_size)
+            # Les alertes suivent le nouvel id de leur règle
+            self._copier(RegleAlerte, regles, cible, batch_size)
+            nouvelles_regles = dict(zip(anciennes_regles, (regle.pk for regle in regles)))
+            for alerte in alertes:
+                alerte.regle_id = nouvelles_regles[alerte.regle_id]
+            self._copier(AlerteBudget, alertes, cible, batch_size)
+            for transaction, recurrence_id in zip(occurrences, recurrence_ids):
+                transaction.recurrence_id = recurrence_id
+            Transaction.objects.using(cible).bulk_update(occurrences, ['recurrence'], batch_size=batch_size)
+
+            # Les signaux de suppression viseraient le shard cible (shard_pour), où les copies sont à jour
+            with sans_invalidation(), sans_indexation():
+                # Aperçus non copiés : recalculés au prochain calculer_apercus
+                for model in (
+                    Releve, Apercu, AlerteBudget, RegleAlerte, NomLibelle, CleIdempotence, SoldeMensuel,
+                    Transaction, TransactionArchivee, ResumeArchive,
+                ):
+                    model.objects.using(source).filter(user_id=user_id).delete()
+            # Un déplacement n'est pas une suppression pour les clients hors ligne
+            Suppression.objects.filter(
+                modele='transaction', objet_id__in=[transaction.pk for transaction in transactions]
+            ).delete()
+
+    def _copier(self, model, objets, cible, batch_size):
+        """bulk_create en conservant created_at / updated_at (écrasés par auto_now)"""
+        champs_dates = [
+            field.attname for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+        ]
+        dates = [{champ: getattr(obj, champ) for champ in champs_dates} for obj in objets]
+        model.objects.using(cible).bulk_create(objets, batch_size=batch_size)
+        if not champs_dates:
+            return
+        for obj, valeurs in zip(objets, dates):
+            for champ, valeur in valeurs.items():
+                setattr(obj, champ, valeur)
+        model.objects.using(cible).bulk_update(objets, champs_dates, batch_size=batch_size)
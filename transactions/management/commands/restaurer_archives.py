@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from transactions.archives import restaurer
+from transactions.models import TransactionArchivee
+from transactions.sharding import shard_pour, shards
+
+
+class Command(BaseCommand):
+    help = (
+        "Remet en table chaude des transactions archivées (après une baisse de "
+        "ARCHIVE_AGE_MOIS, ou pour un utilisateur qui consulte son historique)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            help="ID de l'utilisateur (tous par défaut)",
+        )
+        parser.add_argument(
+            '--depuis',
+            help="Restaure les transactions ayant un libellé à partir de cette date (AAAA-MM-JJ)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Nombre de transactions restaurées par transaction SQL",
+        )
+
+    def handle(self, *args, **options):
+        if options['user'] is None and not options['depuis']:
+            raise CommandError("Préciser --user et/ou --depuis")
+
+        archives = TransactionArchivee.objects.all()
+        if options['depuis']:
+            depuis = parse_date(options['depuis'])
+            if depuis is None:
+                raise CommandError("--depuis doit être au format AAAA-MM-JJ")
+            archives = archives.filter(libelles__date__date__gte=depuis).distinct()
+        alias_cibles = shards()
+        if options['user'] is not None:
+            archives = archives.filter(user_id=options['user'])
+            alias_cibles = [shard_pour(options['user'])]
+
+        total = 0
+        for alias in alias_cibles:
+            nb = restaurer(alias, archives, options['batch_size'])
+            self.stdout.write(f"{alias} : {nb} transaction(s)")
+            total += nb
+        self.stdout.write(self.style.SUCCESS(f"{total} transaction(s) restaurée(s)."))
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_transaction_user_sans_contrainte'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suppression',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modele', models.CharField(choices=[('categorie', 'Catégorie'), ('transaction', 'Transaction'), ('libelle', 'Libellé'), ('photo', 'Photo')], max_length=20, verbose_name='Modèle')),
+                ('objet_id', models.UUIDField(verbose_name="ID de l'objet supprimé")),
+                ('supprime_le', models.DateTimeField(auto_now_add=True, verbose_name='Supprimé le')),
+            ],
+            options={
+                'verbose_name': 'Suppression',
+                'verbose_name_plural': 'Suppressions',
+                'db_table': 'transactions_suppression',
+                'ordering': ['supprime_le', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Modifiée le'),
+        ),
+        migrations.AddIndex(
+            model_name='categorie',
+            index=models.Index(fields=['updated_at'], name='transaction_updated_76e285_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='libelle',
+            index=models.Index(fields=['updated_at'], name='transaction_updated_1be5c4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['updated_at'], name='transaction_updated_2a35c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'updated_at'], name='transaction_user_id_0bee21_idx'),
+        ),
+        migrations.AddField(
+            model_name='suppression',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Vide pour une catégorie prédéfinie (concerne tous les utilisateurs)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='suppressions', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur'),
+        ),
+        migrations.AddIndex(
+            model_name='suppression',
+            index=models.Index(fields=['user', 'supprime_le'], name='transaction_user_id_2d7097_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='suppression',
+            index=models.Index(fields=['supprime_le'], name='transaction_supprim_013a83_idx'),
+        ),
+    ]
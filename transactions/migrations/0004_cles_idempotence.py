@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_synchronisation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CleIdempotence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(max_length=100, verbose_name='Clé')),
+                ('empreinte', models.CharField(help_text="SHA-256 de l'opération, pour refuser une clé réutilisée", max_length=64, verbose_name='Empreinte')),
+                ('resultat', models.JSONField(verbose_name='Résultat')),
+                ('expire_le', models.DateTimeField(verbose_name='Expire le')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créée le')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='cles_idempotence', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': "Clé d'idempotence",
+                'verbose_name_plural': "Clés d'idempotence",
+                'db_table': 'transactions_cleidempotence',
+                'indexes': [models.Index(fields=['user', 'expire_le'], name='transaction_user_id_bc891c_idx')],
+                'unique_together': {('user', 'cle')},
+            },
+        ),
+    ]
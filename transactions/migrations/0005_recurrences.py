@@ -0,0 +1,63 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:21
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0004_cles_idempotence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='echeance',
+            field=models.DateField(blank=True, help_text="Date de l'occurrence pour une transaction récurrente", null=True, verbose_name='Échéance'),
+        ),
+        migrations.CreateModel(
+            name='Recurrence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('frequence', models.CharField(choices=[('quotidienne', 'Quotidienne'), ('hebdomadaire', 'Hebdomadaire'), ('mensuelle', 'Mensuelle'), ('annuelle', 'Annuelle')], default='mensuelle', max_length=20, verbose_name='Fréquence')),
+                ('intervalle', models.PositiveIntegerField(default=1, help_text='Toutes les N périodes (ex: 3 + mensuelle = trimestrielle)', validators=[django.core.validators.MinValueValidator(1)], verbose_name='Intervalle')),
+                ('debut', models.DateField(verbose_name='Première échéance')),
+                ('fin', models.DateField(blank=True, null=True, verbose_name='Dernière échéance possible')),
+                ('est_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('nb_occurrences', models.PositiveIntegerField(default=0, verbose_name='Occurrences générées')),
+                ('prochaine_echeance', models.DateField(blank=True, help_text='Vide quand la récurrence est terminée', null=True, verbose_name='Prochaine échéance')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créée le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifiée le')),
+                ('modele', models.ForeignKey(help_text='Copiée (avec ses libellés) à chaque échéance', on_delete=django.db.models.deletion.CASCADE, related_name='recurrences', to='transactions.transaction', verbose_name='Transaction modèle')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='recurrences', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Récurrence',
+                'verbose_name_plural': 'Récurrences',
+                'db_table': 'transactions_recurrence',
+                'ordering': ['prochaine_echeance'],
+            },
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='transactions.recurrence', verbose_name='Récurrence'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('recurrence', 'echeance'), name='transaction_occurrence_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='recurrence',
+            index=models.Index(fields=['est_active', 'prochaine_echeance'], name='transaction_est_act_c4e438_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recurrence',
+            index=models.Index(fields=['user', 'updated_at'], name='transaction_user_id_12f16c_idx'),
+        ),
+    ]
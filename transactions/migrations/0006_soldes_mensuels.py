@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0005_recurrences'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoldeMensuel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('volet', models.CharField(choices=[('suivi', 'Suivi'), ('budget', 'Budget')], max_length=10, verbose_name='Volet')),
+                ('mois', models.DateField(help_text='Premier jour du mois', verbose_name='Mois')),
+                ('revenus', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Revenus')),
+                ('depenses', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Dépenses')),
+                ('solde_cumule', models.DecimalField(decimal_places=2, help_text='Revenus - dépenses depuis le début, à la fin du mois', max_digits=14, verbose_name='Solde cumulé')),
+                ('calcule_le', models.DateTimeField(auto_now=True, verbose_name='Calculé le')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='soldes_mensuels', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Solde mensuel',
+                'verbose_name_plural': 'Soldes mensuels',
+                'db_table': 'transactions_soldemensuel',
+                'ordering': ['mois'],
+                'unique_together': {('user', 'volet', 'mois')},
+            },
+        ),
+    ]
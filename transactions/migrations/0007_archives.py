@@ -0,0 +1,104 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0006_soldes_mensuels'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionArchivee',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False, verbose_name='ID unique')),
+                ('volet', models.CharField(choices=[('suivi', 'Suivi'), ('budget', 'Budget')], max_length=10, verbose_name='Volet')),
+                ('position', models.CharField(choices=[('depense', 'Dépense'), ('revenu', 'Revenu')], max_length=10, verbose_name='Position')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('validee', 'Validée'), ('annulee', 'Annulée')], max_length=20, verbose_name='Statut')),
+                ('devise', models.CharField(max_length=3, verbose_name='Devise')),
+                ('recurrence_id', models.UUIDField(blank=True, null=True, verbose_name="Récurrence d'origine")),
+                ('echeance', models.DateField(blank=True, null=True, verbose_name='Échéance')),
+                ('created_at', models.DateTimeField(verbose_name='Créée le')),
+                ('updated_at', models.DateTimeField(verbose_name='Modifiée le')),
+                ('archivee_le', models.DateTimeField(auto_now_add=True, verbose_name='Archivée le')),
+                ('categorie', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='transactions_archivees', to='transactions.categorie', verbose_name='Catégorie')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions_archivees', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Transaction archivée',
+                'verbose_name_plural': 'Transactions archivées',
+                'db_table': 'transactions_transaction_archive',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PhotoArchivee',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False, verbose_name='ID unique')),
+                ('image', models.ImageField(upload_to='transactions/%Y/%m/', verbose_name='Photo/Reçu')),
+                ('legende', models.CharField(blank=True, max_length=200, null=True, verbose_name='Légende')),
+                ('created_at', models.DateTimeField(verbose_name='Ajoutée le')),
+                ('updated_at', models.DateTimeField(verbose_name='Modifiée le')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='transactions.transactionarchivee', verbose_name='Transaction')),
+            ],
+            options={
+                'verbose_name': 'Photo archivée',
+                'verbose_name_plural': 'Photos archivées',
+                'db_table': 'transactions_photo_archive',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LibelleArchive',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False, verbose_name='ID unique')),
+                ('nom', models.CharField(max_length=200, verbose_name='Nom du libellé')),
+                ('date', models.DateTimeField(verbose_name='Date du libellé')),
+                ('montant', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Montant')),
+                ('commentaire', models.TextField(blank=True, null=True, verbose_name='Commentaire')),
+                ('created_at', models.DateTimeField(verbose_name='Créé le')),
+                ('updated_at', models.DateTimeField(verbose_name='Modifié le')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='libelles', to='transactions.transactionarchivee', verbose_name='Transaction')),
+            ],
+            options={
+                'verbose_name': 'Libellé archivé',
+                'verbose_name_plural': 'Libellés archivés',
+                'db_table': 'transactions_libelle_archive',
+                'ordering': ['date', 'created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumeArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.DateField(help_text='Premier jour du mois', verbose_name='Mois')),
+                ('volet', models.CharField(choices=[('suivi', 'Suivi'), ('budget', 'Budget')], max_length=10, verbose_name='Volet')),
+                ('position', models.CharField(choices=[('depense', 'Dépense'), ('revenu', 'Revenu')], max_length=10, verbose_name='Position')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('validee', 'Validée'), ('annulee', 'Annulée')], max_length=20, verbose_name='Statut')),
+                ('montant', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Montant')),
+                ('nb_libelles', models.PositiveIntegerField(verbose_name='Libellés')),
+                ('categorie', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='resumes_archives', to='transactions.categorie', verbose_name='Catégorie')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='resumes_archives', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': "Résumé d'archive",
+                'verbose_name_plural': "Résumés d'archives",
+                'db_table': 'transactions_resume_archive',
+                'ordering': ['mois'],
+                'unique_together': {('user', 'mois', 'volet', 'position', 'statut', 'categorie')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='transactionarchivee',
+            index=models.Index(fields=['user', 'created_at'], name='transaction_user_id_b4f32e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='libellearchive',
+            index=models.Index(fields=['transaction', 'date'], name='transaction_transac_b5b684_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_archives'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NomLibelle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(help_text='Nom normalisé (minuscules, sans accents)', max_length=200, verbose_name='Clé')),
+                ('nom', models.CharField(help_text='Forme du dernier usage', max_length=200, verbose_name='Nom')),
+                ('nb_utilisations', models.PositiveIntegerField(default=0, verbose_name='Utilisations')),
+                ('dernier_usage', models.DateTimeField(verbose_name='Dernier usage')),
+                ('montant', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Dernier montant')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifié le')),
+                ('categorie', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='noms_libelles', to='transactions.categorie', verbose_name='Catégorie')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='noms_libelles', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Nom de libellé',
+                'verbose_name_plural': 'Noms de libellés',
+                'db_table': 'transactions_nomlibelle',
+                'unique_together': {('user', 'cle')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0008_noms_libelles'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='libelle',
+            name='transaction_transac_0e4ab9_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='libellearchive',
+            name='transaction_transac_b5b684_idx',
+        ),
+        migrations.AddIndex(
+            model_name='libelle',
+            index=models.Index(fields=['transaction', 'date', 'montant'], name='transaction_transac_7794cd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='libellearchive',
+            index=models.Index(fields=['transaction', 'date', 'montant'], name='transaction_transac_e1c096_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('statut', 'validee')), fields=['user', 'volet', '-created_at'], name='transaction_validee_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def calculer_chemins(apps, schema_editor):
+    """Catégories existantes : toutes racines"""
+    Categorie = apps.get_model('transactions', 'Categorie')
+    alias = schema_editor.connection.alias
+    categories = list(Categorie.objects.using(alias).only('id'))
+    for categorie in categories:
+        categorie.chemin = f"{categorie.id.hex}/"
+    Categorie.objects.using(alias).bulk_update(categories, ['chemin'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0009_filtres_montants_dates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorie',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='enfants', to='transactions.categorie', verbose_name='Catégorie parente'),
+        ),
+        migrations.AddField(
+            model_name='categorie',
+            name='chemin',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='Identifiants des ancêtres puis de la catégorie, depuis la racine', max_length=165, verbose_name='Chemin'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='categorie',
+            name='profondeur',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='0 pour une catégorie racine', verbose_name='Profondeur'),
+        ),
+        migrations.RunPython(calculer_chemins, migrations.RunPython.noop),
+    ]
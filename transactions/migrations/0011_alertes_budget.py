@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:50
+
+import django.db.models.deletion
+import transactions.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0010_hierarchie_categories'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegleAlerte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seuils', models.JSONField(default=transactions.models.seuils_par_defaut, help_text='Pourcentages du budget du mois (ex: [80, 100])', verbose_name='Seuils')),
+                ('est_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créée le')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Modifiée le')),
+                ('categorie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='regles_alertes', to='transactions.categorie', verbose_name='Catégorie')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='regles_alertes', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': "Règle d'alerte",
+                'verbose_name_plural': "Règles d'alerte",
+                'db_table': 'transactions_regle_alerte',
+                'ordering': ['created_at'],
+                'unique_together': {('user', 'categorie')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AlerteBudget',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.DateField(help_text='Premier jour du mois', verbose_name='Mois')),
+                ('seuil', models.PositiveSmallIntegerField(verbose_name='Seuil (%)')),
+                ('depense', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Dépensé')),
+                ('budget', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Budget')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Déclenchée le')),
+                ('envoyee_le', models.DateTimeField(blank=True, null=True, verbose_name='Envoyée le')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='alertes_budget', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('regle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertes', to='transactions.reglealerte', verbose_name='Règle')),
+            ],
+            options={
+                'verbose_name': 'Alerte de budget',
+                'verbose_name_plural': 'Alertes de budget',
+                'db_table': 'transactions_alerte_budget',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='transaction_user_id_40127c_idx')],
+                'unique_together': {('regle', 'mois', 'seuil')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0011_alertes_budget'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Apercu',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.DateField(help_text='Premier jour du mois courant au calcul', verbose_name='Mois')),
+                ('depense_mois', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Dépensé ce mois')),
+                ('moyenne_journaliere', models.DecimalField(decimal_places=2, help_text='Sur les 4 dernières semaines', max_digits=14, verbose_name='Moyenne journalière')),
+                ('projection_fin_mois', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Projection fin de mois')),
+                ('tendance', models.FloatField(blank=True, help_text='Variation relative sur 30 jours (0.1 = +10 %), vide sans historique', null=True, verbose_name='Tendance')),
+                ('est_inhabituelle', models.BooleanField(default=False, verbose_name='Dépense inhabituelle')),
+                ('score_inhabituel', models.FloatField(default=0, help_text='Écarts-types du plus gros jour récent au-dessus de la moyenne', verbose_name='Score')),
+                ('jour_inhabituel', models.DateField(blank=True, null=True, verbose_name='Jour inhabituel')),
+                ('calcule_le', models.DateTimeField(auto_now=True, verbose_name='Calculé le')),
+                ('categorie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='apercus', to='transactions.categorie', verbose_name='Catégorie')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='apercus', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Aperçu des dépenses',
+                'verbose_name_plural': 'Aperçus des dépenses',
+                'db_table': 'transactions_apercu',
+                'ordering': ['-est_inhabituelle', '-depense_mois'],
+                'unique_together': {('user', 'categorie')},
+            },
+        ),
+    ]
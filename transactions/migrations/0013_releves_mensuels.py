@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0012_apercus'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Releve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mois', models.DateField(help_text='Premier jour du mois', verbose_name='Mois')),
+                ('fichier', models.FileField(max_length=255, upload_to='releves/%Y/%m/', verbose_name='Fichier')),
+                ('total_revenus', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Revenus')),
+                ('total_depenses', models.DecimalField(decimal_places=2, max_digits=14, verbose_name='Dépenses')),
+                ('nb_libelles', models.PositiveIntegerField(verbose_name='Libellés')),
+                ('genere_le', models.DateTimeField(auto_now_add=True, verbose_name='Généré le')),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='releves', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Relevé mensuel',
+                'verbose_name_plural': 'Relevés mensuels',
+                'db_table': 'transactions_releve',
+                'ordering': ['-mois'],
+                'unique_together': {('user', 'mois')},
+            },
+        ),
+    ]
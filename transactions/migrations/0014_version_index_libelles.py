@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0013_releves_mensuels'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='nomlibelle',
+            index=models.Index(fields=['user', 'updated_at'], name='nomlibelle_version_idx'),
+        ),
+    ]
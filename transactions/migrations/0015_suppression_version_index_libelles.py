@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0014_version_index_libelles'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='nomlibelle',
+            name='nomlibelle_version_idx',
+        ),
+    ]
@@ -1,7 +1,46 @@
 import uuid
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
+from .sharding import shard_pour
+
+
+class ShardedQuerySet(models.QuerySet):
+    """QuerySet des modèles shardés (Transaction, Libelle, Photo)"""
+    
+    # Chemin vers l'utilisateur propriétaire depuis le modèle
+    chemin_utilisateur = 'user'
+    
+    def pour_utilisateur(self, user):
+        """Données d'un utilisateur, lues directement sur son shard"""
+        user_id = getattr(user, 'pk', user)
+        return self.using(shard_pour(user_id)).filter(**{f"{self.chemin_utilisateur}_id": user_id})
+
+
+class LigneShardedQuerySet(ShardedQuerySet):
+    chemin_utilisateur = 'transaction__user'
+
+
+class LibelleQuerySet(LigneShardedQuerySet):
+    
+    def supprimer_sans_signaux(self, user_id, ids):
+        """
+        Supprime les libellés `ids` de l'utilisateur en un seul DELETE, sans les
+        signaux post_delete (trois requêtes par ligne), et écrit leurs traces
+        (Suppression) en un seul INSERT. Soldes, index d'autocomplétion et
+        alertes restent à la charge de l'appelant, comme pour bulk_create.
+        """
+        ids = list(ids)
+        if not ids:
+            return 0
+        libelles = self.filter(pk__in=ids)
+        # Aucune clé étrangère ne pointe vers Libelle : pas de cascade à collecter
+        nb = libelles._raw_delete(libelles.db)
+        Suppression.objects.bulk_create([
+            Suppression(modele='libelle', objet_id=libelle_id, user_id=user_id) for libelle_id in ids
+        ])
+        return nb
 
 
 class Categorie(models.Model):
@@ -12,6 +51,9 @@ class Categorie(models.Model):
         ('revenu', 'Revenu'),
     ]
     
+    # Niveaux de la hiérarchie (racine comprise), voir hierarchie.py
+    PROFONDEUR_MAX = 5
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     nom = models.CharField(max_length=100, verbose_name="Nom de la catégorie")
     type_categorie = models.CharField(
@@ -52,6 +94,30 @@ class Categorie(models.Model):
         default=0,
         help_text="Ordre d'affichage (0 = en premier)"
     )
+    
+    # Hiérarchie : chemin matérialisé depuis la racine, calculé à l'enregistrement
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='enfants',
+        verbose_name="Catégorie parente"
+    )
+    chemin = models.CharField(
+        max_length=PROFONDEUR_MAX * 33,
+        editable=False,
+        db_index=True,
+        verbose_name="Chemin",
+        help_text="Identifiants des ancêtres puis de la catégorie, depuis la racine"
+    )
+    profondeur = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Profondeur",
+        help_text="0 pour une catégorie racine"
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -61,10 +127,20 @@ class Categorie(models.Model):
         verbose_name = "Catégorie"
         verbose_name_plural = "Catégories"
         unique_together = [['nom', 'type_categorie', 'creee_par']]
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         prefix = "🏢" if self.est_predefinite else "👤"
         return f"{prefix} {self.nom} ({self.get_type_categorie_display()})"
+    
+    def clean(self):
+        from .hierarchie import erreur_parent
+        
+        erreur = erreur_parent(self, self.parent)
+        if erreur:
+            raise ValidationError({'parent': erreur})
 
 
 class Transaction(models.Model):
@@ -97,7 +173,9 @@ class Transaction(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='transactions',
-        verbose_name="Utilisateur"
+        verbose_name="Utilisateur",
+        # Pas de contrainte SQL : la table auth_user n'est peuplée que sur default
+        db_constraint=False
     )
     
     # Volet et position
@@ -138,10 +216,28 @@ class Transaction(models.Model):
         verbose_name="Devise"
     )
     
+    # Occurrence générée par une récurrence
+    recurrence = models.ForeignKey(
+        'Recurrence',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences',
+        verbose_name="Récurrence"
+    )
+    echeance = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Échéance",
+        help_text="Date de l'occurrence pour une transaction récurrente"
+    )
+    
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créée le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifiée le")
     
+    objects = ShardedQuerySet.as_manager()
+    
     class Meta:
         db_table = 'transactions_transaction'
         ordering = ['-created_at']
@@ -151,6 +247,20 @@ class Transaction(models.Model):
             models.Index(fields=['user', 'created_at']),
             models.Index(fields=['user', 'volet', 'position']),
             models.Index(fields=['categorie', 'created_at']),
+            models.Index(fields=['user', 'updated_at']),
+            # Liste et agrégats des seules transactions validées
+            models.Index(
+                fields=['user', 'volet', '-created_at'],
+                condition=models.Q(statut='validee'),
+                name='transaction_validee_idx'
+            ),
+        ]
+        constraints = [
+            # Une seule occurrence par échéance : le générateur peut repasser sans doublon
+            models.UniqueConstraint(
+                fields=['recurrence', 'echeance'],
+                name='transaction_occurrence_unique'
+            ),
         ]
     
     def __str__(self):
@@ -216,13 +326,17 @@ class Libelle(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
     
+    objects = LibelleQuerySet.as_manager()
+    
     class Meta:
         db_table = 'transactions_libelle'
         ordering = ['date', 'created_at']
         verbose_name = "Libellé"
         verbose_name_plural = "Libellés"
         indexes = [
-            models.Index(fields=['transaction', 'date']),
+            # Couvre les filtres de date et de montant (EXISTS de filters.py)
+            models.Index(fields=['transaction', 'date', 'montant']),
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
@@ -259,12 +373,561 @@ class Photo(models.Model):
     
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Ajoutée le")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifiée le")
+    
+    objects = LigneShardedQuerySet.as_manager()
     
     class Meta:
         db_table = 'transactions_photo'
         ordering = ['created_at']
         verbose_name = "Photo"
         verbose_name_plural = "Photos"
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"Photo - {self.transaction}"
+
+
+class Recurrence(models.Model):
+    """Règle de répétition d'une transaction modèle (salaire, loyer, abonnement, budget...)"""
+    
+    FREQUENCE_CHOICES = [
+        ('quotidienne', 'Quotidienne'),
+        ('hebdomadaire', 'Hebdomadaire'),
+        ('mensuelle', 'Mensuelle'),
+        ('annuelle', 'Annuelle'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='recurrences',
+        verbose_name="Utilisateur",
+        db_constraint=False
+    )
+    modele = models.ForeignKey(
+        Transaction,
+        on_delete=models.CASCADE,
+        related_name='recurrences',
+        verbose_name="Transaction modèle",
+        help_text="Copiée (avec ses libellés) à chaque échéance"
+    )
+    frequence = models.CharField(
+        max_length=20,
+        choices=FREQUENCE_CHOICES,
+        default='mensuelle',
+        verbose_name="Fréquence"
+    )
+    intervalle = models.PositiveIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        verbose_name="Intervalle",
+        help_text="Toutes les N périodes (ex: 3 + mensuelle = trimestrielle)"
+    )
+    debut = models.DateField(verbose_name="Première échéance")
+    fin = models.DateField(null=True, blank=True, verbose_name="Dernière échéance possible")
+    est_active = models.BooleanField(default=True, verbose_name="Active")
+    
+    # Avancement du générateur
+    nb_occurrences = models.PositiveIntegerField(default=0, verbose_name="Occurrences générées")
+    prochaine_echeance = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Prochaine échéance",
+        help_text="Vide quand la récurrence est terminée"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créée le")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifiée le")
+    
+    objects = ShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_recurrence'
+        ordering = ['prochaine_echeance']
+        verbose_name = "Récurrence"
+        verbose_name_plural = "Récurrences"
+        indexes = [
+            models.Index(fields=['est_active', 'prochaine_echeance']),
+            models.Index(fields=['user', 'updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_frequence_display()} ×{self.intervalle} - {self.modele_id}"
+
+
+class SoldeMensuel(models.Model):
+    """
+    Instantané mensuel des flux validés d'un utilisateur (par volet), calculé
+    par `manage.py calculer_soldes`. Les instantanés d'un utilisateur sont
+    contigus depuis son premier mois d'activité : toute écriture sur un mois
+    clos supprime ceux à partir de ce mois (voir tresorerie.invalider_soldes).
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='soldes_mensuels',
+        verbose_name="Utilisateur",
+        db_constraint=False
+    )
+    volet = models.CharField(max_length=10, choices=Transaction.VOLET_CHOICES, verbose_name="Volet")
+    mois = models.DateField(verbose_name="Mois", help_text="Premier jour du mois")
+    revenus = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Revenus")
+    depenses = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Dépenses")
+    solde_cumule = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        verbose_name="Solde cumulé",
+        help_text="Revenus - dépenses depuis le début, à la fin du mois"
+    )
+    calcule_le = models.DateTimeField(auto_now=True, verbose_name="Calculé le")
+    
+    objects = ShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_soldemensuel'
+        ordering = ['mois']
+        verbose_name = "Solde mensuel"
+        verbose_name_plural = "Soldes mensuels"
+        unique_together = [['user', 'volet', 'mois']]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.volet} {self.mois:%Y-%m} : {self.solde_cumule}"
+
+
+# ========== ARCHIVES (voir transactions/archives.py) ==========
+
+class TransactionArchivee(models.Model):
+    """Transaction ancienne déplacée hors de la table chaude (mêmes identifiants)"""
+    
+    id = models.UUIDField(primary_key=True, editable=False, verbose_name="ID unique")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='transactions_archivees',
+        verbose_name="Utilisateur",
+        db_constraint=False
+    )
+    volet = models.CharField(max_length=10, choices=Transaction.VOLET_CHOICES, verbose_name="Volet")
+    position = models.CharField(max_length=10, choices=Transaction.TYPE_CHOICES, verbose_name="Position")
+    categorie = models.ForeignKey(
+        Categorie,
+        on_delete=models.PROTECT,
+        related_name='transactions_archivees',
+        verbose_name="Catégorie"
+    )
+    statut = models.CharField(max_length=20, choices=Transaction.STATUT_CHOICES, verbose_name="Statut")
+    devise = models.CharField(max_length=3, verbose_name="Devise")
+    recurrence_id = models.UUIDField(null=True, blank=True, verbose_name="Récurrence d'origine")
+    echeance = models.DateField(null=True, blank=True, verbose_name="Échéance")
+    
+    # Dates d'origine conservées telles quelles
+    created_at = models.DateTimeField(verbose_name="Créée le")
+    updated_at = models.DateTimeField(verbose_name="Modifiée le")
+    archivee_le = models.DateTimeField(auto_now_add=True, verbose_name="Archivée le")
+    
+    objects = ShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_transaction_archive'
+        ordering = ['-created_at']
+        verbose_name = "Transaction archivée"
+        verbose_name_plural = "Transactions archivées"
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Archive {self.id}"
+
+
+class LibelleArchive(models.Model):
+    id = models.UUIDField(primary_key=True, editable=False, verbose_name="ID unique")
+    transaction = models.ForeignKey(
+        TransactionArchivee,
+        on_delete=models.CASCADE,
+        related_name='libelles',
+        verbose_name="Transaction"
+    )
+    nom = models.CharField(max_length=200, verbose_name="Nom du libellé")
+    date = models.DateTimeField(verbose_name="Date du libellé")
+    montant = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Montant")
+    commentaire = models.TextField(blank=True, null=True, verbose_name="Commentaire")
+    created_at = models.DateTimeField(verbose_name="Créé le")
+    updated_at = models.DateTimeField(verbose_name="Modifié le")
+    
+    objects = LigneShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_libelle_archive'
+        ordering = ['date', 'created_at']
+        verbose_name = "Libellé archivé"
+        verbose_name_plural = "Libellés archivés"
+        indexes = [
+            models.Index(fields=['transaction', 'date', 'montant']),
+        ]
+
+
+class PhotoArchivee(models.Model):
+    """Le fichier reste dans le stockage : seule la ligne est archivée"""
+    
+    id = models.UUIDField(primary_key=True, editable=False, verbose_name="ID unique")
+    transaction = models.ForeignKey(
+        TransactionArchivee,
+        on_delete=models.CASCADE,
+        related_name='photos',
+        verbose_name="Transaction"
+    )
+    image = models.ImageField(upload_to='transactions/%Y/%m/', verbose_name="Photo/Reçu")
+    legende = models.CharField(max_length=200, blank=True, null=True, verbose_name="Légende")
+    created_at = models.DateTimeField(verbose_name="Ajoutée le")
+    updated_at = models.DateTimeField(verbose_name="Modifiée le")
+    
+    objects = LigneShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_photo_archive'
+        ordering = ['-created_at']
+        verbose_name = "Photo archivée"
+        verbose_name_plural = "Photos archivées"
+
+
+class ResumeArchive(models.Model):
+    """
+    Résumé mensuel conservé pour les libellés archivés, par catégorie et
+    statut : les totaux restent interrogeables sans relire les archives.
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='resumes_archives',
+        verbose_name="Utilisateur",
+        db_constraint=False
+    )
+    mois = models.DateField(verbose_name="Mois", help_text="Premier jour du mois")
+    volet = models.CharField(max_length=10, choices=Transaction.VOLET_CHOICES, verbose_name="Volet")
+    position = models.CharField(max_length=10, choices=Transaction.TYPE_CHOICES, verbose_name="Position")
+    statut = models.CharField(max_length=20, choices=Transaction.STATUT_CHOICES, verbose_name="Statut")
+    categorie = models.ForeignKey(
+        Categorie,
+        on_delete=models.PROTECT,
+        related_name='resumes_archives',
+        verbose_name="Catégorie"
+    )
+    montant = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Montant")
+    nb_libelles = models.PositiveIntegerField(verbose_name="Libellés")
+    
+    objects = ShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_resume_archive'
+        ordering = ['mois']
+        verbose_name = "Résumé d'archive"
+        verbose_name_plural = "Résumés d'archives"
+        unique_together = [['user', 'mois', 'volet', 'position', 'statut', 'categorie']]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.mois:%Y-%m} {self.volet}/{self.position} : {self.montant}"
+
+
+class NomLibelle(models.Model):
+    """
+    Index d'autocomplétion : un nom de libellé déjà utilisé par un
+    utilisateur, avec sa fréquence, son dernier usage et la catégorie et le
+    montant de ce dernier usage (voir transactions/suggestions.py).
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='noms_libelles',
+        verbose_name="Utilisateur",
+        db_constraint=False
+    )
+    cle = models.CharField(
+        max_length=200,
+        verbose_name="Clé",
+        help_text="Nom normalisé (minuscules, sans accents)"
+    )
+    nom = models.CharField(max_length=200, verbose_name="Nom", help_text="Forme du dernier usage")
+    nb_utilisations = models.PositiveIntegerField(default=0, verbose_name="Utilisations")
+    dernier_usage = models.DateTimeField(verbose_name="Dernier usage")
+    categorie = models.ForeignKey(
+        Categorie,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='noms_libelles',
+        verbose_name="Catégorie"
+    )
+    montant = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Dernier montant")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
+    
+    objects = ShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_nomlibelle'
+        verbose_name = "Nom de libellé"
+        verbose_name_plural = "Noms de libellés"
+        unique_together = [['user', 'cle']]
+    
+    def __str__(self):
+        return f"{self.nom} ({self.nb_utilisations})"
+
+
+def seuils_par_defaut():
+    return [80, 100]
+
+
+class RegleAlerte(models.Model):
+    """
+    Alerte de budget d'un utilisateur sur une catégorie de dépenses (et ses
+    sous-catégories) : prévenir quand le suivi du mois atteint chacun des
+    seuils, en % du budget du mois (voir transactions/alertes.py).
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='regles_alertes',
+        verbose_name="Utilisateur",
+        db_constraint=False
+    )
+    categorie = models.ForeignKey(
+        Categorie,
+        on_delete=models.CASCADE,
+        related_name='regles_alertes',
+        verbose_name="Catégorie"
+    )
+    seuils = models.JSONField(
+        default=seuils_par_defaut,
+        verbose_name="Seuils",
+        help_text="Pourcentages du budget du mois (ex: [80, 100])"
+    )
+    est_active = models.BooleanField(default=True, verbose_name="Active")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créée le")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifiée le")
+    
+    objects = ShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_regle_alerte'
+        ordering = ['created_at']
+        verbose_name = "Règle d'alerte"
+        verbose_name_plural = "Règles d'alerte"
+        unique_together = [['user', 'categorie']]
+    
+    def __str__(self):
+        return f"{self.categorie_id} : {', '.join(f'{seuil} %' for seuil in self.seuils)}"
+
+
+class AlerteBudget(models.Model):
+    """Seuil franchi : une seule alerte par règle, mois et seuil"""
+    
+    regle = models.ForeignKey(
+        RegleAlerte,
+        on_delete=models.CASCADE,
+        related_name='alertes',
+        verbose_name="Règle"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='alertes_budget',
+        verbose_name="Utilisateur",
+        db_constraint=False
+    )
+    mois = models.DateField(verbose_name="Mois", help_text="Premier jour du mois")
+    seuil = models.PositiveSmallIntegerField(verbose_name="Seuil (%)")
+    depense = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Dépensé")
+    budget = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Budget")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Déclenchée le")
+    envoyee_le = models.DateTimeField(null=True, blank=True, verbose_name="Envoyée le")
+    
+    objects = ShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_alerte_budget'
+        ordering = ['-created_at']
+        verbose_name = "Alerte de budget"
+        verbose_name_plural = "Alertes de budget"
+        unique_together = [['regle', 'mois', 'seuil']]
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.regle.categorie.nom} {self.mois:%Y-%m} : {self.seuil} %"
+
+
+class Apercu(models.Model):
+    """
+    Aperçu des dépenses d'un utilisateur pour une catégorie, recalculé
+    chaque nuit par `manage.py calculer_apercus` (voir transactions/apercus.py) :
+    dépense inhabituelle, tendance et projection de fin de mois.
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='apercus',
+        verbose_name="Utilisateur",
+        db_constraint=False
+    )
+    categorie = models.ForeignKey(
+        Categorie,
+        on_delete=models.CASCADE,
+        related_name='apercus',
+        verbose_name="Catégorie"
+    )
+    mois = models.DateField(verbose_name="Mois", help_text="Premier jour du mois courant au calcul")
+    depense_mois = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Dépensé ce mois")
+    moyenne_journaliere = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        verbose_name="Moyenne journalière",
+        help_text="Sur les 4 dernières semaines"
+    )
+    projection_fin_mois = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Projection fin de mois")
+    tendance = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name="Tendance",
+        help_text="Variation relative sur 30 jours (0.1 = +10 %), vide sans historique"
+    )
+    est_inhabituelle = models.BooleanField(default=False, verbose_name="Dépense inhabituelle")
+    score_inhabituel = models.FloatField(
+        default=0,
+        verbose_name="Score",
+        help_text="Écarts-types du plus gros jour récent au-dessus de la moyenne"
+    )
+    jour_inhabituel = models.DateField(null=True, blank=True, verbose_name="Jour inhabituel")
+    calcule_le = models.DateTimeField(auto_now=True, verbose_name="Calculé le")
+    
+    objects = ShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_apercu'
+        ordering = ['-est_inhabituelle', '-depense_mois']
+        verbose_name = "Aperçu des dépenses"
+        verbose_name_plural = "Aperçus des dépenses"
+        unique_together = [['user', 'categorie']]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.categorie_id} {self.mois:%Y-%m}"
+
+
+class Releve(models.Model):
+    """
+    Relevé mensuel d'un utilisateur (totaux par catégorie, comparaison au
+    budget, libellés), généré en fin de mois par `manage.py generer_releves`
+    (voir transactions/releves.py). Le fichier HTML est dans le stockage.
+    """
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='releves',
+        verbose_name="Utilisateur",
+        db_constraint=False
+    )
+    mois = models.DateField(verbose_name="Mois", help_text="Premier jour du mois")
+    fichier = models.FileField(upload_to='releves/%Y/%m/', max_length=255, verbose_name="Fichier")
+    total_revenus = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Revenus")
+    total_depenses = models.DecimalField(max_digits=14, decimal_places=2, verbose_name="Dépenses")
+    nb_libelles = models.PositiveIntegerField(verbose_name="Libellés")
+    genere_le = models.DateTimeField(auto_now_add=True, verbose_name="Généré le")
+    
+    objects = ShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_releve'
+        ordering = ['-mois']
+        verbose_name = "Relevé mensuel"
+        verbose_name_plural = "Relevés mensuels"
+        unique_together = [['user', 'mois']]
+    
+    def __str__(self):
+        return f"Relevé {self.user_id} {self.mois:%Y-%m}"
+
+
+class Suppression(models.Model):
+    """Trace (tombstone) d'une suppression définitive, pour la synchronisation hors ligne"""
+    
+    MODELE_CHOICES = [
+        ('categorie', 'Catégorie'),
+        ('transaction', 'Transaction'),
+        ('libelle', 'Libellé'),
+        ('photo', 'Photo'),
+    ]
+    
+    modele = models.CharField(
+        max_length=20,
+        choices=MODELE_CHOICES,
+        verbose_name="Modèle"
+    )
+    objet_id = models.UUIDField(verbose_name="ID de l'objet supprimé")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='suppressions',
+        verbose_name="Utilisateur",
+        help_text="Vide pour une catégorie prédéfinie (concerne tous les utilisateurs)",
+        db_constraint=False
+    )
+    supprime_le = models.DateTimeField(auto_now_add=True, verbose_name="Supprimé le")
+    
+    class Meta:
+        db_table = 'transactions_suppression'
+        ordering = ['supprime_le', 'id']
+        verbose_name = "Suppression"
+        verbose_name_plural = "Suppressions"
+        indexes = [
+            models.Index(fields=['user', 'supprime_le']),
+            models.Index(fields=['supprime_le']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_modele_display()} {self.objet_id} supprimé(e) le {self.supprime_le:%Y-%m-%d}"
+
+
+class CleIdempotence(models.Model):
+    """Clé d'idempotence d'une opération envoyée en lot par un client hors ligne"""
+    
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cles_idempotence',
+        verbose_name="Utilisateur",
+        db_constraint=False
+    )
+    cle = models.CharField(max_length=100, verbose_name="Clé")
+    empreinte = models.CharField(
+        max_length=64,
+        verbose_name="Empreinte",
+        help_text="SHA-256 de l'opération, pour refuser une clé réutilisée"
+    )
+    resultat = models.JSONField(verbose_name="Résultat")
+    expire_le = models.DateTimeField(verbose_name="Expire le")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créée le")
+    
+    objects = ShardedQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'transactions_cleidempotence'
+        verbose_name = "Clé d'idempotence"
+        verbose_name_plural = "Clés d'idempotence"
+        unique_together = [['user', 'cle']]
+        indexes = [
+            models.Index(fields=['user', 'expire_le']),
+        ]
     
     def __str__(self):
-        return f"Photo - {self.transaction}"
\ No newline at end of file
+        return f"{self.cle} ({self.user_id})"
@@ -0,0 +1,310 @@
+# backend/transactions/plans.py
+"""
+Plans d'exécution des requêtes chaudes de l'API.
+
+Sur un jeu de données généré (annulé à la fin, rien n'est écrit), chaque
+scénario appelle une action de ViewSet, capture son SQL et demande le plan
+de chaque SELECT à la base : EXPLAIN QUERY PLAN (SQLite) ou
+EXPLAIN (FORMAT JSON) (PostgreSQL). Sont relevés :
+
+- les parcours complets d'une table ("parcours <table>") ;
+- les tris sans index (B-tree temporaire SQLite, nœud Sort PostgreSQL) ;
+- les index utilisés, et les index déclarés (Meta.indexes) jamais utilisés.
+
+Sur PostgreSQL, enable_seqscan et enable_sort sont désactivés le temps de
+l'analyse : sur un petit jeu de données le planificateur préférerait un
+parcours complet même là où un index convient, on vérifie donc qu'un index
+est *utilisable*.
+
+La référence (plans_reference.json, par moteur) liste pour chaque scénario
+les constats acceptés et les index utilisés. Une régression est un constat
+nouveau ou un index de la référence qui n'est plus utilisé.
+
+    manage.py analyser_plans               # rapport, code d'erreur si régression
+    manage.py analyser_plans --enregistrer # accepte les plans actuels
+
+Dans un test (toutes les bases : les données vivent sur les shards) :
+
+    class PlansTests(TestCase):
+        databases = '__all__'
+
+        def test_plans(self):
+            verifier_plans()
+"""
+import json
+import re
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections, transaction as db_transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from Moonit_backend.replicas import marquer_ecriture
+from .models import (
+    Categorie, Transaction, Libelle, Photo, Recurrence, SoldeMensuel,
+    TransactionArchivee, LibelleArchive, ResumeArchive, NomLibelle
+)
+from .sharding import shard_pour
+from .suggestions import reconstruire_index
+
+REFERENCE = Path(__file__).with_name('plans_reference.json')
+
+# Modèles dont les index déclarés doivent servir à au moins un scénario
+MODELES_SURVEILLES = [
+    Transaction, Libelle, Photo, Recurrence, SoldeMensuel,
+    TransactionArchivee, LibelleArchive, ResumeArchive, NomLibelle,
+]
+
+NOMS = ['Loyer', 'Courses marché', 'Carburant', 'Salaire', 'Électricité', 'Pharmacie', 'Restaurant', 'Internet']
+
+
+def _scenarios(transaction_id, aujourd_hui):
+    """(nom, URL) des actions analysées"""
+    mois = f"annee={aujourd_hui.year}&mois={aujourd_hui.month}"
+    debut = (aujourd_hui - timedelta(days=60)).isoformat()
+    return [
+        ('transactions.list', reverse('transactions-list')),
+        ('transactions.list.filtres',
+         reverse('transactions-list') + f"?statut=validee&volet=suivi&montant_min=100&date_debut={debut}"),
+        ('transactions.list.total', reverse('transactions-list') + "?total_min=1000"),
+        ('transactions.list.recherche', reverse('transactions-list') + "?search=loyer"),
+        ('transactions.retrieve', reverse('transactions-detail', args=[transaction_id])),
+        ('transactions.statistiques', reverse('transactions-statistiques')),
+        ('transactions.statistiques.niveau', reverse('transactions-statistiques') + "?niveau=1"),
+        ('transactions.tresorerie', reverse('transactions-tresorerie')),
+        ('transactions.par_mois', reverse('transactions-par-mois') + f"?{mois}"),
+        ('transactions.budget', reverse('transactions-budget')),
+        ('transactions.suivi', reverse('transactions-suivi')),
+        ('transactions.recentes', reverse('transactions-recentes')),
+        ('transactions.sync', reverse('transactions-sync')),
+        ('transactions.suggestions', reverse('transactions-suggestions') + "?q=co"),
+        ('categories.list', reverse('categories-list')),
+        ('recurrences.list', reverse('recurrences-list')),
+        ('archives.list', reverse('archives-list')),
+        ('archives.list.filtres', reverse('archives-list') + "?montant_min=100&date_fin=" + debut),
+        ('archives.resumes', reverse('archives-resumes')),
+    ]
+
+
+def _peupler(user, voisin, nb_transactions):
+    """Transactions, libellés et archives de `user` et d'un voisin sur le même shard"""
+    categories = list(Categorie.objects.filter(est_predefinite=True)[:5])
+    if not categories:
+        # Base vide (tests) : catégories de l'analyse, annulées avec le reste
+        categories = [
+            Categorie.objects.create(nom=nom, type_categorie=type_categorie, est_predefinite=True)
+            for nom, type_categorie in (('Alimentation', 'depense'), ('Logement', 'depense'), ('Salaire', 'revenu'))
+        ]
+    maintenant = timezone.now()
+    for proprietaire in (user, voisin):
+        alias = shard_pour(proprietaire.pk)
+        transactions = Transaction.objects.using(alias).bulk_create([
+            Transaction(
+                user_id=proprietaire.pk,
+                volet=('suivi', 'budget')[i % 2],
+                position=('depense', 'depense', 'revenu')[i % 3],
+                categorie=categories[i % len(categories)],
+                statut=('validee', 'validee', 'validee', 'en_attente')[i % 4],
+            )
+            for i in range(nb_transactions)
+        ], batch_size=500)
+        Libelle.objects.using(alias).bulk_create([
+            Libelle(
+                transaction=transaction,
+                nom=NOMS[(i + j) % len(NOMS)],
+                date=maintenant - timedelta(days=(i * 7 + j) % 180),
+                montant=Decimal(50 + (i * 37 + j * 11) % 2000),
+            )
+            for i, transaction in enumerate(transactions) for j in range(1 + i % 3)
+        ], batch_size=500)
+        archives = TransactionArchivee.objects.using(alias).bulk_create([
+            TransactionArchivee(
+                id=uuid.uuid4(), user_id=proprietaire.pk, volet='suivi', position='depense',
+                categorie=categories[i % len(categories)], statut='validee', devise='XAF',
+                created_at=maintenant - timedelta(days=900 + i), updated_at=maintenant,
+            )
+            for i in range(nb_transactions // 10)
+        ])
+        LibelleArchive.objects.using(alias).bulk_create([
+            LibelleArchive(
+                id=uuid.uuid4(), transaction=archive, nom=NOMS[i % len(NOMS)],
+                date=archive.created_at, montant=Decimal(100 + i),
+                created_at=archive.created_at, updated_at=maintenant,
+            )
+            for i, archive in enumerate(archives)
+        ])
+        reconstruire_index(alias, proprietaire.pk)
+    return Transaction.objects.pour_utilisateur(user).values_list('pk', flat=True).first()
+
+
+# ========== LECTURE DES PLANS ==========
+
+def _alias_tables(sql):
+    """Alias SQL (U0, T3...) -> table, pour les plans SQLite qui nomment les alias"""
+    return {alias: table for table, alias in re.findall(r'"(\w+)" (?:AS )?"?([A-Z]\d+)"?\b', sql)}
+
+
+def _plan_sqlite(curseur, sql):
+    curseur.execute(f"EXPLAIN QUERY PLAN {sql}")
+    tables = _alias_tables(sql)
+    constats, index = set(), set()
+    for *_, detail in curseur.fetchall():
+        utilise = re.search(r'USING (?:COVERING )?INDEX (\S+)', detail)
+        if utilise:
+            index.add(utilise.group(1))
+        parcours = re.match(r'SCAN (\S+)', detail)
+        # "SCAN CONSTANT ROW" / sous-requêtes matérialisées : pas une table
+        if parcours and not detail.startswith(('SCAN CONSTANT', 'SCAN (subquery')):
+            constats.add(f"parcours {tables.get(parcours.group(1), parcours.group(1))}")
+        # Tris de GROUP BY / DISTINCT ignorés : seul l'ordre des résultats doit venir d'un index
+        if 'TEMP B-TREE FOR' in detail and 'ORDER BY' in detail:
+            constats.add(f"tri temporaire ({detail.split(' FOR ', 1)[-1]})")
+    return constats, index
+
+
+def _plan_postgresql(curseur, sql):
+    curseur.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+    plan = curseur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    constats, index = set(), set()
+    noeuds = [plan[0]['Plan']]
+    while noeuds:
+        noeud = noeuds.pop()
+        noeuds.extend(noeud.get('Plans', []))
+        if noeud.get('Index Name'):
+            index.add(noeud['Index Name'])
+        if noeud['Node Type'] == 'Seq Scan':
+            constats.add(f"parcours {noeud['Relation Name']}")
+        if noeud['Node Type'] == 'Sort':
+            constats.add("tri temporaire (ORDER BY)")
+        elif noeud['Node Type'] == 'Incremental Sort':
+            constats.add("tri temporaire (RIGHT PART OF ORDER BY)")
+    return constats, index
+
+
+LECTEURS = {
+    'sqlite': _plan_sqlite,
+    'postgresql': _plan_postgresql,
+}
+
+
+def _index_declares():
+    """Nom des index Meta.indexes des modèles surveillés -> table"""
+    return {
+        index.name: model._meta.db_table
+        for model in MODELES_SURVEILLES for index in model._meta.indexes
+    }
+
+
+# ========== ANALYSE ==========
+
+class _Annulation(Exception):
+    pass
+
+
+def analyser(nb_transactions=300):
+    """
+    Retourne {'moteur', 'scenarios': {nom: {'constats', 'index'}}, 'index_inutilises'}.
+    Les données générées sont annulées en fin d'analyse.
+    """
+    resultat = {}
+    suffixe = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    try:
+        with db_transaction.atomic(using=DEFAULT_DB_ALIAS):
+            user = User.objects.create(username=f"plans-{suffixe}")
+            voisin = User.objects.create(username=f"plans-voisin-{suffixe}")
+            alias = shard_pour(user.pk)
+            with db_transaction.atomic(using=alias):
+                lecteur = LECTEURS.get(connections[alias].vendor)
+                if lecteur is None:
+                    raise NotImplementedError(f"Moteur non pris en charge : {connections[alias].vendor}")
+                transaction_id = _peupler(user, voisin, nb_transactions)
+                resultat = _analyser_scenarios(user, alias, transaction_id, lecteur)
+                raise _Annulation
+    except _Annulation:
+        pass
+    return resultat
+
+
+def _analyser_scenarios(user, alias, transaction_id, lecteur):
+    connexion = connections[alias]
+    # Données non validées : invisibles des réplicas
+    marquer_ecriture(user)
+    client = APIClient()
+    client.force_authenticate(user)
+    with connexion.cursor() as curseur:
+        if connexion.vendor == 'postgresql':
+            curseur.execute("SET LOCAL enable_seqscan = off")
+            curseur.execute("SET LOCAL enable_sort = off")
+
+    scenarios = {}
+    for nom, url in _scenarios(transaction_id, timezone.localdate()):
+        # Sans limitation de débit : les scénarios ne consomment pas de jetons
+        with override_settings(LIMITES_ACTIVES=False), CaptureQueriesContext(connexion) as requetes:
+            reponse = client.get(url)
+        if reponse.status_code != 200:
+            raise AssertionError(f"{nom} : {url} a répondu {reponse.status_code}")
+        constats, index = set(), set()
+        with connexion.cursor() as curseur:
+            for requete in requetes.captured_queries:
+                sql = requete['sql']
+                if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                    continue
+                plan_constats, plan_index = lecteur(curseur, sql)
+                constats |= plan_constats
+                index |= plan_index
+        scenarios[nom] = {'constats': sorted(constats), 'index': sorted(index)}
+
+    utilises = {nom for scenario in scenarios.values() for nom in scenario['index']}
+    return {
+        'moteur': connexion.vendor,
+        'scenarios': scenarios,
+        'index_inutilises': sorted(
+            f"{table}.{nom}" for nom, table in _index_declares().items() if nom not in utilises
+        ),
+    }
+
+
+def charger_reference(chemin=REFERENCE):
+    chemin = Path(chemin)
+    if not chemin.exists():
+        return {}
+    return json.loads(chemin.read_text(encoding='utf-8'))
+
+
+def enregistrer_reference(resultat, chemin=REFERENCE):
+    """Accepte les plans de `resultat` comme référence de son moteur (les autres moteurs sont conservés)"""
+    reference = charger_reference(chemin)
+    reference[resultat['moteur']] = resultat['scenarios']
+    Path(chemin).write_text(
+        json.dumps(reference, indent=2, sort_keys=True, ensure_ascii=False) + '\n', encoding='utf-8'
+    )
+
+
+def regressions(resultat, reference):
+    """Liste lisible des écarts de `resultat` par rapport à la référence de son moteur"""
+    attendus = reference.get(resultat['moteur'], {})
+    ecarts = []
+    for nom, scenario in resultat['scenarios'].items():
+        attendu = attendus.get(nom, {'constats': [], 'index': []})
+        for constat in sorted(set(scenario['constats']) - set(attendu['constats'])):
+            ecarts.append(f"{nom} : {constat}")
+        for index in sorted(set(attendu['index']) - set(scenario['index'])):
+            ecarts.append(f"{nom} : index {index} n'est plus utilisé")
+    return ecarts
+
+
+def verifier_plans(chemin=REFERENCE, nb_transactions=300):
+    """Aide de test : AssertionError si un plan a régressé par rapport à la référence"""
+    resultat = analyser(nb_transactions)
+    ecarts = regressions(resultat, charger_reference(chemin))
+    if ecarts:
+        raise AssertionError("Plans d'exécution en régression :\n" + '\n'.join(ecarts))
+    return resultat
@@ -0,0 +1,162 @@
+# backend/transactions/projections.py
+"""
+Chemin de lecture rapide des listes de transactions.
+
+Construit exactement le JSON de TransactionListSerializer / TransactionSerializer
+à partir de projections .values() : la catégorie vient d'une jointure, les
+agrégats de libellés de sous-requêtes corrélées (insensibles aux jointures
+ajoutées par la recherche), sans instancier de modèles ni de champs DRF.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, OuterRef, Subquery, Sum
+from rest_framework import serializers
+
+from utils.champs import ChampsDemandes
+from .models import Libelle, Photo
+
+_date_heure = serializers.DateTimeField()
+
+# SQLite renvoie les SUM() décimales sans l'échelle de la colonne
+_CENTIMES = Decimal(1).scaleb(-Libelle._meta.get_field('montant').decimal_places)
+
+CHAMPS_CATEGORIE = ('id', 'nom', 'icone', 'couleur', 'type_categorie')
+CHAMPS_LIBELLE = ('id', 'nom', 'date', 'montant', 'commentaire', 'created_at', 'updated_at')
+CHAMPS_PHOTO = ('id', 'image', 'legende', 'created_at')
+
+
+def _date(valeur):
+    return _date_heure.to_representation(valeur) if valeur is not None else None
+
+
+def _montant(valeur):
+    return '{:f}'.format(valeur) if valeur is not None else None
+
+
+def total_annote(valeur):
+    # sum() sur zéro libellé renvoie 0 dans les serializers
+    return valeur.quantize(_CENTIMES) if valeur is not None else 0
+
+
+def annoter_agregats_libelles(queryset):
+    """Annote montant_total, nb_libelles et premier_libelle par sous-requêtes"""
+    libelles = Libelle.objects.filter(transaction=OuterRef('pk')).order_by()
+    return queryset.annotate(
+        _montant_total=Subquery(
+            libelles.values('transaction').annotate(total=Sum('montant')).values('total')
+        ),
+        _nb_libelles=Subquery(
+            libelles.values('transaction').annotate(nombre=Count('pk')).values('nombre')
+        ),
+        _premier_libelle=Subquery(
+            libelles.order_by('date', 'created_at').values('nom')[:1]
+        ),
+    )
+
+
+def _categorie(ligne):
+    return {
+        champ: str(ligne['categorie__id']) if champ == 'id' else ligne[f'categorie__{champ}']
+        for champ in CHAMPS_CATEGORIE
+    }
+
+
+def _colonnes_transaction(*extra):
+    return (
+        'id', *extra, 'volet', 'position', 'statut', 'devise',
+        *(f'categorie__{champ}' for champ in CHAMPS_CATEGORIE),
+        '_montant_total', '_nb_libelles', 'created_at', 'updated_at',
+    )
+
+
+def lignes_liste(queryset, request=None):
+    """Équivalent de TransactionListSerializer(queryset, many=True).data (+ ?fields=)"""
+    demandes = ChampsDemandes(request)
+    lignes = (
+        annoter_agregats_libelles(queryset.prefetch_related(None))
+        .values(*_colonnes_transaction(), '_premier_libelle')
+    )
+    return [
+        demandes.filtrer({
+            'id': str(ligne['id']),
+            'volet': ligne['volet'],
+            'position': ligne['position'],
+            'categorie': _categorie(ligne),
+            'statut': ligne['statut'],
+            'devise': ligne['devise'],
+            'montant_total': total_annote(ligne['_montant_total']),
+            'nb_libelles': ligne['_nb_libelles'] or 0,
+            'premier_libelle': ligne['_premier_libelle'],
+            'created_at': _date(ligne['created_at']),
+            'updated_at': _date(ligne['updated_at']),
+        })
+        for ligne in lignes
+    ]
+
+
+def lignes_detail(queryset, request=None):
+    """
+    Équivalent de TransactionSerializer(queryset, many=True).data : une requête
+    pour les transactions, plus une par relation demandée (?expand=).
+    """
+    demandes = ChampsDemandes(request)
+    relations = ('libelles', 'photos')
+    transactions = list(
+        annoter_agregats_libelles(queryset.prefetch_related(None))
+        .values(*_colonnes_transaction('user_id'))
+    )
+    ids = [ligne['id'] for ligne in transactions]
+
+    libelles = defaultdict(list)
+    lignes_libelles = Libelle.objects.none()
+    if demandes.inclut_relation('libelles'):
+        lignes_libelles = Libelle.objects.filter(transaction_id__in=ids)
+    for ligne in lignes_libelles.values('transaction_id', *CHAMPS_LIBELLE):
+        libelles[ligne['transaction_id']].append({
+            'id': str(ligne['id']),
+            'nom': ligne['nom'],
+            'date': _date(ligne['date']),
+            'montant': _montant(ligne['montant']),
+            'commentaire': ligne['commentaire'],
+            'created_at': _date(ligne['created_at']),
+            'updated_at': _date(ligne['updated_at']),
+        })
+
+    stockage = Photo._meta.get_field('image').storage
+    photos = defaultdict(list)
+    lignes_photos = Photo.objects.none()
+    if demandes.inclut_relation('photos'):
+        lignes_photos = Photo.objects.filter(transaction_id__in=ids)
+    for ligne in lignes_photos.values('transaction_id', *CHAMPS_PHOTO):
+        url = None
+        if ligne['image']:
+            url = stockage.url(ligne['image'])
+            if request is not None:
+                url = request.build_absolute_uri(url)
+        photos[ligne['transaction_id']].append({
+            'id': str(ligne['id']),
+            'image': url,
+            'image_url': url if request is not None else None,
+            'legende': ligne['legende'],
+            'created_at': _date(ligne['created_at']),
+        })
+
+    return [
+        demandes.filtrer({
+            'id': str(ligne['id']),
+            'user': ligne['user_id'],
+            'volet': ligne['volet'],
+            'position': ligne['position'],
+            'categorie': _categorie(ligne),
+            'statut': ligne['statut'],
+            'devise': ligne['devise'],
+            'libelles': libelles[ligne['id']],
+            'photos': photos[ligne['id']],
+            'montant_total': total_annote(ligne['_montant_total']),
+            'nb_libelles': ligne['_nb_libelles'] or 0,
+            'created_at': _date(ligne['created_at']),
+            'updated_at': _date(ligne['updated_at']),
+        }, relations)
+        for ligne in transactions
+    ]
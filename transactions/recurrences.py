@@ -0,0 +1,149 @@
+# backend/transactions/recurrences.py
+"""
+Génération des transactions récurrentes.
+
+Chaque Recurrence copie sa transaction modèle (et ses libellés) à chaque
+échéance. Le générateur traite toutes les récurrences dues d'un shard en une
+passe : une lecture des règles (modèles et libellés préchargés), puis des
+bulk_create pour les transactions et les libellés et un bulk_update pour
+l'avancement des règles, dans la même transaction SQL.
+
+Pas de doublon possible : l'avancement (prochaine_echeance) est écrit avec
+les occurrences, les règles sont verrouillées pendant la passe quand la base
+le permet, et la contrainte unique (recurrence, echeance) refuse en dernier
+recours une occurrence déjà créée.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from utils.dates import ajouter_mois
+from .models import Recurrence, Transaction, Libelle
+from .sharding import shards
+from .alertes import ecritures_suivi, evaluer_alertes
+from .suggestions import indexer_libelles, usage
+from .tresorerie import invalider_soldes
+
+
+def echeance(recurrence, rang):
+    """Date de la `rang`-ième occurrence (0 = debut), toujours calculée depuis debut"""
+    pas = rang * recurrence.intervalle
+    if recurrence.frequence == 'quotidienne':
+        return recurrence.debut + timedelta(days=pas)
+    if recurrence.frequence == 'hebdomadaire':
+        return recurrence.debut + timedelta(weeks=pas)
+    if recurrence.frequence == 'annuelle':
+        return ajouter_mois(recurrence.debut, 12 * pas)
+    return ajouter_mois(recurrence.debut, pas)
+
+
+def _date_libelle(jour, date_modele):
+    # Même heure locale que le libellé modèle, le jour de l'échéance
+    heure = timezone.localtime(date_modele).time()
+    return timezone.make_aware(datetime.combine(jour, heure))
+
+
+def _occurrence(recurrence, jour):
+    modele = recurrence.modele
+    transaction = Transaction(
+        user_id=modele.user_id,
+        volet=modele.volet,
+        position=modele.position,
+        categorie_id=modele.categorie_id,
+        statut=modele.statut,
+        devise=modele.devise,
+        recurrence=recurrence,
+        echeance=jour,
+    )
+    libelles = [
+        Libelle(
+            transaction=transaction,
+            nom=libelle.nom,
+            date=_date_libelle(jour, libelle.date),
+            montant=libelle.montant,
+            commentaire=libelle.commentaire,
+        )
+        for libelle in modele.libelles.all()
+    ]
+    return transaction, libelles
+
+
+def generer_occurrences(alias, jusqua, nb_recurrences=500, dry_run=False):
+    """
+    Matérialise, sur un shard, les occurrences dues jusqu'à `jusqua` (inclus)
+    d'au plus `nb_recurrences` règles. Après une interruption, toutes les
+    périodes manquées sont rattrapées dans la même passe (au plus
+    RECURRENCES_RATTRAPAGE_MAX par règle, le reste au passage suivant).
+    Retourne (règles traitées, transactions créées).
+    """
+    with db_transaction.atomic(using=alias):
+        recurrences = list(
+            Recurrence.objects.using(alias)
+            .filter(est_active=True, prochaine_echeance__lte=jusqua)
+            .order_by('prochaine_echeance')
+            .select_related('modele')
+            .prefetch_related('modele__libelles')
+            .select_for_update(skip_locked=True, of=('self',))[:nb_recurrences]
+        )
+
+        transactions, libelles = [], []
+        for recurrence in recurrences:
+            for _ in range(settings.RECURRENCES_RATTRAPAGE_MAX):
+                jour = recurrence.prochaine_echeance
+                if jour is None or jour > jusqua:
+                    break
+                if recurrence.fin and jour > recurrence.fin:
+                    recurrence.prochaine_echeance = None
+                    break
+                transaction, lignes = _occurrence(recurrence, jour)
+                transactions.append(transaction)
+                libelles.extend(lignes)
+                recurrence.nb_occurrences += 1
+                recurrence.prochaine_echeance = echeance(recurrence, recurrence.nb_occurrences)
+
+        if dry_run:
+            db_transaction.set_rollback(True, using=alias)
+            return len(recurrences), len(transactions)
+
+        Transaction.objects.using(alias).bulk_create(transactions, batch_size=500)
+        Libelle.objects.using(alias).bulk_create(libelles, batch_size=500)
+        # Rattrapage sur des mois clos : instantanés de solde à recalculer
+        premieres = {}
+        for transaction in transactions:
+            premieres[transaction.user_id] = min(premieres.get(transaction.user_id, transaction.echeance), transaction.echeance)
+        for user_id, jour in premieres.items():
+            invalider_soldes(user_id, jour)
+        usages = {}
+        for libelle in libelles:
+            usages.setdefault(libelle.transaction.user_id, []).append(usage(libelle, libelle.transaction.categorie_id))
+        for user_id, ajouts in usages.items():
+            indexer_libelles(user_id, ajouts=ajouts)
+        ecritures = {}
+        for libelle in libelles:
+            ecritures.setdefault(libelle.transaction.user_id, []).extend(ecritures_suivi(libelle.transaction, [libelle]))
+        for user_id, lignes in ecritures.items():
+            evaluer_alertes(user_id, lignes)
+        # bulk_update ne gère pas auto_now
+        maintenant = timezone.now()
+        for recurrence in recurrences:
+            recurrence.updated_at = maintenant
+        Recurrence.objects.using(alias).bulk_update(
+            recurrences, ['nb_occurrences', 'prochaine_echeance', 'updated_at'], batch_size=500
+        )
+    return len(recurrences), len(transactions)
+
+
+def generer_toutes(jusqua=None, nb_recurrences=500):
+    """Rattrape toutes les récurrences dues sur tous les shards. Retourne le nombre de transactions créées."""
+    jusqua = jusqua or timezone.localdate()
+    total = 0
+    for alias in shards():
+        # Chaque passe fait avancer les règles traitées : on s'arrête quand plus rien n'est dû
+        while True:
+            nb_regles, nb_transactions = generer_occurrences(alias, jusqua, nb_recurrences)
+            total += nb_transactions
+            if nb_regles == 0:
+                break
+    return total
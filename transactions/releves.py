@@ -0,0 +1,165 @@
+# backend/transactions/releves.py
+"""
+Relevés mensuels (HTML) générés en fin de mois pour tous les utilisateurs.
+
+Les utilisateurs d'un shard ayant au moins un libellé de suivi validé dans
+le mois sont traités par lots, répartis sur un pool de processus. Pour un
+lot, trois requêtes suffisent : les totaux groupés par (utilisateur, volet,
+sens, catégorie), les libellés de suivi du mois et les noms d'utilisateur.
+Chaque relevé est rendu (gabarit transactions/releve.html), écrit dans le
+stockage sous un nom fixe (releves/<année>/<mois>/<utilisateur>.html)
+puis enregistré (Releve) à la fin du lot.
+
+Reprise : un utilisateur qui a déjà son Releve du mois est sauté. Après
+une interruption, relancer la génération ne traite que les relevés
+manquants ; un fichier écrit sans son Releve est simplement réécrit.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db.models import Count, Sum
+from django.template.loader import render_to_string
+from django.utils import timezone, translation
+
+from utils.dates import ajouter_mois
+from utils.processus import repartir
+from .models import Categorie, Libelle, Releve
+from .sharding import shards
+from .tresorerie import _instant
+
+_ZERO = Decimal('0.00')
+
+
+def dernier_mois_clos():
+    return ajouter_mois(timezone.localdate().replace(day=1), -1)
+
+
+def _libelles_du_mois(alias, mois):
+    return Libelle.objects.using(alias).filter(
+        transaction__statut='validee',
+        date__gte=_instant(mois),
+        date__lt=_instant(ajouter_mois(mois, 1)),
+    )
+
+
+def _a_generer(alias, mois):
+    """Utilisateurs actifs dans le mois sans relevé, triés"""
+    actifs = set(
+        _libelles_du_mois(alias, mois).filter(transaction__volet='suivi')
+        .values_list('transaction__user_id', flat=True).distinct()
+    )
+    faits = set(Releve.objects.using(alias).filter(mois=mois).values_list('user_id', flat=True))
+    return sorted(actifs - faits)
+
+
+def _contextes(alias, user_ids, mois):
+    """Contexte du gabarit de chaque utilisateur du lot, en requêtes groupées"""
+    libelles = _libelles_du_mois(alias, mois).filter(transaction__user_id__in=user_ids)
+    totaux = list(
+        libelles.values(
+            'transaction__user_id', 'transaction__volet', 'transaction__position', 'transaction__categorie_id'
+        ).annotate(total=Sum('montant'), nombre=Count('id')).order_by()
+    )
+    lignes = list(
+        libelles.filter(transaction__volet='suivi')
+        .values('transaction__user_id', 'transaction__position', 'transaction__categorie_id', 'nom', 'date', 'montant')
+        .order_by('transaction__user_id', 'date')
+    )
+    categories = dict(
+        Categorie.objects.using(alias)
+        .filter(pk__in={ligne['transaction__categorie_id'] for ligne in totaux})
+        .values_list('id', 'nom')
+    )
+    noms = dict(User.objects.filter(pk__in=user_ids).values_list('id', 'username'))
+
+    # (utilisateur, sens, catégorie) -> {'reel', 'budget', 'nombre'}
+    par_categorie = defaultdict(lambda: {'reel': _ZERO, 'budget': _ZERO, 'nombre': 0})
+    for ligne in totaux:
+        cle = (ligne['transaction__user_id'], ligne['transaction__position'], ligne['transaction__categorie_id'])
+        if ligne['transaction__volet'] == 'suivi':
+            par_categorie[cle]['reel'] += ligne['total']
+            par_categorie[cle]['nombre'] += ligne['nombre']
+        else:
+            par_categorie[cle]['budget'] += ligne['total']
+
+    contextes = {
+        user_id: {
+            'utilisateur': noms.get(user_id, ''),
+            'mois': mois,
+            'categories': {'revenu': [], 'depense': []},
+            'totaux': {'revenu': _ZERO, 'depense': _ZERO},
+            'libelles': [],
+        }
+        for user_id in user_ids
+    }
+    for (user_id, position, categorie_id), valeurs in sorted(
+        par_categorie.items(), key=lambda element: -element[1]['reel']
+    ):
+        contexte = contextes[user_id]
+        # Écart négatif = défavorable : dépense au-delà du budget, revenu en deçà
+        ecart = valeurs['budget'] - valeurs['reel'] if position == 'depense' else valeurs['reel'] - valeurs['budget']
+        contexte['categories'][position].append({
+            'nom': categories.get(categorie_id, "Sans catégorie"),
+            'reel': valeurs['reel'],
+            'budget': valeurs['budget'] or None,
+            'ecart': ecart if valeurs['budget'] else None,
+            'nombre': valeurs['nombre'],
+        })
+        contexte['totaux'][position] += valeurs['reel']
+    for ligne in lignes:
+        contextes[ligne['transaction__user_id']]['libelles'].append({
+            'date': timezone.localtime(ligne['date']),
+            'nom': ligne['nom'],
+            'categorie': categories.get(ligne['transaction__categorie_id'], "Sans catégorie"),
+            'position': ligne['transaction__position'],
+            'montant': ligne['montant'],
+        })
+    for contexte in contextes.values():
+        contexte['solde'] = contexte['totaux']['revenu'] - contexte['totaux']['depense']
+    return contextes
+
+
+def _ecrire(stockage, nom, contenu):
+    if stockage.exists(nom):
+        stockage.delete(nom)
+    return stockage.save(nom, ContentFile(contenu.encode('utf-8')))
+
+
+def generer_lot(alias, user_ids, mois):
+    """Rend et enregistre les relevés d'un lot d'utilisateurs d'un shard. Retourne le nombre de relevés."""
+    stockage = Releve._meta.get_field('fichier').storage
+    releves = []
+    for user_id, contexte in _contextes(alias, user_ids, mois).items():
+        with translation.override('fr'):
+            contenu = render_to_string('transactions/releve.html', contexte)
+        nom = _ecrire(stockage, f"releves/{mois:%Y/%m}/{user_id}.html", contenu)
+        releves.append(Releve(
+            user_id=user_id,
+            mois=mois,
+            fichier=nom,
+            total_revenus=contexte['totaux']['revenu'],
+            total_depenses=contexte['totaux']['depense'],
+            nb_libelles=len(contexte['libelles']),
+        ))
+    # Relance concurrente : le relevé déjà enregistré pointe sur le même fichier
+    Releve.objects.using(alias).bulk_create(releves, batch_size=500, ignore_conflicts=True)
+    return len(releves)
+
+
+def generer_releves(mois=None, processus=None, taille_lot=None):
+    """
+    Génère les relevés manquants de `mois` (premier jour ; par défaut le
+    dernier mois clos) sur tous les shards. Retourne le nombre de relevés.
+    """
+    mois = (mois or dernier_mois_clos()).replace(day=1)
+    processus = settings.RELEVES_PROCESSUS if processus is None else processus
+    taille_lot = taille_lot or settings.RELEVES_TAILLE_LOT
+
+    travaux = []
+    for alias in shards():
+        user_ids = _a_generer(alias, mois)
+        travaux += [(alias, user_ids[i:i + taille_lot], mois) for i in range(0, len(user_ids), taille_lot)]
+    return sum(repartir(generer_lot, travaux, processus))
@@ -1,7 +1,21 @@
 # backend/transactions/serializers.py
 from rest_framework import serializers
+from django.urls import reverse
+from django.conf import settings
+from django.db import transaction as db_transaction
 from django.db.models import Q
-from .models import Transaction, Libelle, Photo, Categorie
+from utils.champs import ChampsDynamiquesMixin
+from .models import (
+    Transaction, Libelle, Photo, Categorie, Suppression, Recurrence,
+    TransactionArchivee, LibelleArchive, PhotoArchivee, ResumeArchive, RegleAlerte, AlerteBudget,
+    Apercu, Releve
+)
+from .alertes import ecritures_suivi, evaluer_alertes
+from .catalogue import categorie_active, predefinies
+from .hierarchie import erreur_parent
+from .projections import total_annote
+from .suggestions import indexer_libelles, usage
+from .tresorerie import invalider_soldes
 
 # ========== SERIALIZERS DE BASE ==========
 
@@ -12,6 +26,11 @@ class LibelleSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class LibelleImbriqueSerializer(LibelleSerializer):
+    """Libellé dans une transaction modifiée : avec id = mise à jour, sans id = création"""
+    id = serializers.UUIDField(required=False)
+
+
 class PhotoSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
     
@@ -33,10 +52,35 @@ class CategorieSerializer(serializers.ModelSerializer):
         model = Categorie
         fields = [
             'id', 'nom', 'type_categorie', 'icone', 'couleur',
-            'est_predefinite', 'est_active', 'ordre', 
+            'est_predefinite', 'est_active', 'ordre', 'parent', 'profondeur',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'est_predefinite', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'est_predefinite', 'profondeur', 'created_at', 'updated_at']
+    
+    def validate_parent(self, value):
+        """Validation : parent prédéfini ou créé par l'utilisateur"""
+        user = self.context['request'].user
+        if value is not None and not (value.est_predefinite or value.creee_par_id == user.pk):
+            raise serializers.ValidationError("Catégorie parente introuvable.")
+        return value
+    
+    def validate(self, attrs):
+        """Validation : même type que le parent, sans cycle, profondeur limitée"""
+        categorie = self.instance or Categorie()
+        if 'type_categorie' in attrs and self.instance is not None \
+                and attrs['type_categorie'] != self.instance.type_categorie and self.instance.enfants.exists():
+            raise serializers.ValidationError(
+                {'type_categorie': "Impossible de changer le type d'une catégorie qui a des sous-catégories."}
+            )
+        if 'parent' in attrs:
+            if self.instance is not None and self.instance.est_predefinite \
+                    and attrs['parent'] != self.instance.parent:
+                raise serializers.ValidationError({'parent': "Impossible de déplacer une catégorie prédéfinie."})
+            categorie.type_categorie = attrs.get('type_categorie', categorie.type_categorie)
+            erreur = erreur_parent(categorie, attrs['parent'])
+            if erreur:
+                raise serializers.ValidationError({'parent': erreur})
+        return attrs
     
     def create(self, validated_data):
         # Assigner l'utilisateur comme créateur
@@ -75,6 +119,15 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
     
     def validate_categorie_id(self, value):
         """Validation : Catégorie existe et est active"""
+        # Traitement par lot : les catégories accessibles sont chargées une fois
+        accessibles = self.context.get('categories_accessibles')
+        if accessibles is not None:
+            if value not in accessibles:
+                raise serializers.ValidationError("Catégorie invalide ou inaccessible")
+            return value
+        
+        if value in predefinies().categories:
+            return value
         user = self.context['request'].user
         try:
             # Catégorie prédéfinie OU créée par l'utilisateur
@@ -99,25 +152,31 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
         
         # Récupérer la catégorie
         try:
-            categorie = Categorie.objects.get(id=categorie_id, est_active=True)
+            categorie = categorie_active(categorie_id)
         except Categorie.DoesNotExist:
             raise serializers.ValidationError({"categorie_id": "Catégorie introuvable"})
         
-        # Créer la transaction
-        transaction = Transaction.objects.create(
-            categorie=categorie,
-            user=self.context['request'].user,  # Assigné automatiquement
-            **validated_data
-        )
-        
-        # Créer les libellés
-        libelles_crees = []
-        for libelle_data in libelles_data:
-            libelle = Libelle.objects.create(
-                transaction=transaction,
-                **libelle_data
+        # Une seule transaction SQL : avec SQLite (BEGIN IMMEDIATE) l'écrivain
+        # prend le verrou une fois pour la transaction et tous ses libellés
+        with db_transaction.atomic():
+            # Créer la transaction
+            transaction = Transaction.objects.create(
+                categorie=categorie,
+                user=self.context['request'].user,  # Assigné automatiquement
+                **validated_data
             )
-            libelles_crees.append(libelle)
+            
+            # Créer les libellés
+            libelles = Libelle.objects.bulk_create([
+                Libelle(transaction=transaction, **libelle_data)
+                for libelle_data in libelles_data
+            ])
+            # Libellés antidatés : les instantanés de solde de ces mois sont périmés
+            invalider_soldes(transaction.user_id, min(libelle['date'] for libelle in libelles_data))
+            indexer_libelles(
+                transaction.user_id, ajouts=[usage(libelle, transaction.categorie_id) for libelle in libelles]
+            )
+            evaluer_alertes(transaction.user_id, ecritures_suivi(transaction, libelles))
         
         return transaction
     
@@ -155,14 +214,19 @@ class TransactionListSerializer(serializers.ModelSerializer):
         return premier.nom if premier else None
 
 
-class TransactionSerializer(serializers.ModelSerializer):
-    """Serializer complet pour AFFICHER/MODIFIER une transaction"""
+class TransactionSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+    """
+    Serializer complet pour AFFICHER/MODIFIER une transaction
+    
+    Supporte ?fields= et ?expand=libelles,photos (voir utils.champs)
+    """
     
     categorie = CategorieDetailSerializer(read_only=True)
     categorie_id = serializers.UUIDField(write_only=True, required=False)
     
     # ✅ Utiliser source='libelles' et many=True pour lire correctement
-    libelles = LibelleSerializer(many=True, read_only=True)
+    # En écriture : l'ensemble complet des libellés voulus (absents = supprimés)
+    libelles = LibelleImbriqueSerializer(many=True, required=False)
     photos = PhotoSerializer(many=True, read_only=True)
     
     montant_total = serializers.SerializerMethodField()
@@ -179,21 +243,44 @@ class TransactionSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        relations_extensibles = ['libelles', 'photos']
     
     def get_montant_total(self, obj):
+        # Agrégat annoté par la vue : les libellés n'ont pas besoin d'être chargés
+        if hasattr(obj, '_montant_total'):
+            return total_annote(obj._montant_total)
         # ✅ IMPORTANT : Utiliser .all() pour éviter l'erreur RelatedManager
         return sum(libelle.montant for libelle in obj.libelles.all())
     
     def get_nb_libelles(self, obj):
+        if hasattr(obj, '_nb_libelles'):
+            return obj._nb_libelles or 0
         return obj.libelles.count()
     
+    def validate_libelles(self, value):
+        """Validation : Au moins un libellé, identifiants uniques"""
+        if not value:
+            raise serializers.ValidationError("Une transaction doit avoir au moins un libellé")
+        ids = [libelle['id'] for libelle in value if 'id' in libelle]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Un libellé ne peut apparaître qu'une fois")
+        # En PATCH les champs imbriqués sont facultatifs, sauf pour une création
+        for libelle in value:
+            manquants = [champ for champ in ('nom', 'date', 'montant') if champ not in libelle]
+            if 'id' not in libelle and manquants:
+                raise serializers.ValidationError(
+                    f"Champs requis pour un nouveau libellé : {', '.join(manquants)}"
+                )
+        return value
+    
     def update(self, instance, validated_data):
-        """Mise à jour d'une transaction (sans les libellés)"""
+        """Mise à jour d'une transaction et, si fournis, de ses libellés"""
         categorie_id = validated_data.pop('categorie_id', None)
+        libelles_data = validated_data.pop('libelles', None)
         
         if categorie_id:
             try:
-                categorie = Categorie.objects.get(id=categorie_id, est_active=True)
+                categorie = categorie_active(categorie_id)
                 instance.categorie = categorie
             except Categorie.DoesNotExist:
                 raise serializers.ValidationError({"categorie_id": "Catégorie introuvable"})
@@ -201,9 +288,350 @@ class TransactionSerializer(serializers.ModelSerializer):
         # Mettre à jour les autres champs
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        
+        with db_transaction.atomic():
+            instance.save()
+            if libelles_data is not None:
+                self._remplacer_libelles(instance, libelles_data)
+        
+        # Les agrégats annotés ne reflètent plus forcément l'instance
+        for attr in ('_montant_total', '_nb_libelles', '_premier_libelle'):
+            instance.__dict__.pop(attr, None)
         
         return instance
+    
+    def _remplacer_libelles(self, instance, libelles_data):
+        """
+        Diff entre les libellés soumis et ceux en base : un bulk_create, un
+        bulk_update (champs modifiés seulement) et un DELETE sans signaux,
+        quel que soit le nombre de lignes touchées. Soldes, index et alertes
+        sont mis à jour une fois pour tout le diff.
+        """
+        actuels = list(instance.libelles.all())
+        existants = {libelle.pk: libelle for libelle in actuels}
+        inconnus = [
+            str(libelle['id']) for libelle in libelles_data
+            if 'id' in libelle and libelle['id'] not in existants
+        ]
+        if inconnus:
+            raise serializers.ValidationError(
+                {"libelles": f"Libellé(s) introuvable(s) dans cette transaction : {', '.join(inconnus)}"}
+            )
+        
+        a_creer, a_modifier, champs_modifies = [], [], set()
+        dates_touchees = []
+        # Index d'autocomplétion : ancien nom retiré, nouvel usage ajouté
+        noms_retires, a_reindexer = [], []
+        for libelle_data in libelles_data:
+            libelle_id = libelle_data.pop('id', None)
+            if libelle_id is None:
+                a_creer.append(Libelle(transaction=instance, **libelle_data))
+                dates_touchees.append(libelle_data['date'])
+                continue
+            libelle = existants.pop(libelle_id)
+            changes = {
+                attr for attr, value in libelle_data.items() if getattr(libelle, attr) != value
+            }
+            if changes:
+                # Ancienne et nouvelle date : les deux mois sont touchés
+                dates_touchees.extend([libelle.date, libelle_data.get('date', libelle.date)])
+                if changes & {'nom', 'date', 'montant'}:
+                    noms_retires.append(libelle.nom)
+                    a_reindexer.append(libelle)
+                for attr in changes:
+                    setattr(libelle, attr, libelle_data[attr])
+                a_modifier.append(libelle)
+                champs_modifies |= changes
+        
+        # Les libellés non soumis sont supprimés
+        Libelle.objects.supprimer_sans_signaux(instance.user_id, existants.keys())
+        if a_modifier:
+            # bulk_update ne gère pas auto_now
+            for libelle in a_modifier:
+                libelle.updated_at = instance.updated_at
+            Libelle.objects.bulk_update(a_modifier, sorted(champs_modifies | {'updated_at'}))
+        if a_creer:
+            Libelle.objects.bulk_create(a_creer)
+        dates_touchees.extend(libelle.date for libelle in existants.values())
+        if dates_touchees:
+            invalider_soldes(instance.user_id, min(dates_touchees))
+        indexer_libelles(
+            instance.user_id,
+            ajouts=[usage(libelle, instance.categorie_id) for libelle in a_creer + a_reindexer],
+            retraits=noms_retires + [libelle.nom for libelle in existants.values()],
+        )
+        evaluer_alertes(instance.user_id, ecritures_suivi(instance, a_creer + a_modifier))
+        
+        # Cache de préchargement à jour : la réponse ne relit pas les libellés
+        conserves = [libelle for libelle in actuels if libelle.pk not in existants]
+        if not hasattr(instance, '_prefetched_objects_cache'):
+            instance._prefetched_objects_cache = {}
+        instance._prefetched_objects_cache['libelles'] = sorted(
+            conserves + a_creer, key=lambda libelle: (libelle.date, libelle.created_at)
+        )
+
+
+# ========== SERIALIZER POUR LES RÉCURRENCES ==========
+
+class RecurrenceSerializer(serializers.ModelSerializer):
+    """Règle de répétition d'une transaction modèle"""
+    
+    # Le calendrier est figé après création : en changer = nouvelle récurrence
+    CHAMPS_FIGES = ['modele', 'frequence', 'intervalle', 'debut']
+    
+    class Meta:
+        model = Recurrence
+        fields = [
+            'id', 'modele', 'frequence', 'intervalle', 'debut', 'fin', 'est_active',
+            'nb_occurrences', 'prochaine_echeance', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'nb_occurrences', 'prochaine_echeance', 'created_at', 'updated_at']
+    
+    def validate_modele(self, value):
+        """Validation : la transaction modèle appartient à l'utilisateur"""
+        if value.user_id != self.context['request'].user.pk:
+            raise serializers.ValidationError("Transaction modèle introuvable")
+        return value
+    
+    def validate(self, attrs):
+        if self.instance is not None:
+            modifies = [
+                champ for champ in self.CHAMPS_FIGES
+                if champ in attrs and attrs[champ] != getattr(self.instance, champ)
+            ]
+            if modifies:
+                raise serializers.ValidationError({
+                    champ: "Non modifiable : créer une nouvelle récurrence." for champ in modifies
+                })
+        debut = attrs.get('debut', getattr(self.instance, 'debut', None))
+        fin = attrs.get('fin', getattr(self.instance, 'fin', None))
+        if fin and debut and fin < debut:
+            raise serializers.ValidationError({"fin": "La fin doit suivre la première échéance"})
+        return attrs
+    
+    def create(self, validated_data):
+        validated_data['user'] = self.context['request'].user
+        validated_data['prochaine_echeance'] = validated_data['debut']
+        return super().create(validated_data)
+
+
+class RegleAlerteSerializer(serializers.ModelSerializer):
+    """Alerte de budget sur une catégorie de dépenses et ses sous-catégories"""
+    
+    class Meta:
+        model = RegleAlerte
+        fields = ['id', 'categorie', 'seuils', 'est_active', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate_categorie(self, value):
+        """Validation : catégorie de dépenses accessible, une règle par catégorie"""
+        user = self.context['request'].user
+        if not (value.est_predefinite or value.creee_par_id == user.pk):
+            raise serializers.ValidationError("Catégorie introuvable")
+        if value.type_categorie != 'depense':
+            raise serializers.ValidationError("Les alertes de budget portent sur une catégorie de dépenses")
+        existantes = RegleAlerte.objects.pour_utilisateur(user).filter(categorie=value)
+        if self.instance is not None:
+            existantes = existantes.exclude(pk=self.instance.pk)
+        if existantes.exists():
+            raise serializers.ValidationError("Une règle existe déjà pour cette catégorie")
+        return value
+    
+    def validate_seuils(self, value):
+        """Validation : pourcentages entiers entre 1 et 1000"""
+        if not isinstance(value, list) or not value:
+            raise serializers.ValidationError("Au moins un seuil requis (ex: [80, 100])")
+        if not all(isinstance(seuil, int) and not isinstance(seuil, bool) and 1 <= seuil <= 1000 for seuil in value):
+            raise serializers.ValidationError("Les seuils sont des pourcentages entiers entre 1 et 1000")
+        return sorted(set(value))
+    
+    def create(self, validated_data):
+        validated_data['user'] = self.context['request'].user
+        return super().create(validated_data)
+
+
+class AlerteBudgetSerializer(serializers.ModelSerializer):
+    categorie = serializers.UUIDField(source='regle.categorie_id', read_only=True)
+    
+    class Meta:
+        model = AlerteBudget
+        fields = ['id', 'regle', 'categorie', 'mois', 'seuil', 'depense', 'budget', 'created_at', 'envoyee_le']
+        read_only_fields = fields
+
+
+class ApercuSerializer(serializers.ModelSerializer):
+    categorie_nom = serializers.CharField(source='categorie.nom', read_only=True)
+    
+    class Meta:
+        model = Apercu
+        fields = [
+            'id', 'categorie', 'categorie_nom', 'mois', 'depense_mois', 'moyenne_journaliere',
+            'projection_fin_mois', 'tendance', 'est_inhabituelle', 'score_inhabituel',
+            'jour_inhabituel', 'calcule_le',
+        ]
+        read_only_fields = fields
+
+
+class ReleveSerializer(serializers.ModelSerializer):
+    telechargement = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Releve
+        fields = ['id', 'mois', 'total_revenus', 'total_depenses', 'nb_libelles', 'genere_le', 'telechargement']
+        read_only_fields = fields
+    
+    def get_telechargement(self, obj):
+        url = reverse('releves-telecharger', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+# ========== SERIALIZERS DES ARCHIVES ==========
+
+class LibelleArchiveSerializer(LibelleSerializer):
+    class Meta(LibelleSerializer.Meta):
+        model = LibelleArchive
+
+
+class PhotoArchiveeSerializer(PhotoSerializer):
+    class Meta(PhotoSerializer.Meta):
+        model = PhotoArchivee
+
+
+class TransactionArchiveeSerializer(serializers.ModelSerializer):
+    """Transaction archivée en lecture seule, même forme que TransactionSerializer"""
+    
+    categorie = CategorieDetailSerializer(read_only=True)
+    libelles = LibelleArchiveSerializer(many=True, read_only=True)
+    photos = PhotoArchiveeSerializer(many=True, read_only=True)
+    montant_total = serializers.SerializerMethodField()
+    nb_libelles = serializers.SerializerMethodField()
+    archivee = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = TransactionArchivee
+        fields = [
+            'id', 'user', 'volet', 'position', 'categorie',
+            'statut', 'devise',
+            'libelles', 'photos',
+            'montant_total', 'nb_libelles',
+            'created_at', 'updated_at', 'archivee', 'archivee_le'
+        ]
+        read_only_fields = fields
+    
+    def get_montant_total(self, obj):
+        return sum(libelle.montant for libelle in obj.libelles.all())
+    
+    def get_nb_libelles(self, obj):
+        return len(obj.libelles.all())
+    
+    def get_archivee(self, obj):
+        return True
+
+
+class ResumeArchiveSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ResumeArchive
+        fields = ['mois', 'volet', 'position', 'statut', 'categorie', 'montant', 'nb_libelles']
+
+
+class RestaurationSerializer(serializers.Serializer):
+    """Transactions archivées à remettre en table chaude"""
+    ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=settings.LOT_MAX_OPERATIONS
+    )
+
+
+class SelectionGroupeSerializer(serializers.Serializer):
+    """Transactions visées par une opération groupée : ids OU filtre (paramètres de la liste)"""
+    ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        allow_empty=False,
+        max_length=settings.GROUPE_MAX_TRANSACTIONS
+    )
+    filtre = serializers.DictField(required=False, allow_empty=False)
+    
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filtre' in attrs):
+            raise serializers.ValidationError("Indiquer soit 'ids', soit 'filtre'.")
+        return attrs
+
+
+class StatutGroupeSerializer(SelectionGroupeSerializer):
+    statut = serializers.ChoiceField(choices=Transaction.STATUT_CHOICES)
+
+
+class RecategorisationSerializer(SelectionGroupeSerializer):
+    categorie_id = serializers.UUIDField()
+    
+    def validate_categorie_id(self, value):
+        """Catégorie active, prédéfinie ou créée par l'utilisateur"""
+        if value in predefinies().categories:
+            return value
+        if not Categorie.objects.filter(id=value, est_active=True, creee_par=self.context['request'].user).exists():
+            raise serializers.ValidationError("Catégorie invalide ou inaccessible")
+        return value
+
+
+# ========== SERIALIZERS POUR LA SYNCHRONISATION ==========
+
+class SyncTransactionSerializer(serializers.ModelSerializer):
+    """Transaction à plat (sans libellés ni photos, synchronisés à part)"""
+    
+    class Meta:
+        model = Transaction
+        fields = [
+            'id', 'volet', 'position', 'categorie_id', 'statut', 'devise',
+            'created_at', 'updated_at'
+        ]
+
+
+class SyncLibelleSerializer(LibelleSerializer):
+    class Meta(LibelleSerializer.Meta):
+        fields = ['id', 'transaction_id'] + LibelleSerializer.Meta.fields[1:]
+
+
+class SyncPhotoSerializer(PhotoSerializer):
+    class Meta(PhotoSerializer.Meta):
+        fields = ['id', 'transaction_id'] + PhotoSerializer.Meta.fields[1:] + ['updated_at']
+
+
+class SuppressionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Suppression
+        fields = ['modele', 'objet_id', 'supprime_le']
+
+
+class OperationLotSerializer(serializers.Serializer):
+    """Une opération d'un lot d'écritures hors ligne"""
+    cle = serializers.CharField(max_length=100)
+    op = serializers.ChoiceField(choices=['create', 'update', 'delete'])
+    type = serializers.ChoiceField(choices=['transaction', 'libelle'])
+    id = serializers.UUIDField(required=False)
+    data = serializers.DictField(required=False, default=dict)
+    
+    def validate(self, attrs):
+        if attrs['op'] != 'create' and 'id' not in attrs:
+            raise serializers.ValidationError({'id': "Requis pour update et delete."})
+        return attrs
+
+
+class LotSerializer(serializers.Serializer):
+    """Lot ordonné d'opérations, appliqué en tout ou rien"""
+    operations = OperationLotSerializer(many=True, allow_empty=False)
+    
+    def validate_operations(self, value):
+        if len(value) > settings.LOT_MAX_OPERATIONS:
+            raise serializers.ValidationError(
+                f"Un lot est limité à {settings.LOT_MAX_OPERATIONS} opérations."
+            )
+        cles = [operation['cle'] for operation in value]
+        if len(cles) != len(set(cles)):
+            raise serializers.ValidationError("Chaque opération doit avoir une clé unique.")
+        return value
 
 
 # ========== SERIALIZER POUR LES STATISTIQUES ==========
@@ -215,4 +643,13 @@ class StatistiquesSerializer(serializers.Serializer):
     solde = serializers.DecimalField(max_digits=12, decimal_places=2)
     nb_transactions = serializers.IntegerField()
     depenses_par_categorie = serializers.ListField()
-    revenus_par_categorie = serializers.ListField()
\ No newline at end of file
+    revenus_par_categorie = serializers.ListField()
+
+
+class SuggestionSerializer(serializers.Serializer):
+    """Libellé déjà utilisé proposé à la saisie, avec la catégorie et le montant de son dernier usage"""
+    nom = serializers.CharField()
+    categorie_id = serializers.UUIDField(allow_null=True)
+    montant = serializers.DecimalField(max_digits=12, decimal_places=2)
+    nb_utilisations = serializers.IntegerField()
+    dernier_usage = serializers.DateTimeField()
@@ -0,0 +1,156 @@
+# backend/transactions/sharding.py
+"""
+Répartition des données de transactions entre plusieurs bases (shards).
+
+Les Transaction, Libelle et Photo d'un utilisateur vivent sur un seul shard,
+choisi par hachage de rendez-vous de son id : ajouter un shard ne déplace que
+les utilisateurs qui lui reviennent. User et Categorie restent sur `default` ;
+les catégories sont recopiées sur chaque shard pour que les jointures
+(categorie__nom, select_related...) fonctionnent localement.
+"""
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+MODELES_SHARDES = {
+    'transactions.transaction',
+    'transactions.libelle',
+    'transactions.photo',
+    'transactions.cleidempotence',
+    'transactions.recurrence',
+    'transactions.soldemensuel',
+    'transactions.transactionarchivee',
+    'transactions.libellearchive',
+    'transactions.photoarchivee',
+    'transactions.resumearchive',
+    'transactions.nomlibelle',
+    'transactions.reglealerte',
+    'transactions.alertebudget',
+    'transactions.apercu',
+    'transactions.releve',
+}
+
+_shard_courant = ContextVar('shard_courant', default=None)
+
+
+def shards():
+    """Liste des alias de bases portant des données de transactions"""
+    return list(settings.DATABASE_SHARDS)
+
+
+def shard_pour(user_id):
+    """Shard d'un utilisateur (hachage de rendez-vous, stable)"""
+    aliases = shards()
+    if len(aliases) == 1:
+        return aliases[0]
+    return max(
+        aliases,
+        key=lambda alias: hashlib.sha1(f"{alias}:{user_id}".encode()).digest()
+    )
+
+
+def est_sharde(model):
+    return model._meta.label_lower in MODELES_SHARDES
+
+
+@contextmanager
+def utiliser_shard(alias):
+    """Envoie les requêtes sans indice (Transaction.objects...) vers le shard `alias`"""
+    jeton = _shard_courant.set(alias)
+    try:
+        yield alias
+    finally:
+        _shard_courant.reset(jeton)
+
+
+def shard_utilisateur(user):
+    """Envoie les requêtes sans indice vers le shard de l'utilisateur"""
+    return utiliser_shard(shard_pour(user.pk) if user is not None and user.is_authenticated else None)
+
+
+def _shard_pour_instance(instance):
+    if instance is None:
+        return None
+    if est_sharde(type(instance)):
+        if instance._state.db:
+            return instance._state.db
+        # Nouvel objet : on remonte jusqu'au propriétaire
+        if getattr(instance, 'user_id', None) is not None:
+            return shard_pour(instance.user_id)
+        parent = getattr(instance, 'transaction', None)
+        if parent is not None:
+            return _shard_pour_instance(parent)
+        return None
+    if instance._meta.label_lower == settings.AUTH_USER_MODEL.lower():
+        return shard_pour(instance.pk)
+    return None
+
+
+class ShardRouter:
+    """
+    Routeur des modèles shardés. Retourne None quand la donnée est sur
+    `default` pour laisser le ReplicaRouter décider des lectures.
+    """
+
+    def _choisir(self, model, **hints):
+        instance = hints.get('instance')
+        if not est_sharde(model):
+            # Catégories / utilisateurs lus depuis un objet shardé : toujours default
+            if instance is not None and instance._state.db in shards():
+                return DEFAULT_DB_ALIAS
+            return None
+        alias = _shard_pour_instance(instance) or _shard_courant.get()
+        if alias is None or alias == DEFAULT_DB_ALIAS:
+            return None
+        return alias
+
+    def db_for_read(self, model, **hints):
+        return self._choisir(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self._choisir(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bases = {DEFAULT_DB_ALIAS, *shards()}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+
+class ShardMixin:
+    """Mixin de ViewSet : toute la requête travaille sur le shard de l'utilisateur"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._contexte_shard = shard_utilisateur(request.user)
+        self._contexte_shard.__enter__()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        contexte = getattr(self, '_contexte_shard', None)
+        if contexte is not None:
+            contexte.__exit__(None, None, None)
+            self._contexte_shard = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+def synchroniser_categorie(categorie, supprimer=False):
+    """Recopie (ou supprime) une catégorie sur tous les shards autres que default"""
+    from .models import Categorie
+
+    for alias in shards():
+        if alias == DEFAULT_DB_ALIAS:
+            continue
+        if supprimer:
+            Categorie.objects.using(alias).filter(id=categorie.id).delete()
+            continue
+        Categorie.objects.using(alias).update_or_create(
+            id=categorie.id,
+            defaults={
+                field.attname: getattr(categorie, field.attname)
+                for field in Categorie._meta.concrete_fields
+                if field.attname not in ('id', 'creee_par_id')
+            },
+        )
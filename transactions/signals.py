@@ -0,0 +1,175 @@
+# backend/transactions/signals.py
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Min
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    Categorie, Transaction, Libelle, Photo, Suppression, TransactionArchivee, ResumeArchive, NomLibelle,
+    RegleAlerte, AlerteBudget, Apercu, Releve
+)
+from .alertes import ecritures_suivi, evaluer_alertes
+from .hierarchie import deplacer_sous_arbre, preparer_chemin
+from .sharding import shard_pour, synchroniser_categorie
+from .suggestions import indexer_libelles, usage
+from .tresorerie import invalider_soldes, mois_clos
+
+
+@receiver(pre_save, sender=Categorie)
+def calculer_chemin_categorie(sender, instance, raw=False, using=DEFAULT_DB_ALIAS, **kwargs):
+    # Les copies des shards reçoivent le chemin déjà calculé sur default
+    instance._chemin_precedent = None
+    if raw or using != DEFAULT_DB_ALIAS:
+        return
+    preparer_chemin(instance)
+
+
+@receiver(post_save, sender=Categorie)
+def recopier_categorie(sender, instance, raw=False, using=DEFAULT_DB_ALIAS, **kwargs):
+    """Les catégories sont écrites sur default puis recopiées sur les shards"""
+    if raw or using != DEFAULT_DB_ALIAS:
+        return
+    synchroniser_categorie(instance)
+    # Catégorie déplacée : ses sous-catégories suivent
+    if getattr(instance, '_chemin_precedent', None):
+        deplacer_sous_arbre(instance._chemin_precedent, instance.chemin)
+
+
+@receiver(post_delete, sender=Categorie)
+def supprimer_copies_categorie(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return
+    synchroniser_categorie(instance, supprimer=True)
+
+
+@receiver(pre_delete, sender=User)
+def supprimer_donnees_shard(sender, instance, **kwargs):
+    """Le CASCADE de Django ne voit que default : nettoyer le shard de l'utilisateur"""
+    alias = shard_pour(instance.pk)
+    if alias != DEFAULT_DB_ALIAS:
+        for model in (
+            Releve, Apercu, AlerteBudget, RegleAlerte, NomLibelle, Transaction, TransactionArchivee, ResumeArchive,
+        ):
+            model.objects.using(alias).filter(user_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Categorie)
+def tracer_suppression_categorie(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    if using != DEFAULT_DB_ALIAS:
+        return
+    # Catégorie prédéfinie : user vide, la suppression concerne tout le monde
+    Suppression.objects.create(modele='categorie', objet_id=instance.id, user_id=instance.creee_par_id)
+
+
+@receiver(post_delete, sender=Transaction)
+def tracer_suppression_transaction(sender, instance, **kwargs):
+    Suppression.objects.create(modele='transaction', objet_id=instance.id, user_id=instance.user_id)
+
+
+@receiver(post_delete, sender=Libelle)
+@receiver(post_delete, sender=Photo)
+def tracer_suppression_ligne(sender, instance, origin=None, **kwargs):
+    # Supprimées en cascade (transaction, utilisateur) : la trace du parent suffit
+    origine = getattr(origin, 'model', type(origin))
+    if origine is not sender:
+        return
+    Suppression.objects.create(
+        modele=sender._meta.model_name,
+        objet_id=instance.id,
+        user_id=Transaction.objects.filter(pk=instance.transaction_id).values_list('user_id', flat=True).first(),
+    )
+
+
+# ----- Instantanés de solde (SoldeMensuel) -----
+# Les écritures groupées (bulk_create / bulk_update / update) appellent
+# invalider_soldes elles-mêmes : ces signaux ne couvrent que save() / delete().
+
+@receiver(pre_save, sender=Libelle)
+def memoriser_libelle(sender, instance, raw=False, **kwargs):
+    # Un libellé déplacé d'un mois clos modifie aussi ce mois ; un libellé
+    # renommé quitte son ancien nom dans l'index d'autocomplétion
+    instance._date_precedente = instance._nom_precedent = None
+    if not raw and not instance._state.adding:
+        instance._date_precedente, instance._nom_precedent = (
+            Libelle.objects.filter(pk=instance.pk).values_list('date', 'nom').first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Libelle)
+def invalider_soldes_libelle(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    dates = [date for date in (instance.date, getattr(instance, '_date_precedente', None)) if date]
+    depuis = min(dates) if dates else None
+    if mois_clos(depuis) is None:
+        return
+    invalider_soldes(instance.transaction.user_id, depuis)
+
+
+@receiver(post_delete, sender=Libelle)
+def invalider_soldes_libelle_supprime(sender, instance, origin=None, **kwargs):
+    # En cascade, la transaction parente a déjà invalidé
+    if getattr(origin, 'model', type(origin)) is not sender or mois_clos(instance.date) is None:
+        return
+    user_id = Transaction.objects.filter(pk=instance.transaction_id).values_list('user_id', flat=True).first()
+    invalider_soldes(user_id, instance.date)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(pre_delete, sender=Transaction)
+def invalider_soldes_transaction(sender, instance, raw=False, created=False, **kwargs):
+    # Statut, volet ou position changés : tous les mois de ses libellés sont touchés
+    if raw or created:
+        return
+    depuis = instance.libelles.aggregate(depuis=Min('date'))['depuis']
+    invalider_soldes(instance.user_id, depuis)
+
+
+# ----- Index d'autocomplétion (NomLibelle) -----
+# Même principe : les écritures groupées appellent indexer_libelles elles-mêmes.
+
+@receiver(post_save, sender=Libelle)
+def indexer_libelle(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction = instance.transaction
+    ancien = getattr(instance, '_nom_precedent', None)
+    indexer_libelles(
+        transaction.user_id,
+        ajouts=[usage(instance, transaction.categorie_id)],
+        retraits=[ancien] if ancien is not None else [],
+    )
+
+
+@receiver(post_delete, sender=Libelle)
+def desindexer_libelle(sender, instance, origin=None, **kwargs):
+    # En cascade, la transaction parente a déjà retiré ses libellés
+    if getattr(origin, 'model', type(origin)) is not sender:
+        return
+    user_id = Transaction.objects.filter(pk=instance.transaction_id).values_list('user_id', flat=True).first()
+    indexer_libelles(user_id, retraits=[instance.nom])
+
+
+@receiver(pre_delete, sender=Transaction)
+def desindexer_transaction(sender, instance, **kwargs):
+    indexer_libelles(instance.user_id, retraits=instance.libelles.values_list('nom', flat=True))
+
+
+# ----- Alertes de budget (RegleAlerte) -----
+# Même principe : les écritures groupées appellent evaluer_alertes elles-mêmes.
+
+@receiver(post_save, sender=Libelle)
+def alerter_libelle(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction = instance.transaction
+    evaluer_alertes(transaction.user_id, ecritures_suivi(transaction, [instance]))
+
+
+@receiver(post_save, sender=Transaction)
+def alerter_transaction(sender, instance, raw=False, created=False, **kwargs):
+    # Validée, passée en suivi ou recatégorisée : ses libellés comptent désormais ailleurs
+    if raw or created:
+        return
+    evaluer_alertes(instance.user_id, ecritures_suivi(instance, instance.libelles.only('date', 'transaction_id')))
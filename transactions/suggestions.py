@@ -0,0 +1,420 @@
+# backend/transactions/suggestions.py
+"""
+Autocomplétion des libellés déjà saisis par un utilisateur.
+
+Index en base : NomLibelle, une ligne par nom normalisé (minuscules, sans
+accents), avec le nombre d'utilisations, le dernier usage et la catégorie et
+le montant de ce dernier usage. Il est tenu à jour par deltas à chaque
+écriture de libellés : signaux pour save() / delete(), appels explicites à
+indexer_libelles() pour les écritures groupées (comme invalider_soldes).
+`manage.py indexer_libelles` le reconstruit entièrement.
+
+En mémoire : un arbre de préfixes par utilisateur, gardé dans un LRU par
+processus. Chaque nœud porte déjà ses SUGGESTIONS_MAX meilleurs noms (par
+fréquence pondérée par la récence) : une frappe ne coûte qu'un parcours de
+la longueur du préfixe. Tous les mots d'un nom sont indexés ("méd" trouve
+"Consultation médecin"). L'arbre s'arrête à _PROFONDEUR_MAX caractères pour
+borner la mémoire ; ses feuilles gardent tous leurs noms.
+
+Fraîcheur : chaque utilisateur a un compteur de version dans le cache
+partagé. Après le commit, indexer_libelles l'incrémente et publie sous la
+nouvelle version les lignes d'index modifiées (état complet, ou None pour
+un nom retiré). Une recherche lit ce compteur (sans requête SQL) ; un
+processus en retard applique à son arbre les deltas manquants, ce qui ne
+recalcule que les nœuds des préfixes touchés. L'arbre n'est reconstruit
+depuis la base que s'il est absent du processus, si le compteur est absent
+du cache ou si un delta a expiré.
+"""
+import math
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .models import Libelle, LibelleArchive, NomLibelle
+from .sharding import shard_pour
+
+# Un libellé écrit : catégorie None = garder celle déjà indexée
+Usage = namedtuple('Usage', ['nom', 'date', 'montant', 'categorie_id'])
+
+Suggestion = namedtuple('Suggestion', ['nom', 'categorie_id', 'montant', 'nb_utilisations', 'dernier_usage'])
+
+_indexation_suspendue = ContextVar('indexation_suspendue', default=False)
+
+# Profondeur de l'arbre : au-delà, les noms du nœud le plus profond sont filtrés
+_PROFONDEUR_MAX = 12
+
+
+def normaliser(nom):
+    """Clé de recherche : minuscules, sans accents, espaces simples"""
+    decompose = unicodedata.normalize('NFKD', nom)
+    sans_accents = ''.join(car for car in decompose if not unicodedata.combining(car))
+    return ' '.join(sans_accents.casefold().split())[:200]
+
+
+def usage(libelle, categorie_id=None):
+    return Usage(libelle.nom, libelle.date, libelle.montant, categorie_id)
+
+
+# ========== INDEX EN BASE ==========
+
+@contextmanager
+def sans_indexation():
+    """Libellés déplacés sans être ni saisis ni supprimés (archivage, restauration)"""
+    jeton = _indexation_suspendue.set(True)
+    try:
+        yield
+    finally:
+        _indexation_suspendue.reset(jeton)
+
+
+def indexer_libelles(user_id, ajouts=(), retraits=()):
+    """
+    Met à jour l'index d'un utilisateur : `ajouts` (Usage) comptent une
+    utilisation de plus, `retraits` (noms) une de moins. Les noms qui ne
+    sont plus utilisés sortent de l'index.
+    """
+    if user_id is None or _indexation_suspendue.get():
+        return
+    deltas = {}
+    for nom in retraits:
+        deltas.setdefault(normaliser(nom), [0, None])[0] -= 1
+    for ajout in ajouts:
+        delta = deltas.setdefault(normaliser(ajout.nom), [0, None])
+        delta[0] += 1
+        if delta[1] is None or ajout.date >= delta[1].date:
+            delta[1] = ajout
+    deltas = {cle: delta for cle, delta in deltas.items() if cle and (delta[0] or delta[1])}
+    if not deltas:
+        return
+
+    index = NomLibelle.objects.pour_utilisateur(user_id)
+    existants = {nom.cle: nom for nom in index.filter(cle__in=deltas.keys())}
+    nouveaux, modifies, vides = [], [], []
+    # Delta publié aux arbres en mémoire : état final de chaque nom touché
+    changements = {}
+    maintenant = timezone.now()
+    for cle, (nombre, dernier) in deltas.items():
+        nom = existants.get(cle)
+        if nom is None:
+            if nombre > 0:
+                nom = NomLibelle(
+                    user_id=user_id, cle=cle, nom=dernier.nom, nb_utilisations=nombre,
+                    dernier_usage=dernier.date, categorie_id=dernier.categorie_id, montant=dernier.montant,
+                )
+                nouveaux.append(nom)
+                changements[cle] = _suggestion(nom)
+            continue
+        nom.nb_utilisations += nombre
+        if nom.nb_utilisations <= 0:
+            vides.append(nom.pk)
+            changements[cle] = None
+            continue
+        if dernier is not None and dernier.date >= nom.dernier_usage:
+            nom.nom, nom.dernier_usage, nom.montant = dernier.nom, dernier.date, dernier.montant
+            nom.categorie_id = dernier.categorie_id or nom.categorie_id
+        # bulk_update ne gère pas auto_now
+        nom.updated_at = maintenant
+        modifies.append(nom)
+        changements[cle] = _suggestion(nom)
+
+    # Deux premières saisies simultanées du même nom : une seule compte (manage.py indexer_libelles corrige)
+    index.bulk_create(nouveaux, ignore_conflicts=True)
+    index.bulk_update(modifies, ['nom', 'nb_utilisations', 'dernier_usage', 'categorie_id', 'montant', 'updated_at'])
+    index.filter(pk__in=vides).delete()
+    # Après le commit seulement, sinon un autre processus pourrait reconstruire son arbre sur l'ancien index
+    db_transaction.on_commit(lambda: _publier(user_id, changements), using=shard_pour(user_id))
+
+
+def reconstruire_index(alias, user_id=None):
+    """
+    Recalcule l'index d'un shard (ou d'un seul utilisateur) depuis les
+    libellés, archives comprises. Retourne le nombre de noms indexés.
+    """
+    index = NomLibelle.objects.using(alias)
+    noms = {}
+    with db_transaction.atomic(using=alias):
+        for model in (Libelle, LibelleArchive):
+            lignes = model.objects.using(alias).values_list(
+                'transaction__user_id', 'nom', 'date', 'montant', 'transaction__categorie_id'
+            )
+            if user_id is not None:
+                lignes = lignes.filter(transaction__user_id=user_id)
+            for proprietaire, nom, date, montant, categorie_id in lignes.iterator(chunk_size=2000):
+                cle = normaliser(nom)
+                if not cle:
+                    continue
+                entree = noms.get((proprietaire, cle))
+                if entree is None:
+                    noms[(proprietaire, cle)] = NomLibelle(
+                        user_id=proprietaire, cle=cle, nom=nom, nb_utilisations=1,
+                        dernier_usage=date, categorie_id=categorie_id, montant=montant,
+                    )
+                    continue
+                entree.nb_utilisations += 1
+                if date >= entree.dernier_usage:
+                    entree.nom, entree.dernier_usage = nom, date
+                    entree.categorie_id, entree.montant = categorie_id, montant
+
+        anciens = index if user_id is None else index.filter(user_id=user_id)
+        proprietaires = set(anciens.values_list('user_id', flat=True).distinct())
+        proprietaires.update(proprietaire for proprietaire, _ in noms)
+        anciens.delete()
+        index.bulk_create(noms.values(), batch_size=1000)
+
+        def invalider_tous():
+            for proprietaire in proprietaires:
+                _invalider(proprietaire)
+        db_transaction.on_commit(invalider_tous, using=alias)
+    return len(noms)
+
+
+# ========== ARBRES DE PRÉFIXES EN MÉMOIRE ==========
+
+def _suggestion(nom):
+    return Suggestion(nom.nom, nom.categorie_id, nom.montant, nom.nb_utilisations, nom.dernier_usage)
+
+
+def _poids(suggestion):
+    """
+    Logarithme de la fréquence pondérée par la récence. La pondération
+    divise tous les poids par deux à chaque demi-vie : l'ordre des noms ne
+    dépend pas du moment du calcul et un nom mis à jour se compare aux autres.
+    """
+    demi_vie = settings.SUGGESTIONS_DEMI_VIE_JOURS * 86400
+    # Usage daté dans le futur : compté comme maintenant
+    dernier_usage = min(suggestion.dernier_usage, timezone.now())
+    return math.log2(suggestion.nb_utilisations) + dernier_usage.timestamp() / demi_vie
+
+
+class _Noeud:
+    __slots__ = ('enfants', 'meilleurs', 'fins')
+
+    def __init__(self):
+        self.enfants = {}
+        self.meilleurs = []
+        # Noms dont un mot s'arrête sur ce nœud : candidats absents des enfants
+        self.fins = ()
+
+
+class _Arbre:
+    """Arbre de préfixes des noms d'un utilisateur, meilleurs noms précalculés par nœud"""
+
+    def __init__(self, lignes, version):
+        """lignes : (cle, nom, categorie_id, montant, nb_utilisations, dernier_usage)"""
+        self.version = version
+        self.racine = _Noeud()
+        self.noms = {ligne[0]: Suggestion(*ligne[1:]) for ligne in lignes}
+        self.poids = {cle: _poids(nom) for cle, nom in self.noms.items()}
+        cles = sorted(self.noms, key=self._ordre, reverse=True)
+
+        # Insérés du meilleur au moins bon : les premiers arrivés sur un nœud sont ses meilleurs
+        maximum = settings.SUGGESTIONS_MAX
+        self.racine.meilleurs = cles[:maximum]
+        for cle in cles:
+            for debut in self._debuts_de_mots(cle):
+                chemin = self._chemin(cle, debut, creer=True)
+                for profondeur, noeud in enumerate(chemin, 1):
+                    meilleurs = noeud.meilleurs
+                    # Même nom inséré d'affilée (plusieurs mots) : un doublon ne peut être que le dernier
+                    if meilleurs and meilleurs[-1] == cle:
+                        continue
+                    # Les feuilles gardent tous leurs noms, filtrés à la recherche
+                    if profondeur == _PROFONDEUR_MAX or len(meilleurs) < maximum:
+                        meilleurs.append(cle)
+                self._marquer_fin(cle, debut, chemin, present=True)
+
+    def _ordre(self, cle):
+        # À poids égal, l'ordre de la clé : arbre reconstruit et arbre mis à jour classent pareil
+        return self.poids[cle], cle
+
+    @staticmethod
+    def _debuts_de_mots(cle):
+        return [0] + [position + 1 for position, car in enumerate(cle) if car == ' ']
+
+    def _chemin(self, cle, debut, creer):
+        """Nœuds du mot de `cle` commençant à `debut` (sans la racine), jusqu'au premier absent si not creer"""
+        chemin = []
+        noeud = self.racine
+        for car in cle[debut:debut + _PROFONDEUR_MAX]:
+            enfant = noeud.enfants.get(car)
+            if enfant is None:
+                if not creer:
+                    break
+                enfant = noeud.enfants[car] = _Noeud()
+            noeud = enfant
+            chemin.append(noeud)
+        return chemin
+
+    @staticmethod
+    def _marquer_fin(cle, debut, chemin, present):
+        # Au-delà de _PROFONDEUR_MAX, la feuille garde déjà tous ses noms
+        longueur = len(cle) - debut
+        if longueur < _PROFONDEUR_MAX and len(chemin) == longueur:
+            fin = chemin[-1]
+            fin.fins = tuple(autre for autre in fin.fins if autre != cle) + ((cle,) if present else ())
+
+    def appliquer(self, cle, suggestion):
+        """
+        Met à jour un nom de l'arbre (None : le retire). Seuls les nœuds de
+        ses préfixes sont recalculés, des plus profonds à la racine, depuis
+        les meilleurs noms de leurs enfants et les noms qui s'y arrêtent.
+        """
+        present = suggestion is not None
+        if present:
+            self.noms[cle] = suggestion
+            self.poids[cle] = _poids(suggestion)
+        elif cle not in self.noms:
+            return
+
+        touches = {}
+        for debut in self._debuts_de_mots(cle):
+            chemin = self._chemin(cle, debut, creer=present)
+            self._marquer_fin(cle, debut, chemin, present)
+            for profondeur, noeud in enumerate(chemin, 1):
+                touches[id(noeud)] = (profondeur, noeud)
+        maximum = settings.SUGGESTIONS_MAX
+        for profondeur, noeud in sorted(touches.values(), key=lambda touche: touche[0], reverse=True):
+            if profondeur == _PROFONDEUR_MAX:
+                candidats = {autre for autre in noeud.meilleurs if autre != cle}
+            else:
+                candidats = set(noeud.fins)
+                for enfant in noeud.enfants.values():
+                    candidats.update(enfant.meilleurs)
+                candidats.discard(cle)
+            if present:
+                candidats.add(cle)
+            meilleurs = sorted(candidats, key=self._ordre, reverse=True)
+            noeud.meilleurs = meilleurs if profondeur == _PROFONDEUR_MAX else meilleurs[:maximum]
+        candidats = set()
+        for enfant in self.racine.enfants.values():
+            candidats.update(enfant.meilleurs)
+        self.racine.meilleurs = sorted(candidats, key=self._ordre, reverse=True)[:maximum]
+
+        # Retiré en dernier : une recherche concurrente ne voit jamais un nom sans sa suggestion
+        if not present:
+            self.noms.pop(cle, None)
+            self.poids.pop(cle, None)
+
+    def chercher(self, prefixe, limite):
+        prefixe = normaliser(prefixe)
+        noeud = self.racine
+        for car in prefixe[:_PROFONDEUR_MAX]:
+            noeud = noeud.enfants.get(car)
+            if noeud is None:
+                return []
+        cles = noeud.meilleurs
+        if len(prefixe) > _PROFONDEUR_MAX:
+            cles = [
+                cle for cle in cles
+                if any(cle.startswith(prefixe, debut) for debut in self._debuts_de_mots(cle))
+            ]
+        suggestions = (self.noms.get(cle) for cle in cles)
+        return [suggestion for suggestion in suggestions if suggestion is not None][:limite]
+
+
+class _LRU:
+    """Arbres des utilisateurs récemment actifs, partagé par les threads du processus"""
+
+    def __init__(self):
+        self._arbres = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def get(self, user_id):
+        with self._verrou:
+            arbre = self._arbres.get(user_id)
+            if arbre is not None:
+                self._arbres.move_to_end(user_id)
+            return arbre
+
+    def set(self, user_id, arbre):
+        with self._verrou:
+            self._arbres[user_id] = arbre
+            self._arbres.move_to_end(user_id)
+            while len(self._arbres) > settings.SUGGESTIONS_CACHE_UTILISATEURS:
+                self._arbres.popitem(last=False)
+
+    def pop(self, user_id):
+        with self._verrou:
+            self._arbres.pop(user_id, None)
+
+
+_arbres = _LRU()
+# Un seul thread applique les deltas d'un arbre à la fois
+_verrou_deltas = threading.Lock()
+
+
+def cle_version(user_id):
+    return f"suggestions:version:{user_id}"
+
+
+def cle_delta(user_id, version):
+    return f"suggestions:delta:{user_id}:{version}"
+
+
+def _publier(user_id, changements):
+    try:
+        version = cache.incr(cle_version(user_id))
+    except ValueError:
+        # Compteur absent du cache : chaque processus reconstruira son arbre
+        return
+    cache.set(cle_delta(user_id, version), changements, settings.SUGGESTIONS_DELTAS_TTL)
+
+
+def _invalider(user_id):
+    # Index reconstruit : tous les processus reconstruisent leur arbre
+    cache.delete(cle_version(user_id))
+    _arbres.pop(user_id)
+
+
+def _version_initiale(user_id):
+    # Nouvelle époque : jamais égale à la version d'un arbre construit avant la perte du compteur
+    cache.add(cle_version(user_id), time.time_ns(), None)
+    return cache.get(cle_version(user_id))
+
+
+def _rattraper(user_id, arbre, version):
+    """Applique à `arbre` les deltas publiés depuis sa version ; None s'il faut le reconstruire"""
+    if arbre.version is None or version - arbre.version > settings.SUGGESTIONS_DELTAS_MAX:
+        return None
+    if version <= arbre.version:
+        return arbre
+    with _verrou_deltas:
+        versions = range(arbre.version + 1, version + 1)
+        deltas = cache.get_many([cle_delta(user_id, numero) for numero in versions])
+        if len(deltas) < len(versions):
+            return None
+        for numero in versions:
+            for cle, suggestion in deltas[cle_delta(user_id, numero)].items():
+                arbre.appliquer(cle, suggestion)
+        arbre.version = version
+    return arbre
+
+
+def _arbre(user_id):
+    version = cache.get(cle_version(user_id))
+    arbre = _arbres.get(user_id)
+    if arbre is not None and version is not None:
+        arbre = _rattraper(user_id, arbre, version)
+    if arbre is None or version is None:
+        # Lue avant les noms : un delta publié entre-temps est réappliqué (états complets, sans effet)
+        version = _version_initiale(user_id)
+        lignes = NomLibelle.objects.pour_utilisateur(user_id).values_list(
+            'cle', 'nom', 'categorie_id', 'montant', 'nb_utilisations', 'dernier_usage'
+        )
+        arbre = _Arbre(list(lignes), version)
+        _arbres.set(user_id, arbre)
+    return arbre
+
+
+def suggerer(user_id, prefixe, limite=None):
+    """Noms déjà utilisés commençant par `prefixe` (ou dont un mot commence par `prefixe`)"""
+    limite = min(limite or settings.SUGGESTIONS_MAX, settings.SUGGESTIONS_MAX)
+    return _arbre(user_id).chercher(prefixe, limite)
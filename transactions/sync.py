@@ -0,0 +1,194 @@
+# backend/transactions/sync.py
+"""
+Synchronisation incrémentale pour les clients hors ligne.
+
+Le curseur (opaque, base64) fige une borne haute `jusqua` au début d'une
+session de synchronisation, puis parcourt les flux dans un ordre fixe
+(catégories, transactions, libellés, photos, suppressions) par pagination
+par clé (date, id). Une fois tous les flux parcourus, le curseur suivant
+repart de `jusqua` : aucune modification n'est perdue ni dupliquée, même si
+des écritures ont lieu pendant la pagination.
+
+La borne haute est lue en base (default et shard de l'utilisateur) : toute
+ligne datée avant elle est déjà validée. Une transaction longue date ses
+lignes à l'écriture mais ne les rend visibles qu'au commit ; la borne ne
+dépasse donc jamais le début de la plus ancienne transaction d'écriture
+encore ouverte :
+- PostgreSQL : min(xact_start) des transactions ayant écrit
+  (pg_stat_activity) ;
+- SQLite : un seul écrivain à la fois, prendre puis rendre le verrou
+  d'écriture (BEGIN IMMEDIATE) attend la fin de celle en cours.
+SYNC_MARGE_SECONDES est retirée en plus (décalage d'horloge entre les
+serveurs d'application et la base).
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Categorie, Transaction, Libelle, Photo, Suppression
+from .sharding import shard_pour
+from .serializers import (
+    CategorieSerializer,
+    SyncTransactionSerializer,
+    SyncLibelleSerializer,
+    SyncPhotoSerializer,
+    SuppressionSerializer,
+)
+
+FLUX = ['categories', 'transactions', 'libelles', 'photos', 'suppressions']
+
+
+class CurseurInvalide(ValueError):
+    pass
+
+
+class ResynchronisationRequise(Exception):
+    """Le curseur est plus ancien que la rétention des suppressions"""
+
+
+def encoder_curseur(etat):
+    return base64.urlsafe_b64encode(json.dumps(etat).encode()).decode()
+
+
+def decoder_curseur(curseur):
+    if not curseur:
+        return {}
+    try:
+        etat = json.loads(base64.urlsafe_b64decode(curseur.encode()))
+    except (ValueError, TypeError) as e:
+        raise CurseurInvalide("Curseur de synchronisation invalide") from e
+    if not isinstance(etat, dict):
+        raise CurseurInvalide("Curseur de synchronisation invalide")
+    return etat
+
+
+def _date(valeur):
+    date = parse_datetime(valeur) if valeur else None
+    if valeur and date is None:
+        raise CurseurInvalide("Curseur de synchronisation invalide")
+    return date
+
+
+def _debut_ecritures_en_cours(alias):
+    """Instant avant lequel toute écriture sur `alias` est validée (None : inconnu)"""
+    connexion = connections[alias]
+    try:
+        if connexion.vendor == 'postgresql':
+            with connexion.cursor() as curseur:
+                curseur.execute(
+                    "SELECT min(xact_start) FROM pg_stat_activity "
+                    "WHERE datname = current_database() AND backend_xid IS NOT NULL AND pid <> pg_backend_pid()"
+                )
+                return curseur.fetchone()[0] or timezone.now()
+        if connexion.vendor == 'sqlite' and not connexion.in_atomic_block:
+            with connexion.cursor() as curseur:
+                curseur.execute("BEGIN IMMEDIATE")
+                curseur.execute("ROLLBACK")
+            return timezone.now()
+    except DatabaseError:
+        # Verrou non obtenu dans le délai : seule la marge s'applique
+        pass
+    return None
+
+
+def borne_haute(user):
+    """Borne haute d'une nouvelle session : les lignes datées jusqu'à elle sont toutes validées"""
+    borne = timezone.now()
+    for alias in {DEFAULT_DB_ALIAS, shard_pour(user.pk)}:
+        debut = _debut_ecritures_en_cours(alias)
+        if debut is not None:
+            borne = min(borne, debut)
+    return borne - timedelta(seconds=settings.SYNC_MARGE_SECONDES)
+
+
+def _flux(user):
+    """(queryset, champ de date, serializer) pour chaque flux"""
+    return {
+        # Catégories inactives incluses : le client apprend les désactivations
+        'categories': (
+            Categorie.objects.filter(Q(est_predefinite=True) | Q(creee_par=user)),
+            'updated_at',
+            CategorieSerializer,
+        ),
+        'transactions': (Transaction.objects.filter(user=user), 'updated_at', SyncTransactionSerializer),
+        'libelles': (Libelle.objects.filter(transaction__user=user), 'updated_at', SyncLibelleSerializer),
+        'photos': (Photo.objects.filter(transaction__user=user), 'updated_at', SyncPhotoSerializer),
+        'suppressions': (
+            Suppression.objects.filter(Q(user=user) | Q(user__isnull=True)),
+            'supprime_le',
+            SuppressionSerializer,
+        ),
+    }
+
+
+def page_synchronisation(user, curseur, limite, context):
+    """Retourne une page de changements et le curseur suivant"""
+    etat = decoder_curseur(curseur)
+    depuis = _date(etat.get('depuis'))
+    maintenant = timezone.now()
+
+    if depuis is not None and depuis < maintenant - timedelta(days=settings.SYNC_RETENTION_JOURS):
+        raise ResynchronisationRequise()
+
+    if 'jusqua' not in etat:
+        # Nouvelle session : on fige la borne haute
+        etat = {
+            'depuis': etat.get('depuis'),
+            'jusqua': borne_haute(user).isoformat(),
+            'etape': 0,
+            'apres': None,
+        }
+    jusqua = _date(etat.get('jusqua'))
+    apres = etat.get('apres')
+    if (
+        jusqua is None
+        or not isinstance(etat.get('etape'), int)
+        or not (apres is None or (isinstance(apres, list) and len(apres) == 2))
+    ):
+        raise CurseurInvalide("Curseur de synchronisation invalide")
+
+    flux = _flux(user)
+    changements = {nom: [] for nom in FLUX}
+    reste = limite
+    while etat['etape'] < len(FLUX) and reste > 0:
+        nom = FLUX[etat['etape']]
+        queryset, champ, serializer_class = flux[nom]
+
+        queryset = queryset.filter(**{f'{champ}__lte': jusqua})
+        if depuis is not None:
+            queryset = queryset.filter(**{f'{champ}__gt': depuis})
+        if etat['apres']:
+            date_apres, id_apres = etat['apres']
+            date_apres = _date(date_apres)
+            queryset = queryset.filter(
+                Q(**{f'{champ}__gt': date_apres}) | Q(**{champ: date_apres, 'id__gt': id_apres})
+            )
+
+        # Un élément de plus pour savoir s'il reste des changements dans ce flux
+        objets = list(queryset.order_by(champ, 'id')[:reste + 1])
+        suite = len(objets) > reste
+        objets = objets[:reste]
+
+        changements[nom] = serializer_class(objets, many=True, context=context).data
+        reste -= len(objets)
+
+        if suite:
+            dernier = objets[-1]
+            etat['apres'] = [getattr(dernier, champ).isoformat(), str(dernier.pk)]
+            break
+        etat['etape'] += 1
+        etat['apres'] = None
+
+    termine = etat['etape'] >= len(FLUX)
+    suivant = {'depuis': etat['jusqua']} if termine else etat
+    return {
+        'changements': changements,
+        'curseur': encoder_curseur(suivant),
+        'termine': termine,
+    }
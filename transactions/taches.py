@@ -0,0 +1,39 @@
+# backend/transactions/taches.py
+"""Tâches de fond des transactions (voir taches.file)"""
+from taches.file import tache
+from .alertes import envoyer
+from .apercus import calculer_tous_apercus
+from .archives import archiver_toutes
+from .recurrences import generer_toutes
+from .releves import generer_releves as generer_tous_releves
+from .tresorerie import calculer_tous_soldes
+
+
+@tache('transactions.generer_recurrences')
+def generer_recurrences():
+    return {'transactions_creees': generer_toutes()}
+
+
+@tache('transactions.calculer_soldes')
+def calculer_soldes():
+    return {'instantanes_crees': calculer_tous_soldes()}
+
+
+@tache('transactions.archiver')
+def archiver(age_mois=None):
+    return {'transactions_archivees': archiver_toutes(age_mois)}
+
+
+@tache('transactions.notifier_alerte')
+def notifier_alerte(user_id, alerte_id):
+    return {'envoyee': envoyer(user_id, alerte_id)}
+
+
+@tache('transactions.calculer_apercus')
+def calculer_apercus(processus=None):
+    return {'apercus_calcules': calculer_tous_apercus(processus)}
+
+
+@tache('transactions.generer_releves')
+def generer_releves(processus=None):
+    return {'releves_generes': generer_tous_releves(processus=processus)}
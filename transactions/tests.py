@@ -1,3 +1,723 @@
-from django.test import TestCase
+import os
+import shutil
+import sqlite3
+import tempfile
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from django.test import RequestFactory
+
+from Moonit_backend import replicas
+from taches.file import reserver
+from utils import limites
+from utils.champs import ChampsDemandes
+from utils.renderers import OrjsonRenderer
+from .admin import TransactionAdmin
+from .alertes import NotificateurMemoire
+from .lot import _cles_connues
+from .models import AlerteBudget, Categorie, CleIdempotence, Libelle, NomLibelle, Photo, Recurrence, RegleAlerte, Suppression, Transaction
+from .recurrences import generer_occurrences
+from .sharding import shard_pour
+from .taches import notifier_alerte
+from .plans import charger_reference, verifier_plans
+from .projections import annoter_agregats_libelles, lignes_detail, lignes_liste
+from .serializers import TransactionListSerializer, TransactionSerializer
+from .sync import encoder_curseur
+from .suggestions import Usage, _Arbre, _arbres, cle_delta, cle_version, indexer_libelles, suggerer
+
+# GIF 1x1 : une photo avec un vrai fichier
+_GIF = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+
+class ProjectionsTests(TestCase):
+    """Les projections .values() (projections.py) renvoient exactement le JSON des serializers"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Avant super() : setUpTestData y enregistre la photo
+        cls.media = tempfile.mkdtemp()
+        cls.reglages = override_settings(MEDIA_ROOT=cls.media)
+        cls.reglages.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.reglages.disable()
+        shutil.rmtree(cls.media, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('projections', password='x')
+        categorie = Categorie.objects.create(
+            nom='Courses', type_categorie='depense', icone='🛒', couleur='#00AA00', est_predefinite=True
+        )
+        maintenant = timezone.now()
+        avec_libelles = Transaction.objects.create(user=cls.user, position='depense', categorie=categorie)
+        for jours, nom, montant in ((3, 'Marché', '12.50'), (1, 'Boulangerie', '3.20'), (2, 'Épicerie', '7.05')):
+            Libelle.objects.create(
+                transaction=avec_libelles, nom=nom, date=maintenant - timedelta(days=jours),
+                montant=Decimal(montant), commentaire=f"{nom} du matin",
+            )
+        Photo.objects.create(
+            transaction=avec_libelles, legende='Ticket', image=SimpleUploadedFile('ticket.gif', _GIF, 'image/gif')
+        )
+        # Sans libellé : totaux à zéro, premier libellé vide
+        Transaction.objects.create(
+            user=cls.user, volet='budget', position='depense', categorie=categorie, statut='validee'
+        )
+
+    def _requete(self, parametres=''):
+        requete = Request(APIRequestFactory().get(f'/api/transactions/{parametres}'))
+        requete.user = self.user
+        return requete
+
+    def _transactions(self):
+        return Transaction.objects.filter(user=self.user).select_related('categorie').order_by('-created_at')
+
+    def _json(self, donnees):
+        # Comparaison sur la réponse envoyée (décimaux, dates, UUID encodés)
+        return OrjsonRenderer().render(donnees)
+
+    def test_liste(self):
+        for parametres in ('', '?fields=id,montant_total,premier_libelle', '?fields=categorie,nb_libelles'):
+            with self.subTest(parametres=parametres):
+                requete = self._requete(parametres)
+                attendu = TransactionListSerializer(
+                    self._transactions().prefetch_related('libelles'), many=True, context={'request': requete}
+                ).data
+                # TransactionListSerializer ne gère pas ?fields= : même filtre que la vue
+                attendu = [ChampsDemandes(requete).filtrer(ligne) for ligne in attendu]
+                self.assertEqual(self._json(lignes_liste(self._transactions(), requete)), self._json(attendu))
+
+    def test_detail(self):
+        for parametres in (
+            '',
+            '?fields=id,montant_total',
+            '?fields=id,libelles',
+            '?expand=photos',
+            '?fields=id,statut,photos&expand=libelles',
+        ):
+            with self.subTest(parametres=parametres):
+                requete = self._requete(parametres)
+                attendu = TransactionSerializer(
+                    annoter_agregats_libelles(self._transactions().prefetch_related('libelles', 'photos')),
+                    many=True,
+                    context={'request': requete},
+                ).data
+                self.assertEqual(self._json(lignes_detail(self._transactions(), requete)), self._json(attendu))
+
+    def test_detail_sans_requete(self):
+        attendu = TransactionSerializer(
+            self._transactions().prefetch_related('libelles', 'photos'), many=True
+        ).data
+        self.assertEqual(self._json(lignes_detail(self._transactions())), self._json(attendu))
+
+
+class PlansTests(TestCase):
+    """Plans d'exécution des requêtes chaudes (plans.py) conformes à plans_reference.json"""
+
+    # Les données du scénario vivent sur les shards
+    databases = '__all__'
+
+    def test_plans(self):
+        if connection.vendor not in charger_reference():
+            self.skipTest(f"Pas de référence {connection.vendor} : manage.py analyser_plans --enregistrer")
+        verifier_plans()
+
+
+@override_settings(LIMITES_ACTIVES=False)
+class GroupeTests(TestCase):
+    """Sélection des opérations groupées (/groupe/...) : un filtre douteux ne sélectionne rien"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('groupe', password='x')
+        cls.categorie = Categorie.objects.create(nom='Divers', type_categorie='depense', est_predefinite=True)
+        for statut in ('validee', 'en_attente'):
+            Transaction.objects.create(user=cls.user, position='depense', categorie=cls.categorie, statut=statut)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _supprimer(self, filtre):
+        return self.client.post(reverse('transactions-suppression-groupe'), {'filtre': filtre}, format='json')
+
+    def test_filtre_mal_orthographie(self):
+        reponse = self._supprimer({'statu': 'validee'})
+        self.assertEqual(reponse.status_code, 400)
+        self.assertIn('statu', str(reponse.data['filtre']))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    def test_filtre_sans_critere(self):
+        for filtre in ({'statut': ''}, {'categorie': None, 'date_debut': ''}):
+            with self.subTest(filtre=filtre):
+                self.assertEqual(self._supprimer(filtre).status_code, 400)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    def test_filtre_valide(self):
+        reponse = self._supprimer({'statut': 'en_attente'})
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(reponse.data, {'selectionnees': 1, 'supprimees': 1})
+        self.assertEqual(list(Transaction.objects.filter(user=self.user).values_list('statut', flat=True)), ['validee'])
+
+
+@override_settings(LIMITES_ACTIVES=False)
+class RemplacementLibellesTests(TestCase):
+    """PATCH des libellés d'une transaction : nombre de requêtes indépendant du nombre de lignes touchées"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('remplacement', password='x')
+        cls.categorie = Categorie.objects.create(nom='Santé', type_categorie='depense', est_predefinite=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _transaction(self, prefixe):
+        transaction = Transaction.objects.create(
+            user=self.user, position='depense', categorie=self.categorie, statut='validee'
+        )
+        for i in range(6):
+            Libelle.objects.create(
+                transaction=transaction, nom=f"{prefixe} {i}", date=timezone.now(), montant=Decimal(10 + i)
+            )
+        return transaction
+
+    def _patcher(self, transaction, libelles, nb):
+        """Supprime, modifie et ajoute chacun `nb` libellés ; retourne les libellés supprimés"""
+        donnees = [
+            {'id': str(libelle.pk), 'nom': libelle.nom, 'date': libelle.date.isoformat(), 'montant': str(libelle.montant)}
+            for libelle in libelles[nb:]
+        ]
+        for ligne in donnees[:nb]:
+            ligne['montant'] = '99.00'
+        donnees += [
+            {'nom': f"Nouvelle {transaction.pk} {i}", 'date': timezone.now().isoformat(), 'montant': '5.00'} for i in range(nb)
+        ]
+        reponse = self.client.patch(
+            reverse('transactions-detail', args=[transaction.pk]), {'libelles': donnees}, format='json'
+        )
+        self.assertEqual(reponse.status_code, 200, reponse.data)
+        self.assertEqual(len(reponse.data['libelles']), 6)
+        return [libelle.pk for libelle in libelles[:nb]]
+
+    def _verifier_suppressions(self, supprimes):
+        self.assertFalse(Libelle.objects.filter(pk__in=supprimes).exists())
+        self.assertEqual(
+            Suppression.objects.filter(modele='libelle', objet_id__in=supprimes, user=self.user).count(),
+            len(supprimes),
+        )
+
+    def test_requetes_constantes(self):
+        # Noms distincts : l'index d'autocomplétion évolue de la même façon
+        une_ligne, plusieurs = self._transaction('Pharmacie'), self._transaction('Consultation')
+        libelles = list(une_ligne.libelles.all())
+        with CaptureQueriesContext(connection) as requetes:
+            supprimes = self._patcher(une_ligne, libelles, 1)
+        self._verifier_suppressions(supprimes)
+        libelles = list(plusieurs.libelles.all())
+        with self.assertNumQueries(len(requetes)):
+            supprimes = self._patcher(plusieurs, libelles, 4)
+        self._verifier_suppressions(supprimes)
+
+
+@override_settings(SUGGESTIONS_MAX=3)
+class SuggestionsTests(TestCase):
+    """Arbres de suggestions tenus à jour par les deltas publiés dans le cache, sans requête par recherche"""
+
+    PREFIXES = ['', 'c', 'co', 'con', 'p', 'ph', 'm', 'consultation med', 'medecin g', 'x']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('suggestions', password='x')
+
+    def setUp(self):
+        cache.clear()
+        _arbres.pop(self.user.pk)
+        self.maintenant = timezone.now()
+        self._indexer(ajouts=[
+            self._usage(nom, jours)
+            for jours, nom in enumerate([
+                'Consultation médecin généraliste', 'Consultation dentiste', 'Courses', 'Courses marché',
+                'Carburant', 'Pharmacie', 'Pharmacie de garde', 'Médecin', 'Médicaments', 'Cinéma', 'Coiffeur',
+            ])
+        ] + [self._usage('Courses', 40)] * 3)
+
+    def _usage(self, nom, jours):
+        return Usage(nom, self.maintenant - timedelta(days=jours), Decimal('10.00'), None)
+
+    def _indexer(self, ajouts=(), retraits=()):
+        with self.captureOnCommitCallbacks(execute=True):
+            indexer_libelles(self.user.pk, ajouts=ajouts, retraits=retraits)
+
+    def _reconstruit(self, prefixe):
+        lignes = NomLibelle.objects.filter(user=self.user).values_list(
+            'cle', 'nom', 'categorie_id', 'montant', 'nb_utilisations', 'dernier_usage'
+        )
+        return _Arbre(list(lignes), None).chercher(prefixe, 3)
+
+    def _verifier(self):
+        for prefixe in self.PREFIXES:
+            with self.subTest(prefixe=prefixe):
+                self.assertEqual(suggerer(self.user.pk, prefixe), self._reconstruit(prefixe))
+
+    def test_deltas_appliques_sans_reconstruction(self):
+        self._verifier()
+        for ajouts, retraits in (
+            ([self._usage('Consultation cardiologue', 0)] * 4, []),
+            ([self._usage('Pharmacie', 0)] * 2, ['Courses', 'Courses', 'Courses', 'Courses']),
+            ([], ['Consultation médecin généraliste', 'Médecin', 'Coiffeur']),
+            ([self._usage('Médecin généraliste', 1)], ['Cinéma']),
+        ):
+            self._indexer(ajouts, retraits)
+            with self.assertNumQueries(0):
+                for prefixe in self.PREFIXES:
+                    suggerer(self.user.pk, prefixe)
+            self._verifier()
+
+    def test_delta_perdu_reconstruit(self):
+        suggerer(self.user.pk, 'c')
+        self._indexer(retraits=['Carburant'])
+        cache.delete(cle_delta(self.user.pk, cache.get(cle_version(self.user.pk))))
+        with self.assertNumQueries(1):
+            suggerer(self.user.pk, 'c')
+        self._verifier()
+
+    def test_compteur_perdu_reconstruit(self):
+        suggerer(self.user.pk, 'c')
+        cache.delete(cle_version(self.user.pk))
+        self._indexer(retraits=['Carburant'])
+        with self.assertNumQueries(1):
+            self.assertNotIn('Carburant', [suggestion.nom for suggestion in suggerer(self.user.pk, 'c')])
+        with self.assertNumQueries(0):
+            suggerer(self.user.pk, 'c')
+
+
+@override_settings(LIMITES_ACTIVES=False, ALERTES_NOTIFICATEUR='transactions.alertes.NotificateurMemoire')
+class AlertesTests(TestCase):
+    """Seuils de 80 % et 100 % notifiés une fois par règle et par mois, quel que soit le chemin d'écriture"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alertes', password='x')
+        cls.categorie = Categorie.objects.create(nom='Alimentation', type_categorie='depense', est_predefinite=True)
+        # Seuils par défaut : 80 et 100 %
+        RegleAlerte.objects.create(user=cls.user, categorie=cls.categorie)
+        budget = Transaction.objects.create(
+            user=cls.user, volet='budget', position='depense', categorie=cls.categorie, statut='validee'
+        )
+        Libelle.objects.create(transaction=budget, nom='Budget', date=timezone.now(), montant=Decimal('100.00'))
+
+    def setUp(self):
+        # Liste de classe du notificateur : vidée à chaque test
+        NotificateurMemoire.envoyees = []
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _ecrire(self, ecriture, *args):
+        """Exécute l'écriture, ses callbacks on_commit, puis les notifications mises en file (comme un worker)"""
+        with self.captureOnCommitCallbacks(execute=True):
+            ecriture(*args)
+        for tache in reserver('tests', 100):
+            notifier_alerte(**tache.arguments)
+
+    def _seuils(self):
+        return sorted(alerte.seuil for alerte in NotificateurMemoire.envoyees)
+
+    def _verifier(self, depenser):
+        """50 puis 30, 25 et 10 de dépenses sur un budget de 100"""
+        for montant, attendus in (('50.00', []), ('30.00', [80]), ('25.00', [80, 100]), ('10.00', [80, 100])):
+            with self.subTest(montant=montant):
+                self._ecrire(depenser, montant)
+                self.assertEqual(self._seuils(), attendus)
+
+    def _libelle(self, montant, date=None):
+        return {'nom': 'Courses', 'date': (date or timezone.now()).isoformat(), 'montant': montant}
+
+    def _creer(self, montant, date=None):
+        reponse = self.client.post(reverse('transactions-list'), {
+            'volet': 'suivi', 'position': 'depense', 'categorie_id': str(self.categorie.pk), 'statut': 'validee',
+            'libelles': [self._libelle(montant, date)],
+        }, format='json')
+        self.assertEqual(reponse.status_code, 201, reponse.data)
+
+    def test_creation(self):
+        self._verifier(self._creer)
+
+    def test_modification(self):
+        transaction = Transaction.objects.create(
+            user=self.user, position='depense', categorie=self.categorie, statut='validee'
+        )
+
+        def ajouter_ligne(montant):
+            lignes = [
+                {'id': str(libelle.pk), **self._libelle(str(libelle.montant), libelle.date)}
+                for libelle in transaction.libelles.all()
+            ]
+            reponse = self.client.patch(
+                reverse('transactions-detail', args=[transaction.pk]),
+                {'libelles': lignes + [self._libelle(montant)]}, format='json',
+            )
+            self.assertEqual(reponse.status_code, 200, reponse.data)
+        self._verifier(ajouter_ligne)
+
+    def test_lot(self):
+        def envoyer_lot(montant):
+            reponse = self.client.post(reverse('transactions-lot'), {'operations': [{
+                'cle': f"depense-{montant}", 'op': 'create', 'type': 'transaction',
+                'data': {
+                    'volet': 'suivi', 'position': 'depense', 'categorie_id': str(self.categorie.pk),
+                    'statut': 'validee', 'libelles': [self._libelle(montant)],
+                },
+            }]}, format='json')
+            self.assertEqual(reponse.status_code, 200, reponse.data)
+        self._verifier(envoyer_lot)
+
+    def test_recurrences(self):
+        def generer(montant):
+            # Modèle daté d'un autre mois : seule l'occurrence du jour compte
+            modele = Transaction.objects.create(
+                user=self.user, position='depense', categorie=self.categorie, statut='validee'
+            )
+            Libelle.objects.create(
+                transaction=modele, nom='Abonnement', date=timezone.now() - timedelta(days=40), montant=Decimal(montant)
+            )
+            aujourd_hui = timezone.localdate()
+            Recurrence.objects.create(
+                user=self.user, modele=modele, frequence='mensuelle', debut=aujourd_hui, prochaine_echeance=aujourd_hui
+            )
+            generer_occurrences(shard_pour(self.user.pk), aujourd_hui)
+        self._verifier(generer)
+
+    def test_validation_administration(self):
+        modele_admin = TransactionAdmin(Transaction, admin.site)
+
+        def valider(montant):
+            transaction = Transaction.objects.create(
+                user=self.user, position='depense', categorie=self.categorie, statut='en_attente'
+            )
+            Libelle.objects.create(transaction=transaction, nom='Courses', date=timezone.now(), montant=Decimal(montant))
+            requete = RequestFactory().post('/admin/transactions/transaction/')
+            requete.session = {}
+            requete._messages = FallbackStorage(requete)
+            modele_admin.valider_transactions(requete, Transaction.objects.filter(pk=transaction.pk))
+        self._verifier(valider)
+
+    def test_autre_mois(self):
+        self._ecrire(self._creer, '500.00', timezone.now() - timedelta(days=40))
+        self.assertEqual(self._seuils(), [])
+        self.assertFalse(AlerteBudget.objects.filter(user=self.user).exists())
+
+
+@override_settings(LIMITES_ACTIVES=False, DATABASE_REPLICAS=['replica_test'])
+class ReplicasTests(TestCase):
+    """Lectures des agrégats sur un réplica (second fichier SQLite) : relecture après écriture et repli sur le primaire"""
+
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        # Copie du schéma du primaire, avant les données de setUpTestData, dans un fichier séparé
+        cls.dossier = tempfile.mkdtemp()
+        chemin = os.path.join(cls.dossier, 'replica.sqlite3')
+        connections['default'].ensure_connection()
+        copie = sqlite3.connect(chemin)
+        connections['default'].connection.backup(copie)
+        copie.close()
+        # Déclaré avant super() : inclus dans '__all__', donc dans les transactions de TestCase
+        connections.settings['replica_test'] = {**connections.settings['default'], 'NAME': chemin}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica_test'].close()
+        del connections['replica_test']
+        connections.settings.pop('replica_test')
+        shutil.rmtree(cls.dossier, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('replicas', password='x')
+        cls.categorie = Categorie.objects.create(nom='Salaire', type_categorie='revenu', est_predefinite=True)
+        # Sur le primaire seulement : le réplica n'a pas encore reçu cette écriture
+        transaction = Transaction.objects.create(
+            user=cls.user, position='revenu', categorie=cls.categorie, statut='validee'
+        )
+        Libelle.objects.create(transaction=transaction, nom='Salaire', date=timezone.now(), montant=Decimal('100.00'))
+
+    def setUp(self):
+        cache.clear()
+        replicas._replicas_en_panne.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _revenus(self):
+        reponse = self.client.get(reverse('transactions-statistiques'))
+        self.assertEqual(reponse.status_code, 200, reponse.data)
+        return Decimal(reponse.data['total_revenus'])
+
+    def test_lecture_sur_replica(self):
+        self.assertEqual(self._revenus(), 0)
+
+    def test_relecture_apres_ecriture(self):
+        reponse = self.client.post(reverse('transactions-list'), {
+            'volet': 'suivi', 'position': 'revenu', 'categorie_id': str(self.categorie.pk), 'statut': 'validee',
+            'libelles': [{'nom': 'Prime', 'date': timezone.now().isoformat(), 'montant': '50.00'}],
+        }, format='json')
+        self.assertEqual(reponse.status_code, 201, reponse.data)
+        self.assertEqual(self._revenus(), Decimal('150.00'))
+        cache.delete(replicas._cle_collante(self.user.pk))
+        self.assertEqual(self._revenus(), 0)
+
+    def test_repli_sur_primaire(self):
+        # Réplica cassé après sa sélection : la lecture échoue avec une OperationalError
+        # (renommage annulé avec la transaction du test)
+        with connections['replica_test'].cursor() as curseur:
+            curseur.execute('ALTER TABLE transactions_libelle RENAME TO libelle_indisponible')
+        self.assertEqual(self._revenus(), Decimal('100.00'))
+        self.assertIn('replica_test', replicas._replicas_en_panne)
+        # Écarté ensuite : plus choisi tant que REPLICA_RETRY_SECONDS n'est pas écoulé
+        self.assertIsNone(replicas.choisir_replica())
+
+
+@override_settings(LIMITES_ACTIVES=False)
+class LotTests(TestCase):
+    """Lot hors ligne : idempotence, tout ou rien, purge des clés expirées et suppressions groupées"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('lot', password='x')
+        cls.categorie = Categorie.objects.create(nom='Loisirs', type_categorie='depense', est_predefinite=True)
+
+    def setUp(self):
+        cache.clear()
+        _arbres.pop(self.user.pk)
+        # Date fixe : une opération renvoyée doit avoir la même empreinte
+        self.date = timezone.now().isoformat()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _creation(self, cle, montant='12.00', nom='Cinéma'):
+        return {
+            'cle': cle, 'op': 'create', 'type': 'transaction',
+            'data': {
+                'position': 'depense', 'categorie_id': str(self.categorie.pk),
+                'libelles': [{'nom': nom, 'date': self.date, 'montant': montant}],
+            },
+        }
+
+    def _envoyer(self, *operations, attendu=200):
+        # Deltas d'autocomplétion publiés à la validation (on_commit)
+        with self.captureOnCommitCallbacks(execute=True):
+            reponse = self.client.post(
+                reverse('transactions-lot'), {'operations': list(operations)}, format='json'
+            )
+        self.assertEqual(reponse.status_code, attendu, reponse.data)
+        return reponse.data['resultats']
+
+    def test_rejeu(self):
+        premier, = self._envoyer(self._creation('a'))
+        rejoue, = self._envoyer(self._creation('a'))
+        self.assertEqual(premier['statut'], 'ok')
+        self.assertEqual(rejoue, {**premier, 'statut': 'rejouee'})
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_cle_reutilisee_pour_autre_operation(self):
+        self._envoyer(self._creation('a'))
+        resultat, = self._envoyer(self._creation('a', montant='99.00'), attendu=400)
+        self.assertEqual(resultat['statut'], 'erreur')
+        self.assertIn('cle', resultat['erreurs'])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_tout_ou_rien(self):
+        valide, invalide = self._envoyer(
+            self._creation('a'),
+            {'cle': 'b', 'op': 'delete', 'type': 'libelle', 'id': str(uuid.uuid4())},
+            attendu=400,
+        )
+        self.assertEqual(valide, {'cle': 'a', 'statut': 'non_appliquee'})
+        self.assertEqual(invalide['statut'], 'erreur')
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+        self.assertFalse(CleIdempotence.objects.filter(user=self.user).exists())
+
+    def test_cles_expirees_purgees(self):
+        self._envoyer(self._creation('a'))
+        CleIdempotence.objects.filter(user=self.user).update(expire_le=timezone.now() - timedelta(seconds=1))
+        resultat, = self._envoyer(self._creation('a'))
+        # Clé expirée : purgée puis réappliquée comme une nouvelle opération
+        self.assertEqual(resultat['statut'], 'ok')
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(CleIdempotence.objects.filter(user=self.user).count(), 1)
+
+    def test_renvoi_concurrent_rejoue(self):
+        premier, = self._envoyer(self._creation('a'))
+        lectures = []
+
+        def cles_connues(*args):
+            # Premier passage : la clé n'est pas encore visible (requête concurrente en cours)
+            lectures.append(args)
+            return {} if len(lectures) == 1 else _cles_connues(*args)
+
+        with mock.patch('transactions.lot._cles_connues', side_effect=cles_connues):
+            rejoue, = self._envoyer(self._creation('a'))
+        self.assertEqual(len(lectures), 2)
+        self.assertEqual(rejoue, {**premier, 'statut': 'rejouee'})
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_suppression_libelles_groupee(self):
+        self._envoyer(self._creation('a', nom='Théâtre'))
+        libelle = Libelle.objects.get(transaction__user=self.user)
+        self.assertEqual([suggestion.nom for suggestion in suggerer(self.user.pk, 'Thé', 5)], ['Théâtre'])
+
+        resultat, = self._envoyer({'cle': 'b', 'op': 'delete', 'type': 'libelle', 'id': str(libelle.pk)})
+        self.assertEqual(resultat['statut'], 'ok')
+        self.assertFalse(Libelle.objects.filter(pk=libelle.pk).exists())
+        self.assertTrue(Suppression.objects.filter(modele='libelle', objet_id=libelle.pk).exists())
+        self.assertEqual(suggerer(self.user.pk, 'Thé', 5), [])
+
+
+@override_settings(LIMITES_ACTIVES=False, SYNC_MARGE_SECONDES=0)
+class SyncTests(TestCase):
+    """Synchronisation par curseur : rien de manqué pendant la pagination, traces de suppression, curseur expiré"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('sync', password='x')
+        cls.categorie = Categorie.objects.create(nom='Transport', type_categorie='depense', est_predefinite=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _transaction(self):
+        return Transaction.objects.create(user=self.user, position='depense', categorie=self.categorie)
+
+    def _page(self, curseur=None, attendu=200):
+        reponse = self.client.get(reverse('transactions-sync'), {'curseur': curseur or '', 'limite': 1})
+        self.assertEqual(reponse.status_code, attendu, reponse.data)
+        return reponse.data
+
+    def _session(self, curseur=None, pendant=None):
+        """Parcourt une session complète ; `pendant` est exécuté après la première page"""
+        changements = {}
+        while True:
+            page = self._page(curseur)
+            for nom, elements in page['changements'].items():
+                changements.setdefault(nom, []).extend(elements)
+            curseur = page['curseur']
+            if pendant is not None:
+                pendant()
+                pendant = None
+            if page['termine']:
+                return changements, curseur
+
+    def _ids(self, changements):
+        return [str(transaction['id']) for transaction in changements['transactions']]
+
+    def test_ecritures_pendant_la_pagination(self):
+        avant = [self._transaction() for _ in range(3)]
+        debut = timezone.now()
+        # Écriture datée après le début de la plus ancienne transaction encore ouverte
+        en_cours = self._transaction()
+        ecrites = []
+        with mock.patch('transactions.sync._debut_ecritures_en_cours', return_value=debut):
+            changements, curseur = self._session(pendant=lambda: ecrites.append(self._transaction()))
+        self.assertEqual(sorted(self._ids(changements)), sorted(str(transaction.pk) for transaction in avant))
+
+        # Session suivante : les écritures validées pendant la précédente, une seule fois chacune
+        changements, _ = self._session(curseur)
+        self.assertEqual(
+            sorted(self._ids(changements)), sorted(str(transaction.pk) for transaction in [en_cours] + ecrites)
+        )
+
+    def test_suppression_tracee(self):
+        transaction = self._transaction()
+        libelle = Libelle.objects.create(
+            transaction=transaction, nom='Train', date=timezone.now(), montant=Decimal('30.00')
+        )
+        _, curseur = self._session()
+        reponse = self.client.delete(reverse('transactions-detail', args=[transaction.pk]))
+        self.assertEqual(reponse.status_code, 204)
+
+        changements, _ = self._session(curseur)
+        self.assertEqual(changements['transactions'], [])
+        self.assertEqual(changements['libelles'], [])
+        # Libellés supprimés en cascade : la trace de la transaction suffit au client
+        self.assertEqual(
+            [(trace['modele'], str(trace['objet_id'])) for trace in changements['suppressions']],
+            [('transaction', str(transaction.pk))],
+        )
+        self.assertFalse(Libelle.objects.filter(pk=libelle.pk).exists())
+
+    @override_settings(SYNC_RETENTION_JOURS=90)
+    def test_curseur_expire(self):
+        curseur = encoder_curseur({'depuis': (timezone.now() - timedelta(days=91)).isoformat()})
+        self._page(curseur, attendu=410)
+
+
+@override_settings(
+    LIMITES_ACTIVES=True, LIMITES_STOCKAGE='utils.limites.SeauxMemoire', LIMITES_CAPACITE=10, LIMITES_DEBIT=1,
+)
+class LimitesTests(TestCase):
+    """Seaux à jetons : coût par endpoint, en-têtes RateLimit-* et 429 avec Retry-After"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('limites', password='x')
+
+    def setUp(self):
+        # Seaux neufs à chaque test
+        limites._stockage = None
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _get(self, nom, attendu=200):
+        reponse = self.client.get(reverse(nom))
+        self.assertEqual(reponse.status_code, attendu)
+        return reponse
+
+    def _entetes(self, reponse):
+        return [reponse[entete] for entete in ('RateLimit-Limit', 'RateLimit-Remaining', 'RateLimit-Reset')]
+
+    def test_entetes(self):
+        # 'list' coûte 5 jetons sur 10, rendus à 1 par seconde
+        self.assertEqual(self._entetes(self._get('transactions-list')), ['10', '5', '5'])
+
+    def test_cout_par_endpoint(self):
+        for nom, restants in (('transactions-recentes', ['7', '4', '1']), ('transactions-statistiques', ['0'])):
+            for attendus in restants:
+                with self.subTest(nom=nom, restants=attendus):
+                    self.assertEqual(self._entetes(self._get(nom))[1], attendus)
+
+    def test_seau_vide(self):
+        self._get('transactions-statistiques')
+        reponse = self._get('transactions-statistiques', attendu=429)
+        self.assertEqual(reponse['Retry-After'], '10')
+        self.assertEqual(reponse['RateLimit-Remaining'], '0')
+        # Seau propre à l'endpoint : les autres restent servis
+        self._get('transactions-recentes')
+
+    @override_settings(LIMITES_COUTS={'statistiques': 4})
+    def test_couts_configurables(self):
+        self.assertEqual(self._entetes(self._get('transactions-statistiques'))[1], '6')
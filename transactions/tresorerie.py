@@ -0,0 +1,314 @@
+# backend/transactions/tresorerie.py
+"""
+Séries de trésorerie (revenus, dépenses, net, solde cumulé) par jour,
+semaine ou mois, calculées en base : troncature de date + GROUP BY pour les
+flux, fonction fenêtre SUM(...) OVER (ORDER BY période) pour le solde.
+
+Seuls les libellés des transactions validées comptent (comme /statistiques/).
+Le solde d'ouverture part du dernier SoldeMensuel antérieur à la plage, auquel
+on ajoute les quelques libellés qui le suivent : le coût dépend de la
+longueur de la plage, pas de l'ancienneté de l'historique. En granularité
+mensuelle, les mois déjà instantanés sont lus directement dans SoldeMensuel.
+
+Les libellés archivés (voir archives.py) comptent via ResumeArchive : chaque
+mois archivé est rattaché à la période qui contient son premier jour.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import (
+    Case, DateField, DecimalField, Exists, F, Func, Min, OuterRef, Subquery, Sum, Value, When, Window
+)
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from utils.dates import ajouter_mois
+from .models import Libelle, ResumeArchive, SoldeMensuel
+from .projections import total_annote
+from .sharding import shards
+
+PERIODES = {'jour': 'day', 'semaine': 'week', 'mois': 'month'}
+
+_MONTANT = DecimalField(max_digits=14, decimal_places=2)
+_ZERO = Decimal('0.00')
+
+_invalidation_suspendue = ContextVar('invalidation_suspendue', default=False)
+
+
+class _SommeFenetre(Func):
+    """SUM() utilisable dans OVER (...) sur un agrégat : SUM(SUM(x)) OVER (...)"""
+    function = 'SUM'
+    window_compatible = True
+
+
+def _flux(position, champ='transaction__position'):
+    return Sum(
+        Case(When(**{champ: position}, then=F('montant')), default=Value(0), output_field=_MONTANT)
+    )
+
+
+def _flux_archives(resumes, *cles):
+    """Revenus et dépenses archivés (transactions validées) de ResumeArchive, groupés par `cles`"""
+    return resumes.filter(statut='validee').values(*cles).annotate(
+        revenus=_flux('revenu', 'position'), depenses=_flux('depense', 'position')
+    ).order_by()
+
+
+def _lignes(user_id, volet):
+    return Libelle.objects.pour_utilisateur(user_id).filter(
+        transaction__volet=volet, transaction__statut='validee'
+    )
+
+
+def _instant(jour):
+    return timezone.make_aware(datetime.combine(jour, time.min))
+
+
+def debut_periode(jour, periode):
+    if periode == 'mois':
+        return jour.replace(day=1)
+    if periode == 'semaine':
+        return jour - timedelta(days=jour.weekday())
+    return jour
+
+
+def periode_suivante(jour, periode):
+    if periode == 'mois':
+        return ajouter_mois(jour, 1)
+    return jour + timedelta(days=7 if periode == 'semaine' else 1)
+
+
+def solde_avant(user_id, volet, jour):
+    """Solde cumulé de toutes les périodes antérieures à `jour`"""
+    instantane = (
+        SoldeMensuel.objects.pour_utilisateur(user_id)
+        .filter(volet=volet, mois__lt=jour.replace(day=1))
+        .order_by('-mois').first()
+    )
+    lignes = _lignes(user_id, volet).filter(date__lt=_instant(jour))
+    archives = ResumeArchive.objects.pour_utilisateur(user_id).filter(volet=volet, mois__lt=jour)
+    solde = _ZERO
+    if instantane is not None:
+        solde = instantane.solde_cumule
+        lignes = lignes.filter(date__gte=_instant(ajouter_mois(instantane.mois, 1)))
+        archives = archives.filter(mois__gt=instantane.mois)
+    for flux in (
+        lignes.aggregate(revenus=_flux('revenu'), depenses=_flux('depense')),
+        archives.filter(statut='validee').aggregate(
+            revenus=_flux('revenu', 'position'), depenses=_flux('depense', 'position')
+        ),
+    ):
+        solde += total_annote(flux['revenus']) - total_annote(flux['depenses'])
+    return solde
+
+
+def serie_tresorerie(user_id, volet, periode, debut, fin):
+    """
+    Points de `debut` à `fin` (inclus), une entrée par période, périodes vides
+    comprises (flux à zéro, solde reporté).
+    """
+    debut = debut_periode(debut, periode)
+    solde_initial = solde_avant(user_id, volet, debut)
+
+    flux, archives = {}, {}
+    depuis, solde_depuis = debut, solde_initial
+    if periode == 'mois':
+        for instantane in (
+            SoldeMensuel.objects.pour_utilisateur(user_id)
+            .filter(volet=volet, mois__gte=debut, mois__lte=fin).order_by('mois')
+        ):
+            flux[instantane.mois] = (instantane.revenus, instantane.depenses, instantane.solde_cumule)
+            depuis, solde_depuis = ajouter_mois(instantane.mois, 1), instantane.solde_cumule
+
+    if depuis <= fin:
+        lignes = (
+            _lignes(user_id, volet)
+            .filter(date__gte=_instant(depuis), date__lt=_instant(fin + timedelta(days=1)))
+            .annotate(periode=Trunc('date', PERIODES[periode], output_field=DateField()))
+            .values('periode')
+            .annotate(revenus=_flux('revenu'), depenses=_flux('depense'))
+            .annotate(cumul=Window(
+                _SommeFenetre(F('revenus') - F('depenses'), output_field=_MONTANT),
+                order_by=F('periode').asc(),
+            ))
+            .order_by('periode')
+        )
+        for ligne in lignes:
+            flux[ligne['periode']] = (
+                total_annote(ligne['revenus']),
+                total_annote(ligne['depenses']),
+                solde_depuis + total_annote(ligne['cumul']),
+            )
+        resumes = ResumeArchive.objects.pour_utilisateur(user_id).filter(volet=volet, mois__gte=depuis, mois__lte=fin)
+        for ligne in _flux_archives(resumes, 'mois'):
+            cle = debut_periode(ligne['mois'], periode)
+            revenus, depenses = archives.get(cle, (_ZERO, _ZERO))
+            archives[cle] = (revenus + total_annote(ligne['revenus']), depenses + total_annote(ligne['depenses']))
+
+    points = []
+    solde = solde_initial
+    # Net archivé cumulé depuis `depuis`, absent du cumul de la fenêtre
+    net_archive = _ZERO
+    jour = debut
+    while jour <= fin:
+        revenus_archives, depenses_archives = archives.get(jour, (_ZERO, _ZERO))
+        net_archive += revenus_archives - depenses_archives
+        if jour in flux:
+            revenus, depenses, solde = flux[jour]
+            solde += net_archive
+        else:
+            revenus, depenses = _ZERO, _ZERO
+            solde += revenus_archives - depenses_archives
+        revenus += revenus_archives
+        depenses += depenses_archives
+        points.append({
+            'date': jour,
+            'revenus': revenus,
+            'depenses': depenses,
+            'net': revenus - depenses,
+            'solde': solde,
+        })
+        jour = periode_suivante(jour, periode)
+    return {'solde_initial': solde_initial, 'points': points}
+
+
+def nombre_periodes(debut, fin, periode):
+    if periode == 'mois':
+        return (fin.year - debut.year) * 12 + fin.month - debut.month + 1
+    return (fin - debut).days // (7 if periode == 'semaine' else 1) + 1
+
+
+# ========== INSTANTANÉS ==========
+
+@contextmanager
+def sans_invalidation():
+    """Écritures qui déplacent des libellés sans changer les totaux (archivage, restauration)"""
+    jeton = _invalidation_suspendue.set(True)
+    try:
+        yield
+    finally:
+        _invalidation_suspendue.reset(jeton)
+
+
+def mois_clos(depuis):
+    """Premier jour du mois de `depuis` s'il est clos (donc instantané), sinon None"""
+    if depuis is None:
+        return None
+    if isinstance(depuis, datetime):
+        depuis = timezone.localtime(depuis).date()
+    mois = depuis.replace(day=1)
+    return mois if mois < timezone.localdate().replace(day=1) else None
+
+
+def invalider_soldes(user_id, depuis):
+    """
+    À appeler après une écriture datée `depuis` (date ou datetime) : supprime
+    les instantanés à partir de ce mois. Rien à faire pour le mois en cours,
+    qui n'est jamais instantané.
+    """
+    mois = mois_clos(depuis)
+    if mois is None or user_id is None or _invalidation_suspendue.get():
+        return
+    SoldeMensuel.objects.pour_utilisateur(user_id).filter(mois__gte=mois).delete()
+
+
+def invalider_soldes_transactions(transactions):
+    """invalider_soldes pour un queryset de transactions (un agrégat par utilisateur)"""
+    dates = (
+        Libelle.objects.filter(transaction__in=transactions)
+        .values('transaction__user_id').annotate(depuis=Min('date')).order_by()
+    )
+    for ligne in dates:
+        invalider_soldes(ligne['transaction__user_id'], ligne['depuis'])
+
+
+def calculer_soldes(alias):
+    """
+    Complète les instantanés mensuels de tous les utilisateurs d'un shard
+    jusqu'au dernier mois clos, avec deux GROUP BY (utilisateur, volet, mois) :
+    - utilisateurs déjà instantanés : seulement les mois qui suivent leur
+      dernier instantané ;
+    - nouveaux utilisateurs : tout leur historique (une seule fois).
+    Les mêmes requêtes sur ResumeArchive ajoutent les mois archivés.
+    Retourne le nombre d'instantanés créés.
+    """
+    mois_courant = timezone.localdate().replace(day=1)
+    instantanes = SoldeMensuel.objects.using(alias)
+    dernier_mois = instantanes.filter(user_id=OuterRef('transaction__user_id')).order_by('-mois').values('mois')[:1]
+    dernier_mois_archive = instantanes.filter(user_id=OuterRef('user_id')).order_by('-mois').values('mois')[:1]
+
+    with db_transaction.atomic(using=alias):
+        # Dernier instantané de chaque (utilisateur, volet), en une requête
+        derniers = {
+            (instantane.user_id, instantane.volet): instantane
+            for instantane in instantanes.filter(
+                mois=Subquery(
+                    instantanes.filter(user_id=OuterRef('user_id'), volet=OuterRef('volet'))
+                    .order_by('-mois').values('mois')[:1]
+                )
+            )
+        }
+        # Les instantanés d'un utilisateur s'arrêtent au même mois pour ses deux volets
+        reprises = {}
+        for (user_id, _), instantane in derniers.items():
+            reprises[user_id] = max(reprises.get(user_id, instantane.mois), instantane.mois)
+
+        lignes = Libelle.objects.using(alias).filter(
+            transaction__statut='validee', date__lt=_instant(mois_courant)
+        ).annotate(mois=Trunc('date', 'month', output_field=DateField()))
+        requetes = [lignes.filter(~Exists(instantanes.filter(user_id=OuterRef('transaction__user_id'))))]
+        resumes = ResumeArchive.objects.using(alias).filter(mois__lt=mois_courant)
+        requetes_archives = [resumes.filter(~Exists(instantanes.filter(user_id=OuterRef('user_id'))))]
+        if reprises:
+            requetes.append(
+                lignes.filter(date__gte=_instant(ajouter_mois(min(reprises.values()), 1)))
+                .filter(mois__gt=Subquery(dernier_mois))
+            )
+            requetes_archives.append(resumes.filter(mois__gt=Subquery(dernier_mois_archive)))
+
+        flux = defaultdict(dict)
+        for requete in requetes:
+            for ligne in (
+                requete.values('transaction__user_id', 'transaction__volet', 'mois')
+                .annotate(revenus=_flux('revenu'), depenses=_flux('depense'))
+                .order_by()
+            ):
+                cle = (ligne['transaction__user_id'], ligne['transaction__volet'])
+                flux[cle][ligne['mois']] = (total_annote(ligne['revenus']), total_annote(ligne['depenses']))
+        for requete in requetes_archives:
+            for ligne in _flux_archives(requete, 'user_id', 'volet', 'mois'):
+                cle = (ligne['user_id'], ligne['volet'])
+                revenus, depenses = flux[cle].get(ligne['mois'], (_ZERO, _ZERO))
+                flux[cle][ligne['mois']] = (
+                    revenus + total_annote(ligne['revenus']),
+                    depenses + total_annote(ligne['depenses']),
+                )
+
+        nouveaux = []
+        for cle in set(flux) | set(derniers):
+            user_id, volet = cle
+            if cle in derniers:
+                mois = ajouter_mois(derniers[cle].mois, 1)
+                solde = derniers[cle].solde_cumule
+            else:
+                mois, solde = min(flux[cle]), _ZERO
+            # Un instantané par mois, mois sans activité compris (contiguïté)
+            while mois < mois_courant:
+                revenus, depenses = flux[cle].get(mois, (_ZERO, _ZERO))
+                solde += revenus - depenses
+                nouveaux.append(SoldeMensuel(
+                    user_id=user_id, volet=volet, mois=mois,
+                    revenus=revenus, depenses=depenses, solde_cumule=solde,
+                ))
+                mois = ajouter_mois(mois, 1)
+
+        instantanes.bulk_create(nouveaux, batch_size=1000)
+    return len(nouveaux)
+
+
+def calculer_tous_soldes():
+    return sum(calculer_soldes(alias) for alias in shards())
@@ -1,8 +1,17 @@
 from rest_framework.routers import DefaultRouter
-from .views import TransactionViewSet, CategorieViewSet
+from .views import (
+    TransactionViewSet, CategorieViewSet, RecurrenceViewSet, ArchiveViewSet, RegleAlerteViewSet, AlerteBudgetViewSet,
+    ApercuViewSet, ReleveViewSet
+)
 
 router = DefaultRouter()
 router.register('categories', CategorieViewSet, basename='categories')
+router.register('recurrences', RecurrenceViewSet, basename='recurrences')
+router.register('archives', ArchiveViewSet, basename='archives')
+router.register('regles-alertes', RegleAlerteViewSet, basename='regles-alertes')
+router.register('alertes', AlerteBudgetViewSet, basename='alertes')
+router.register('apercus', ApercuViewSet, basename='apercus')
+router.register('releves', ReleveViewSet, basename='releves')
 router.register('', TransactionViewSet, basename='transactions')  # ✅ route vide
 
 urlpatterns = router.urls
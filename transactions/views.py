@@ -1,21 +1,60 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from django.db.models import Sum, Count, Q
+from django.http import FileResponse, Http404
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework.generics import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Categorie, Transaction, Libelle, Photo
+from Moonit_backend.replicas import ReplicaReadMixin
+from .sharding import ShardMixin, shard_pour
+from utils.champs import ChampsDemandes
+from utils.dates import ajouter_mois
+from .projections import annoter_agregats_libelles, lignes_liste, lignes_detail
+from .filters import TransactionFilter, TransactionArchiveeFilter
+from .catalogue import categorie_active, predefinies
+from .groupe import changer_statut, recategoriser, supprimer as supprimer_groupe
+from .hierarchie import cumuler_par_branche
+from .lot import appliquer_lot
+from .archives import restaurer as restaurer_archives
+from .suggestions import suggerer
+from .tresorerie import PERIODES, nombre_periodes, serie_tresorerie
+from .sync import page_synchronisation, CurseurInvalide, ResynchronisationRequise
+from .models import (
+    Categorie, Transaction, Libelle, Photo, Recurrence, TransactionArchivee, ResumeArchive,
+    RegleAlerte, AlerteBudget, Apercu, Releve
+)
 from .serializers import (
     CategorieSerializer,
     TransactionSerializer,
     TransactionListSerializer,
     TransactionCreateSerializer,
     StatistiquesSerializer,
-    PhotoSerializer
+    SuggestionSerializer,
+    PhotoSerializer,
+    LotSerializer,
+    RecurrenceSerializer,
+    TransactionArchiveeSerializer,
+    ResumeArchiveSerializer,
+    RestaurationSerializer,
+    RegleAlerteSerializer,
+    AlerteBudgetSerializer,
+    ApercuSerializer,
+    ReleveSerializer,
+    SelectionGroupeSerializer,
+    StatutGroupeSerializer,
+    RecategorisationSerializer
 )
 
 
-class CategorieViewSet(viewsets.ModelViewSet):
+class CategorieViewSet(ShardMixin, viewsets.ModelViewSet):
     """
     ViewSet pour gérer les catégories
     
@@ -42,13 +81,20 @@ class CategorieViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def predefinies(self, request):
-        """Liste uniquement les catégories prédéfinies"""
-        categories = Categorie.objects.filter(
-            est_predefinite=True,
-            est_active=True
-        )
-        serializer = self.get_serializer(categories, many=True)
-        return Response(serializer.data)
+        """
+        Liste uniquement les catégories prédéfinies : identique pour tous,
+        servie depuis le catalogue en mémoire (voir catalogue.py), en cache
+        public avec ETag (304 si If-None-Match correspond).
+        """
+        catalogue = predefinies()
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if catalogue.etag in etags or '*' in etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(catalogue.donnees)
+        response['ETag'] = catalogue.etag
+        patch_cache_control(response, public=True, max_age=settings.CATEGORIES_PREDEFINIES_MAX_AGE)
+        return response
     
     @action(detail=False, methods=['get'])
     def personnalisees(self, request):
@@ -71,8 +117,14 @@ class CategorieViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Vérifie qu'il n'y a pas de transactions associées
-        if instance.transactions.exists():
+        if instance.enfants.exists():
+            return Response(
+                {"error": "Impossible de supprimer une catégorie qui a des sous-catégories."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Vérifie qu'il n'y a pas de transactions associées (archives comprises)
+        if instance.transactions.exists() or instance.transactions_archivees.exists():
             return Response(
                 {"error": "Impossible de supprimer une catégorie avec des transactions associées."},
                 status=status.HTTP_400_BAD_REQUEST
@@ -81,7 +133,161 @@ class CategorieViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class RecurrenceViewSet(ShardMixin, viewsets.ModelViewSet):
+    """
+    Transactions récurrentes de l'utilisateur (salaire, loyer, abonnements, budgets).
+    Les occurrences sont créées par `manage.py generer_recurrences`.
+    """
+    
+    serializer_class = RecurrenceSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['frequence', 'est_active', 'modele']
+    
+    def get_queryset(self):
+        return Recurrence.objects.filter(user=self.request.user).select_related('modele')
+
+
+class RegleAlerteViewSet(ShardMixin, viewsets.ModelViewSet):
+    """
+    Règles d'alerte de budget de l'utilisateur : prévenir quand les dépenses
+    du mois d'une catégorie (sous-catégories comprises) atteignent un seuil
+    du budget du mois. Évaluées à chaque écriture (voir alertes.py).
+    """
+    
+    serializer_class = RegleAlerteSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['categorie', 'est_active']
+    
+    def get_queryset(self):
+        return RegleAlerte.objects.filter(user=self.request.user)
+
+
+class AlerteBudgetViewSet(ShardMixin, viewsets.ReadOnlyModelViewSet):
+    """Alertes de budget déclenchées pour l'utilisateur connecté (une par règle, mois et seuil)"""
+    
+    serializer_class = AlerteBudgetSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['regle', 'mois', 'seuil']
+    
+    def get_queryset(self):
+        return AlerteBudget.objects.filter(user=self.request.user).select_related('regle')
+
+
+class ApercuViewSet(ShardMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Aperçus des dépenses de l'utilisateur par catégorie (dépense inhabituelle,
+    tendance, projection de fin de mois). Calculés chaque nuit par
+    calculer_apercus (voir apercus.py) : la lecture ne fait aucun calcul.
+    """
+    
+    serializer_class = ApercuSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['categorie', 'est_inhabituelle']
+    
+    def get_queryset(self):
+        return Apercu.objects.filter(user=self.request.user).select_related('categorie')
+
+
+class ReleveViewSet(ShardMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Relevés mensuels de l'utilisateur, générés en fin de mois par
+    generer_releves (voir releves.py). Le fichier se télécharge via
+    /releves/{id}/telecharger/.
+    """
+    
+    serializer_class = ReleveSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['mois']
+    
+    def get_queryset(self):
+        return Releve.objects.filter(user=self.request.user)
+    
+    @action(detail=True, methods=['get'])
+    def telecharger(self, request, pk=None):
+        releve = self.get_object()
+        try:
+            fichier = releve.fichier.open('rb')
+        except FileNotFoundError:
+            raise Http404("Fichier du relevé introuvable.")
+        return FileResponse(
+            fichier,
+            as_attachment=True,
+            filename=f"releve-{releve.mois:%Y-%m}.html",
+            content_type='text/html; charset=utf-8',
+        )
+
+
+class ArchiveViewSet(ShardMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Transactions archivées (voir archives.py), en lecture seule
+    
+    list: Liste les transactions archivées (?annee=YYYY&mois=MM optionnels)
+    retrieve: Détail d'une transaction archivée
+    
+    Actions supplémentaires:
+    - restaurer: Remettre des transactions archivées en table chaude
+    - resumes: Totaux mensuels conservés pour les libellés archivés
+    """
+    
+    serializer_class = TransactionArchiveeSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_class = TransactionArchiveeFilter
+    ordering_fields = ['created_at']
+    ordering = ['-created_at']
+    
+    def get_queryset(self):
+        queryset = (
+            TransactionArchivee.objects.filter(user=self.request.user)
+            .select_related('categorie').prefetch_related('libelles', 'photos')
+        )
+        annee = self.request.query_params.get('annee')
+        mois = self.request.query_params.get('mois')
+        if annee and mois and annee.isdigit() and mois.isdigit():
+            queryset = queryset.filter(
+                libelles__date__year=int(annee),
+                libelles__date__month=int(mois)
+            ).distinct()
+        return queryset
+    
+    @action(detail=False, methods=['post'])
+    def restaurer(self, request):
+        """
+        Remet en table chaude les transactions archivées {ids: [...]}.
+        Elles réapparaissent dans les listes et dans /sync/.
+        """
+        serializer = RestaurationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        archives = TransactionArchivee.objects.filter(
+            user=request.user, pk__in=serializer.validated_data['ids']
+        )
+        nb = restaurer_archives(shard_pour(request.user.pk), archives)
+        return Response({'restaurees': nb})
+    
+    @action(detail=False, methods=['get'])
+    def resumes(self, request):
+        """
+        Totaux mensuels des libellés archivés par volet, position, statut et catégorie
+        Query params:
+        - volet: 'suivi' ou 'budget' (optionnel)
+        - statut: (optionnel)
+        """
+        queryset = ResumeArchive.objects.filter(user=request.user)
+        for champ in ('volet', 'statut'):
+            valeur = request.query_params.get(champ)
+            if valeur:
+                queryset = queryset.filter(**{champ: valeur})
+        serializer = ResumeArchiveSerializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class TransactionViewSet(ShardMixin, ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet pour gérer les transactions avec libellés multiples
     
@@ -96,18 +302,37 @@ class TransactionViewSet(viewsets.ModelViewSet):
     - par_mois: Filtrer les transactions d'un mois spécifique
     - budget: Filtrer uniquement les budgets
     - suivi: Filtrer uniquement le suivi réel
+    - sync: Changements depuis un curseur (clients hors ligne)
+    - suggestions: Autocomplétion des libellés déjà utilisés
+    
+    Une transaction archivée reste lisible par retrieve ('archivee': true).
+    Les agrégats (replica_actions) sont lus sur un réplica si configuré.
     """
     
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['volet', 'position', 'statut', 'categorie']
+    # Bornes de montant, de date et de total : voir filters.py
+    filterset_class = TransactionFilter
+    replica_actions = ['statistiques', 'par_mois', 'tresorerie']
+    # Actions rendues par TransactionSerializer sur des instances
+    serialized_actions = ['retrieve', 'update', 'partial_update', 'par_mois']
     search_fields = ['categorie__nom', 'libelles__nom']
     ordering_fields = ['created_at']
     ordering = ['-created_at']
     
     def get_queryset(self):
         """Retourne uniquement les transactions de l'utilisateur connecté"""
-        return Transaction.objects.filter(user=self.request.user).select_related('categorie').prefetch_related('libelles', 'photos')
+        queryset = Transaction.objects.filter(user=self.request.user).select_related('categorie')
+        if self.action in self.serialized_actions:
+            # Ne précharger que les relations demandées (?fields= / ?expand=),
+            # les totaux viennent de sous-requêtes
+            demandes = ChampsDemandes(self.request)
+            relations = [
+                relation for relation in ('libelles', 'photos')
+                if demandes.inclut_relation(relation)
+            ]
+            queryset = annoter_agregats_libelles(queryset.prefetch_related(*relations))
+        return queryset
     
     def get_serializer_class(self):
         """Utilise un serializer adapté selon l'action"""
@@ -117,6 +342,28 @@ class TransactionViewSet(viewsets.ModelViewSet):
             return TransactionCreateSerializer
         return TransactionSerializer
     
+    def list(self, request, *args, **kwargs):
+        """Liste construite par projection .values() (même JSON que TransactionListSerializer)"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            # Même ORDER BY que la page : l'ordre est conservé
+            ids = [transaction.pk for transaction in page]
+            return self.get_paginated_response(lignes_liste(queryset.filter(pk__in=ids), request))
+        return Response(lignes_liste(queryset, request))
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Détail d'une transaction, relu dans les archives si elle n'est plus en table chaude"""
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archive = get_object_or_404(
+                TransactionArchivee.objects.select_related('categorie').prefetch_related('libelles', 'photos'),
+                user=request.user,
+                pk=kwargs[self.lookup_field]
+            )
+            return Response(TransactionArchiveeSerializer(archive, context=self.get_serializer_context()).data)
+    
     @action(detail=False, methods=['get'])
     def statistiques(self, request):
         """
@@ -125,9 +372,20 @@ class TransactionViewSet(viewsets.ModelViewSet):
         - volet: 'suivi' ou 'budget' (optionnel)
         - date_debut: YYYY-MM-DD (optionnel)
         - date_fin: YYYY-MM-DD (optionnel)
+        - niveau: cumule les totaux par catégorie au niveau donné de la
+          hiérarchie (1 = catégories racines, optionnel)
         """
         queryset = self.get_queryset()
         
+        niveau = request.query_params.get('niveau')
+        if niveau is not None:
+            niveau = int(niveau) if niveau.isdigit() else 0
+            if not 1 <= niveau <= Categorie.PROFONDEUR_MAX:
+                return Response(
+                    {"error": f"niveau doit être compris entre 1 et {Categorie.PROFONDEUR_MAX}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        
         # Filtres optionnels
         volet = request.query_params.get('volet')
         date_debut = request.query_params.get('date_debut')
@@ -152,31 +410,36 @@ class TransactionViewSet(viewsets.ModelViewSet):
         solde = revenus_libelles - depenses_libelles
         nb_transactions = queryset.count()
         
-        # Dépenses par catégorie (somme des libellés)
-        depenses_cat = queryset.filter(
-            position='depense',
-            statut='validee'
-        ).values(
-            'categorie__nom',
-            'categorie__couleur',
-            'categorie__icone'
-        ).annotate(
-            total=Sum('libelles__montant'),
-            nombre=Count('id', distinct=True)
-        ).order_by('-total')
+        if niveau:
+            # Totaux cumulés par branche de la hiérarchie, une requête groupée par position
+            depenses_cat = cumuler_par_branche(queryset.filter(position='depense', statut='validee'), niveau)
+            revenus_cat = cumuler_par_branche(queryset.filter(position='revenu', statut='validee'), niveau)
+        else:
+            # Dépenses par catégorie (somme des libellés)
+            depenses_cat = queryset.filter(
+                position='depense',
+                statut='validee'
+            ).values(
+                'categorie__nom',
+                'categorie__couleur',
+                'categorie__icone'
+            ).annotate(
+                total=Sum('libelles__montant'),
+                nombre=Count('id', distinct=True)
+            ).order_by('-total')
         
-        # Revenus par catégorie (somme des libellés)
-        revenus_cat = queryset.filter(
-            position='revenu',
-            statut='validee'
-        ).values(
-            'categorie__nom',
-            'categorie__couleur',
-            'categorie__icone'
-        ).annotate(
-            total=Sum('libelles__montant'),
-            nombre=Count('id', distinct=True)
-        ).order_by('-total')
+            # Revenus par catégorie (somme des libellés)
+            revenus_cat = queryset.filter(
+                position='revenu',
+                statut='validee'
+            ).values(
+                'categorie__nom',
+                'categorie__couleur',
+                'categorie__icone'
+            ).annotate(
+                total=Sum('libelles__montant'),
+                nombre=Count('id', distinct=True)
+            ).order_by('-total')
         
         data = {
             'total_revenus': revenus_libelles,
@@ -190,6 +453,61 @@ class TransactionViewSet(viewsets.ModelViewSet):
         serializer = StatistiquesSerializer(data)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def tresorerie(self, request):
+        """
+        Série de trésorerie : revenus, dépenses, net et solde cumulé par période
+        (transactions validées), périodes vides comprises.
+        Query params:
+        - periode: 'jour', 'semaine' ou 'mois' (défaut 'mois')
+        - volet: 'suivi' ou 'budget' (défaut 'suivi')
+        - date_debut: YYYY-MM-DD (défaut : 12 périodes avant date_fin)
+        - date_fin: YYYY-MM-DD (défaut : aujourd'hui)
+        """
+        periode = request.query_params.get('periode', 'mois')
+        volet = request.query_params.get('volet', 'suivi')
+        if periode not in PERIODES or volet not in dict(Transaction.VOLET_CHOICES):
+            return Response(
+                {"error": "Paramètres 'periode' ou 'volet' invalides."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            date_fin = request.query_params.get('date_fin')
+            date_fin = date.fromisoformat(date_fin) if date_fin else timezone.localdate()
+            date_debut = request.query_params.get('date_debut')
+            if date_debut:
+                date_debut = date.fromisoformat(date_debut)
+            elif periode == 'mois':
+                date_debut = ajouter_mois(date_fin, -11)
+            else:
+                date_debut = date_fin - timedelta(weeks=11) if periode == 'semaine' else date_fin - timedelta(days=29)
+        except ValueError:
+            return Response(
+                {"error": "Format de date invalide (YYYY-MM-DD)."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if date_debut > date_fin:
+            return Response(
+                {"error": "'date_debut' doit précéder 'date_fin'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if nombre_periodes(date_debut, date_fin, periode) > settings.TRESORERIE_POINTS_MAX:
+            return Response(
+                {"error": f"Plage trop longue : {settings.TRESORERIE_POINTS_MAX} périodes au maximum."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serie = serie_tresorerie(request.user.pk, volet, periode, date_debut, date_fin)
+        return Response({
+            'volet': volet,
+            'periode': periode,
+            'date_debut': date_debut,
+            'date_fin': date_fin,
+            **serie,
+        })
+    
     @action(detail=False, methods=['get'])
     def par_mois(self, request):
         """
@@ -231,22 +549,151 @@ class TransactionViewSet(viewsets.ModelViewSet):
     def budget(self, request):
         """Retourne uniquement les transactions de type budget"""
         queryset = self.get_queryset().filter(volet='budget')
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(lignes_detail(queryset, request))
     
     @action(detail=False, methods=['get'])
     def suivi(self, request):
         """Retourne uniquement les transactions de type suivi"""
         queryset = self.get_queryset().filter(volet='suivi')
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(lignes_detail(queryset, request))
     
     @action(detail=False, methods=['get'])
     def recentes(self, request):
         """Retourne les 10 dernières transactions"""
         queryset = self.get_queryset()[:10]
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(lignes_detail(queryset, request))
+    
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Synchronisation incrémentale : catégories, transactions, libellés,
+        photos créés/modifiés et suppressions depuis le curseur.
+        Query params:
+        - curseur: valeur renvoyée par l'appel précédent (vide = tout télécharger)
+        - limite: nombre max d'éléments par page (défaut 500)
+        Répéter avec le curseur renvoyé tant que 'termine' est faux.
+        """
+        try:
+            limite = int(request.query_params.get('limite', settings.SYNC_PAGE_DEFAUT))
+        except ValueError:
+            return Response(
+                {"error": "Le paramètre 'limite' doit être un entier."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limite = max(1, min(limite, settings.SYNC_PAGE_MAX))
+        
+        try:
+            data = page_synchronisation(
+                request.user,
+                request.query_params.get('curseur'),
+                limite,
+                self.get_serializer_context()
+            )
+        except CurseurInvalide as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ResynchronisationRequise:
+            return Response(
+                {"error": "Curseur trop ancien, une synchronisation complète est nécessaire."},
+                status=status.HTTP_410_GONE
+            )
+        return Response(data)
+    
+    @action(detail=False, methods=['get'])
+    def suggestions(self, request):
+        """
+        Autocomplétion : libellés déjà utilisés commençant par q (ou dont un
+        mot commence par q), classés par fréquence et récence, avec la
+        catégorie et le montant de leur dernier usage.
+        Query params:
+        - q: texte saisi (vide = libellés les plus utilisés)
+        - limite: nombre max de suggestions (défaut et max SUGGESTIONS_MAX)
+        """
+        try:
+            limite = int(request.query_params.get('limite', settings.SUGGESTIONS_MAX))
+        except ValueError:
+            return Response(
+                {"error": "Le paramètre 'limite' doit être un entier."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        suggestions = suggerer(request.user.pk, request.query_params.get('q', ''), max(1, limite))
+        return Response(SuggestionSerializer(suggestions, many=True).data)
+    
+    @action(detail=False, methods=['post'])
+    def lot(self, request):
+        """
+        Écritures hors ligne en lot : liste ordonnée d'opérations
+        {cle, op: create|update|delete, type: transaction|libelle, id, data}.
+        Tout ou rien : si une opération est invalide, aucune n'est appliquée (400).
+        Une clé déjà appliquée renvoie son résultat d'origine (statut 'rejouee').
+        """
+        serializer = LotSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        applique, resultats = appliquer_lot(
+            request.user,
+            serializer.validated_data['operations'],
+            self.get_serializer_context()
+        )
+        return Response(
+            {'resultats': resultats},
+            status=status.HTTP_200_OK if applique else status.HTTP_400_BAD_REQUEST
+        )
+    
+    def _selection_groupe(self, donnees):
+        """Ids des transactions de l'utilisateur visées par une opération groupée"""
+        transactions = Transaction.objects.filter(user=self.request.user)
+        if 'ids' in donnees:
+            transactions = transactions.filter(pk__in=donnees['ids'])
+        else:
+            # Une clé mal orthographiée serait ignorée et sélectionnerait tout
+            inconnus = sorted(set(donnees['filtre']) - set(TransactionFilter.base_filters))
+            if inconnus:
+                raise ValidationError({'filtre': f"Paramètre(s) de filtre inconnu(s) : {', '.join(inconnus)}."})
+            filterset = TransactionFilter(data=donnees['filtre'], queryset=transactions, request=self.request)
+            if not filterset.is_valid():
+                raise ValidationError({'filtre': filterset.errors})
+            if all(valeur in (None, '', [], ()) for valeur in filterset.form.cleaned_data.values()):
+                raise ValidationError({'filtre': "Aucun critère de filtre : préciser le filtre ou donner les ids."})
+            transactions = filterset.qs
+        ids = list(transactions.order_by().values_list('pk', flat=True)[:settings.GROUPE_MAX_TRANSACTIONS + 1])
+        if len(ids) > settings.GROUPE_MAX_TRANSACTIONS:
+            raise ValidationError({
+                'filtre': f"Plus de {settings.GROUPE_MAX_TRANSACTIONS} transactions sélectionnées : préciser le filtre."
+            })
+        return ids
+    
+    @action(detail=False, methods=['post'], url_path='groupe/statut')
+    def statut_groupe(self, request):
+        """
+        Change le statut de plusieurs transactions en une requête :
+        {ids: [...] | filtre: {...}, statut}. Le filtre reprend les
+        paramètres de la liste (volet, statut, categorie, date_debut...).
+        """
+        serializer = StatutGroupeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = self._selection_groupe(serializer.validated_data)
+        nb = changer_statut(request.user.pk, ids, serializer.validated_data['statut'])
+        return Response({'selectionnees': len(ids), 'modifiees': nb})
+    
+    @action(detail=False, methods=['post'], url_path='groupe/categorie')
+    def categorie_groupe(self, request):
+        """Range plusieurs transactions dans une catégorie : {ids: [...] | filtre: {...}, categorie_id}"""
+        serializer = RecategorisationSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        ids = self._selection_groupe(serializer.validated_data)
+        categorie = categorie_active(serializer.validated_data['categorie_id'])
+        nb = recategoriser(request.user.pk, ids, categorie)
+        return Response({'selectionnees': len(ids), 'modifiees': nb})
+    
+    @action(detail=False, methods=['post'], url_path='groupe/supprimer')
+    def suppression_groupe(self, request):
+        """Supprime plusieurs transactions (libellés et photos compris) : {ids: [...] | filtre: {...}}"""
+        serializer = SelectionGroupeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = self._selection_groupe(serializer.validated_data)
+        nb = supprimer_groupe(request.user.pk, ids)
+        return Response({'selectionnees': len(ids), 'supprimees': nb})
     
     @action(detail=True, methods=['post'])
     def ajouter_photo(self, request, pk=None):
@@ -0,0 +1,136 @@
+# backend/users/authentication.py
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import RevocationJetons
+
+# Émission du jeton à la milliseconde (iat n'a qu'une précision à la seconde)
+CLAIM_IAT_MS = 'iat_ms'
+
+
+def _epoch_ms(moment):
+    return int(moment.timestamp() * 1000)
+
+
+def cle_utilisateur(user_id):
+    return f"jwt:user:{user_id}"
+
+
+def cle_revocation(user_id):
+    return f"jwt:revocation:{user_id}"
+
+
+class JetonRafraichissement(RefreshToken):
+    """RefreshToken daté aussi à la milliseconde ; les jetons d'accès qui en sont tirés recopient iat et iat_ms"""
+
+    def set_iat(self, claim='iat', at_time=None):
+        super().set_iat(claim, at_time)
+        self.payload[CLAIM_IAT_MS] = _epoch_ms(at_time or self.current_time)
+
+
+def emis_le_ms(validated_token):
+    # Jetons émis avant iat_ms : début de la seconde
+    return validated_token.get(CLAIM_IAT_MS, validated_token.get('iat', 0) * 1000)
+
+
+def invalider_utilisateur(user_id, revoquer=False):
+    """
+    Retire l'utilisateur du cache. Avec `revoquer`, les jetons émis avant
+    maintenant sont refusés dans les deux modes (désactivation, changement
+    de mot de passe). La révocation est écrite en base et dans le cache :
+    un cache partagé la rend visible de tous les workers tout de suite, un
+    cache local après au plus JWT_REVOCATION_CACHE_TTL secondes.
+    """
+    cache.delete(cle_utilisateur(user_id))
+    if revoquer:
+        maintenant = _epoch_ms(timezone.now())
+        revocations = RevocationJetons.objects.using(DEFAULT_DB_ALIAS)
+        revocations.update_or_create(user_id=user_id, defaults={'revoque_le_ms': maintenant})
+        cache.set(cle_revocation(user_id), maintenant, settings.JWT_REVOCATION_CACHE_TTL)
+        # Un jeton d'accès peut être tiré d'un refresh jusqu'à l'expiration de celui-ci
+        duree = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+        revocations.filter(revoque_le_ms__lt=maintenant - duree.total_seconds() * 1000).delete()
+
+
+def verifier_revocation(validated_token, user_id):
+    """
+    Refuse un jeton émis avant la dernière révocation de l'utilisateur. La
+    révocation est lue dans le cache ; la base n'est lue qu'en cas d'absence
+    (0 en cache : aucune révocation).
+    """
+    cle = cle_revocation(user_id)
+    revoque_le = cache.get(cle)
+    if revoque_le is None:
+        revoque_le = (
+            RevocationJetons.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id)
+            .values_list('revoque_le_ms', flat=True).first()
+        ) or 0
+        cache.set(cle, revoque_le, settings.JWT_REVOCATION_CACHE_TTL)
+    if emis_le_ms(validated_token) < revoque_le:
+        raise AuthenticationFailed("Token revoked", code="token_revoked")
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication qui garde l'utilisateur en cache JWT_USER_CACHE_TTL
+    secondes au lieu de relire auth_user à chaque requête. Les contrôles
+    is_active / révocation de simplejwt s'appliquent à l'objet en cache, et
+    les jetons émis avant une révocation sont refusés comme en mode jeton seul.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        verifier_revocation(validated_token, user_id)
+        cle = cle_utilisateur(user_id)
+        user = cache.get(cle)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(cle, user, settings.JWT_USER_CACHE_TTL)
+            return user
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if (
+            api_settings.CHECK_REVOKE_TOKEN
+            and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed("The user's password has been changed.", code="password_changed")
+        return user
+
+
+class TokenOnlyJWTAuthentication(JWTAuthentication):
+    """
+    Mode jeton seul : la vue reçoit un User léger construit depuis le jeton,
+    sans lire auth_user ; seule la révocation est lue (cache, puis base par
+    défaut en cas d'absence). Utilisable comme un vrai User dans les filtres
+    et clés étrangères (pk renseigné), mais seuls id/username sont fiables.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+
+        verifier_revocation(validated_token, user_id)
+
+        user = User(
+            **{api_settings.USER_ID_FIELD: user_id},
+            username=validated_token.get('username', ''),
+            is_active=True,
+        )
+        user._state.adding = False
+        user._state.db = DEFAULT_DB_ALIAS
+        return user
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevocationJetons',
+            fields=[
+                ('user_id', models.PositiveBigIntegerField(primary_key=True, serialize=False, verbose_name='Utilisateur')),
+                ('revoque_le_ms', models.BigIntegerField(db_index=True, verbose_name='Révoqué le (ms)')),
+            ],
+            options={
+                'verbose_name': 'Révocation de jetons',
+                'verbose_name_plural': 'Révocations de jetons',
+            },
+        ),
+    ]
@@ -7,3 +7,18 @@ class Compte(models.Model):
 
     def __str__(self):
         return f"{self.nom} ({self.user.username})"
+
+
+class RevocationJetons(models.Model):
+    """Instant (ms) avant lequel les jetons émis pour un utilisateur sont refusés (mode jeton seul)"""
+
+    # Sans contrainte : la révocation survit à la suppression de l'utilisateur
+    user_id = models.PositiveBigIntegerField(primary_key=True, verbose_name="Utilisateur")
+    revoque_le_ms = models.BigIntegerField(db_index=True, verbose_name="Révoqué le (ms)")
+
+    class Meta:
+        verbose_name = "Révocation de jetons"
+        verbose_name_plural = "Révocations de jetons"
+
+    def __str__(self):
+        return f"{self.user_id} ({self.revoque_le_ms})"
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+
+from .authentication import JetonRafraichissement
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
@@ -15,3 +18,11 @@ class RegisterSerializer(serializers.ModelSerializer):
             password=validated_data["password"]
         )
         return user
+
+
+class JetonObtenirSerializer(TokenObtainPairSerializer):
+    token_class = JetonRafraichissement
+
+
+class JetonRafraichirSerializer(TokenRefreshSerializer):
+    token_class = JetonRafraichissement
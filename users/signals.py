@@ -0,0 +1,18 @@
+# backend/users/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalider_utilisateur
+
+
+@receiver(post_save, sender=User)
+def invalider_cache_utilisateur(sender, instance, **kwargs):
+    # set_password() garde le mot de passe en clair dans _password jusqu'à la fin de save()
+    mot_de_passe_change = getattr(instance, '_password', None) is not None
+    invalider_utilisateur(instance.pk, revoquer=mot_de_passe_change or not instance.is_active)
+
+
+@receiver(post_delete, sender=User)
+def invalider_cache_utilisateur_supprime(sender, instance, **kwargs):
+    invalider_utilisateur(instance.pk, revoquer=True)
@@ -1,3 +1,74 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
 
-# Create your tests here.
+from .authentication import (
+    CLAIM_IAT_MS, CachedJWTAuthentication, JetonRafraichissement, TokenOnlyJWTAuthentication, cle_revocation
+)
+
+MODES = (CachedJWTAuthentication, TokenOnlyJWTAuthentication)
+
+
+class RevocationTests(TestCase):
+    """Changement de mot de passe et désactivation refusent les jetons déjà émis, dans les deux modes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('revocation', password='ancien-mot-de-passe')
+
+    def _jeton(self):
+        jeton = JetonRafraichissement.for_user(self.user).access_token
+        # Émis juste avant l'écriture qui suit (même milliseconde sinon)
+        jeton[CLAIM_IAT_MS] -= 1
+        return str(jeton)
+
+    def _authentifier(self, mode, jeton):
+        requete = APIRequestFactory().get('/api/transactions/', HTTP_AUTHORIZATION=f'Bearer {jeton}')
+        return mode().authenticate(Request(requete))
+
+    def _verifier_revoque(self, modifier):
+        for mode in MODES:
+            with self.subTest(mode=mode.__name__):
+                jeton = self._jeton()
+                # Premier passage : utilisateur et absence de révocation en cache
+                self.assertEqual(str(self._authentifier(mode, jeton)[0].pk), str(self.user.pk))
+                modifier()
+                with self.assertRaises(AuthenticationFailed):
+                    self._authentifier(mode, jeton)
+                # Un jeton émis après la révocation passe
+                self.user.is_active = True
+                self.user.save()
+                nouveau = str(JetonRafraichissement.for_user(self.user).access_token)
+                self.assertEqual(str(self._authentifier(mode, nouveau)[0].pk), str(self.user.pk))
+
+    def test_changement_mot_de_passe(self):
+        def changer():
+            self.user.set_password('nouveau-mot-de-passe')
+            self.user.save()
+        self._verifier_revoque(changer)
+
+    def test_desactivation(self):
+        def desactiver():
+            self.user.is_active = False
+            self.user.save()
+        self._verifier_revoque(desactiver)
+
+    def test_revocation_lue_en_base_si_absente_du_cache(self):
+        jeton = self._jeton()
+        self.user.set_password('nouveau-mot-de-passe')
+        self.user.save()
+        for mode in MODES:
+            with self.subTest(mode=mode.__name__):
+                cache.delete(cle_revocation(self.user.pk))
+                with self.assertRaises(AuthenticationFailed):
+                    self._authentifier(mode, jeton)
+                self.assertIsNotNone(cache.get(cle_revocation(self.user.pk)))
+
+    def test_sans_requete_quand_revocation_en_cache(self):
+        jeton = self._jeton()
+        self._authentifier(TokenOnlyJWTAuthentication, jeton)
+        with self.assertNumQueries(0):
+            self._authentifier(TokenOnlyJWTAuthentication, jeton)
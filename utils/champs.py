@@ -0,0 +1,66 @@
+# backend/utils/champs.py
+"""
+Champs à la demande : ?fields=id,montant_total&expand=libelles,photos
+
+- fields : liste des champs de premier niveau à renvoyer (tous par défaut)
+- expand : relations imbriquées à inclure. Sans ce paramètre, les relations
+  suivent `fields` (toutes incluses par défaut, pour rester compatible).
+"""
+
+
+def _liste(valeur):
+    if valeur is None:
+        return None
+    return {champ.strip() for champ in valeur.split(',') if champ.strip()}
+
+
+class ChampsDemandes:
+    """Lecture des paramètres fields / expand d'une requête"""
+
+    def __init__(self, request=None):
+        params = getattr(request, 'query_params', None) or {}
+        self.fields = _liste(params.get('fields'))
+        self.expand = _liste(params.get('expand'))
+
+    def inclut(self, champ):
+        return self.fields is None or champ in self.fields
+
+    def inclut_relation(self, relation):
+        if self.expand is not None:
+            return relation in self.expand
+        return self.inclut(relation)
+
+    def filtrer(self, donnees, relations=()):
+        """Restreint un dict déjà construit aux champs demandés"""
+        return {
+            champ: valeur for champ, valeur in donnees.items()
+            if (self.inclut_relation(champ) if champ in relations else self.inclut(champ))
+        }
+
+
+class ChampsDynamiquesMixin:
+    """
+    Mixin de serializer : ne calcule ni ne renvoie les champs non demandés.
+    Les relations listées dans `Meta.relations_extensibles` suivent `expand`.
+    Les champs en lecture seule sont retirés dès l'init (aucun calcul) ; les
+    champs modifiables restent utilisables en entrée et sont ignorés en sortie.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._champs_demandes = ChampsDemandes(self.context.get('request'))
+        for champ in list(self.fields):
+            if self.fields[champ].read_only and not self._garde(champ):
+                self.fields.pop(champ)
+
+    def _garde(self, champ):
+        if champ in getattr(self.Meta, 'relations_extensibles', ()):
+            return self._champs_demandes.inclut_relation(champ)
+        return self._champs_demandes.inclut(champ)
+
+    @property
+    def _readable_fields(self):
+        # Champs modifiables non demandés : ni calculés ni renvoyés
+        for field in super()._readable_fields:
+            if self._garde(field.field_name):
+                yield field
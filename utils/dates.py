@@ -0,0 +1,9 @@
+# backend/utils/dates.py
+import calendar
+
+
+def ajouter_mois(jour, nb_mois):
+    """Ajoute des mois à une date ; 31 janvier + 1 mois = dernier jour de février"""
+    total = jour.month - 1 + nb_mois
+    annee, mois = jour.year + total // 12, total % 12 + 1
+    return jour.replace(year=annee, month=mois, day=min(jour.day, calendar.monthrange(annee, mois)[1]))
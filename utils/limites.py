@@ -0,0 +1,172 @@
+# backend/utils/limites.py
+"""
+Limitation de débit par seaux à jetons, par utilisateur et par endpoint.
+
+Chaque couple (utilisateur, endpoint) a son seau de LIMITES_CAPACITE jetons,
+rempli de LIMITES_DEBIT jetons par seconde. Une requête coûte des jetons
+selon l'action (LIMITES_COUTS, 1 par défaut) : un agrégat comme
+/statistiques/ en coûte plus qu'un détail. Seau vide : 429 avec
+Retry-After (secondes avant d'avoir assez de jetons).
+
+Les seaux sont stockés par LIMITES_STOCKAGE :
+- SeauxSQLite (défaut) : fichier SQLite local (LIMITES_FICHIER, dans le
+  projet) partagé par tous les workers du projet. Une seule requête UPSERT ...
+  RETURNING remplit, débite et relit le seau : c'est atomique entre
+  processus, sans verrou applicatif ;
+- SeauxMemoire : par processus, pour les tests et le développement.
+Le stockage est recréé quand override_settings change LIMITES_STOCKAGE ou
+LIMITES_FICHIER.
+
+EntetesLimitesMiddleware ajoute à chaque réponse limitée RateLimit-Limit,
+RateLimit-Remaining (jetons) et RateLimit-Reset (secondes avant un seau
+plein).
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+_CREATION = """
+CREATE TABLE IF NOT EXISTS seaux (
+    cle TEXT PRIMARY KEY,
+    jetons REAL NOT NULL,
+    maj REAL NOT NULL,
+    accepte INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+# Dans SET, les colonnes désignent toutes l'ancienne ligne
+_CONSOMMER = """
+INSERT INTO seaux (cle, jetons, maj, accepte)
+VALUES (:cle, CASE WHEN :cout <= :capacite THEN :capacite - :cout ELSE :capacite END, :t, :cout <= :capacite)
+ON CONFLICT (cle) DO UPDATE SET
+    jetons = CASE
+        WHEN MIN(:capacite, jetons + MAX(0, :t - maj) * :debit) >= :cout
+        THEN MIN(:capacite, jetons + MAX(0, :t - maj) * :debit) - :cout
+        ELSE MIN(:capacite, jetons + MAX(0, :t - maj) * :debit)
+    END,
+    accepte = MIN(:capacite, jetons + MAX(0, :t - maj) * :debit) >= :cout,
+    maj = :t
+RETURNING jetons, accepte
+"""
+
+# Purge des seaux pleins depuis longtemps (équivalents à un seau absent), tous les N appels
+_PURGE_TOUS_LES = 1000
+
+
+class SeauxSQLite:
+    """Seaux dans un fichier SQLite local, partagé entre processus"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._appels = 0
+
+    def _connexion(self):
+        # Une connexion par thread et par processus (pas de partage après fork)
+        if getattr(self._local, 'pid', None) != os.getpid():
+            connexion = sqlite3.connect(
+                settings.LIMITES_FICHIER, timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None
+            )
+            connexion.execute("PRAGMA journal_mode=WAL")
+            connexion.execute("PRAGMA synchronous=OFF")
+            connexion.execute(_CREATION)
+            self._local.connexion, self._local.pid = connexion, os.getpid()
+        return self._local.connexion
+
+    def consommer(self, cle, cout, capacite, debit):
+        """Débite `cout` jetons si possible. Retourne (accepte, jetons restants)."""
+        connexion = self._connexion()
+        maintenant = time.time()
+        jetons, accepte = connexion.execute(_CONSOMMER, {
+            'cle': cle, 'cout': cout, 'capacite': capacite, 'debit': debit, 't': maintenant,
+        }).fetchone()
+        self._appels += 1
+        if self._appels % _PURGE_TOUS_LES == 0:
+            connexion.execute("DELETE FROM seaux WHERE maj < ?", (maintenant - capacite / debit,))
+        return bool(accepte), jetons
+
+
+class SeauxMemoire:
+    """Seaux en mémoire du processus (tests, développement)"""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._seaux = {}
+
+    def consommer(self, cle, cout, capacite, debit):
+        maintenant = time.time()
+        with self._verrou:
+            jetons, maj = self._seaux.get(cle, (capacite, maintenant))
+            jetons = min(capacite, jetons + max(0, maintenant - maj) * debit)
+            accepte = jetons >= cout
+            if accepte:
+                jetons -= cout
+            self._seaux[cle] = (jetons, maintenant)
+        return accepte, jetons
+
+
+_stockage = None
+
+
+def stockage():
+    global _stockage
+    if _stockage is None:
+        _stockage = import_string(settings.LIMITES_STOCKAGE)()
+    return _stockage
+
+
+@receiver(setting_changed)
+def reinitialiser_stockage(setting, **kwargs):
+    global _stockage
+    if setting in ('LIMITES_STOCKAGE', 'LIMITES_FICHIER'):
+        _stockage = None
+
+
+def cout(view):
+    """Jetons d'une requête : LIMITES_COUTS par '<basename>.<action>' puis par action, 1 sinon"""
+    action = getattr(view, 'action', None) or view.__class__.__name__
+    couts = settings.LIMITES_COUTS
+    return couts.get(f"{getattr(view, 'basename', '')}.{action}", couts.get(action, 1))
+
+
+class SeauJetonsThrottle(BaseThrottle):
+    """Throttle DRF par seau à jetons (utilisateur ou IP, endpoint)"""
+
+    def allow_request(self, request, view):
+        if not settings.LIMITES_ACTIVES:
+            return True
+        capacite, debit = settings.LIMITES_CAPACITE, settings.LIMITES_DEBIT
+        self.cout = cout(view)
+        client = f"u{request.user.pk}" if request.user and request.user.is_authenticated else self.get_ident(request)
+        endpoint = f"{getattr(view, 'basename', view.__class__.__name__)}.{getattr(view, 'action', None) or ''}"
+        accepte, self.jetons = stockage().consommer(f"{client}:{endpoint}", self.cout, capacite, debit)
+        # Lu par EntetesLimitesMiddleware
+        request._request.limite_jetons = (capacite, self.jetons, (capacite - self.jetons) / debit)
+        return accepte
+
+    def wait(self):
+        return max(0, self.cout - self.jetons) / settings.LIMITES_DEBIT
+
+
+class EntetesLimitesMiddleware:
+    """En-têtes RateLimit-* sur les réponses des vues limitées"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        limite = getattr(request, 'limite_jetons', None)
+        if limite is not None:
+            capacite, jetons, reset = limite
+            response['RateLimit-Limit'] = str(capacite)
+            response['RateLimit-Remaining'] = str(math.floor(jetons))
+            response['RateLimit-Reset'] = str(math.ceil(reset))
+        return response
@@ -0,0 +1,27 @@
+# backend/utils/processus.py
+"""Répartition de travaux de fond (calculs de nuit) sur un pool de processus"""
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import connections
+
+
+def _initialiser_processus():
+    # Processus enfant : Django prêt, connexions propres à ce processus
+    django.setup()
+    connections.close_all()
+
+
+def repartir(fonction, travaux, processus):
+    """
+    Appelle fonction(*travail) pour chaque travail de `travaux`, sur
+    `processus` processus (1 = dans le processus courant). `fonction` doit
+    être définie au niveau d'un module et ses arguments sérialisables.
+    Retourne les résultats dans l'ordre des travaux.
+    """
+    if processus <= 1 or len(travaux) <= 1:
+        return [fonction(*travail) for travail in travaux]
+    # Ne pas partager les connexions ouvertes avec les processus enfants
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processus, initializer=_initialiser_processus) as pool:
+        return list(pool.map(fonction, *zip(*travaux)))
@@ -0,0 +1,100 @@
+# backend/utils/renderers.py
+"""
+Renderers / parsers rapides : JSON via orjson et MessagePack via msgpack.
+
+Le choix se fait par négociation de contenu standard de DRF :
+- Accept: application/json      -> OrjsonRenderer
+- Accept: application/msgpack   -> MessagePackRenderer
+- Content-Type idem pour les parsers.
+
+Les Decimal (montants) sont encodés en chaîne pour ne perdre aucune précision.
+"""
+import datetime
+import decimal
+import uuid
+
+import msgpack
+import orjson
+from django.utils.functional import Promise
+from django.utils.http import parse_header_parameters
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+
+def _valeur_par_defaut(obj):
+    """Types non gérés nativement (équivalent du JSONEncoder de DRF)"""
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f"Type non sérialisable : {type(obj).__name__}")
+
+
+class OrjsonRenderer(BaseRenderer):
+    """Renderer JSON basé sur orjson"""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        options = orjson.OPT_NON_STR_KEYS
+        # 'application/json; indent=4' -> orjson ne sait indenter qu'à 2 espaces
+        renderer_context = renderer_context or {}
+        indent = renderer_context.get('indent')
+        if accepted_media_type:
+            _, params = parse_header_parameters(accepted_media_type)
+            indent = params.get('indent', indent)
+        if indent:
+            options |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=_valeur_par_defaut, option=options)
+
+
+class OrjsonParser(BaseParser):
+    """Parser JSON basé sur orjson"""
+    media_type = 'application/json'
+    renderer_class = OrjsonRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renderer MessagePack (Accept: application/msgpack)"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_valeur_par_defaut, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """Parser MessagePack (Content-Type: application/msgpack)"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))